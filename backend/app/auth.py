@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.db import db_connection
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+ADMIN_USERS_REFRESH_SECONDS = float(os.getenv("ADMIN_USERS_REFRESH_SECONDS", "60"))
+
+class AdminUser:
+    __slots__ = ("id", "username", "password_hash", "email", "is_active")
+
+    def __init__(self, id: Optional[str], username: str, password_hash: str, email: Optional[str] = None, is_active: bool = True):
+        self.id = id
+        self.username = username
+        self.password_hash = password_hash
+        self.email = email
+        self.is_active = is_active
+
+class TokenCache:
+    """Bounded LRU of decoded JWT payloads keyed by the token's SHA-256, kept until the token expires"""
+
+    def __init__(self, max_size: int = AUTH_TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: dict):
+        expires_at = payload.get("exp")
+        if expires_at is None:
+            return
+        key = self.key(token)
+        self.entries[key] = (payload, float(expires_at))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+class AdminDirectory:
+    """Admin accounts from the admin_users table, held in memory and reloaded periodically.
+
+    Until the table can be read, the built-in accounts passed as `fallback` are used,
+    the same way other handlers fall back to in-memory data without a database.
+    """
+
+    def __init__(self, fallback: Optional[Dict[str, str]] = None, refresh_seconds: float = ADMIN_USERS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.fallback = {
+            username: AdminUser(None, username, password_hash)
+            for username, password_hash in (fallback or {}).items()
+        }
+        self.users: Dict[str, AdminUser] = dict(self.fallback)
+        self.loaded_at: Optional[float] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def load(self, conn):
+        cursor = await conn.execute("SELECT id, username, password_hash, email, is_active FROM admin_users")
+        rows = await cursor.fetchall()
+        self.loaded_at = time.monotonic()
+        if not rows:
+            return
+        self.users = {
+            row[1]: AdminUser(str(row[0]), row[1], row[2], row[3], bool(row[4]))
+            for row in rows
+        }
+
+    async def refresh(self):
+        try:
+            async with db_connection() as conn:
+                await self.load(conn)
+        except Exception as e:
+            print(f"Admin users not loaded, using built-in accounts: {e}")
+            # Back off until the next refresh instead of retrying on every login
+            self.loaded_at = time.monotonic()
+
+    async def ensure_fresh(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.refresh_seconds:
+            await self.refresh()
+
+    def get(self, username: str) -> Optional[AdminUser]:
+        user = self.users.get(username)
+        if user is None or not user.is_active:
+            return None
+        return user
+
+    def record_login(self, username: str, new_password_hash: Optional[str] = None):
+        """Store last_login, and a rehashed password if given, in the background so the login response does not wait for it"""
+        user = self.users.get(username)
+        if user is None:
+            return
+        old_password_hash = user.password_hash
+        if new_password_hash is not None:
+            user.password_hash = new_password_hash
+        if user.id is None:
+            return
+        task = asyncio.create_task(self._write_login(user.id, old_password_hash, new_password_hash))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _write_login(self, user_id: str, old_password_hash: str, new_password_hash: Optional[str]):
+        try:
+            async with db_connection() as conn:
+                if new_password_hash is None:
+                    await conn.execute("UPDATE admin_users SET last_login = CURRENT_TIMESTAMP WHERE id = %s", (user_id,))
+                else:
+                    # Only replace the hash we verified against, never a password changed meanwhile
+                    await conn.execute(
+                        """UPDATE admin_users SET last_login = CURRENT_TIMESTAMP,
+                           password_hash = CASE WHEN password_hash = %s THEN %s ELSE password_hash END
+                           WHERE id = %s""",
+                        (old_password_hash, new_password_hash, user_id)
+                    )
+        except Exception as e:
+            print(f"Could not record last login: {e}")
+
+    async def run_refresher(self):
+        """Reload the accounts every `refresh_seconds` until cancelled"""
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
@@ -0,0 +1,190 @@
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.geo import SpatialIndex
+
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "60"))
+
+# Booking statuses that occupy an ambulance for their [from_date, to_date) period
+OCCUPYING_STATUSES = ("assigned", "in_progress")
+
+class BookingConflict(Exception):
+    def __init__(self, ambulance_id: str, booking_id: Optional[str]):
+        super().__init__(f"Ambulance {ambulance_id} is already booked for an overlapping period")
+        self.ambulance_id = ambulance_id
+        self.booking_id = booking_id
+
+class AmbulanceSchedule:
+    """Half-open booking intervals of one ambulance kept in two sorted lists.
+
+    For any [start, end) the number of stored intervals overlapping it is
+    (#starts < end) - (#ends <= start): every interval that ends by `start`
+    also begins before `end`, so subtracting leaves exactly the overlapping ones.
+    Both counts are binary searches, and the formula stays correct even when
+    legacy data already contains overlapping bookings.
+    """
+
+    __slots__ = ("starts", "ends", "bookings")
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.bookings: Dict[str, Tuple[datetime, datetime]] = {}
+
+    def overlap_count(self, start: datetime, end: datetime) -> int:
+        return bisect_left(self.starts, end) - bisect_right(self.ends, start)
+
+    def find_overlap(self, start: datetime, end: datetime, ignore: Optional[str] = None) -> Optional[str]:
+        for booking_id, (booking_start, booking_end) in self.bookings.items():
+            if booking_id != ignore and booking_start < end and booking_end > start:
+                return booking_id
+        return None
+
+    def add(self, booking_id: str, start: datetime, end: datetime):
+        insort(self.starts, start)
+        insort(self.ends, end)
+        self.bookings[booking_id] = (start, end)
+
+    def remove(self, booking_id: str):
+        start, end = self.bookings.pop(booking_id)
+        del self.starts[bisect_left(self.starts, start)]
+        del self.ends[bisect_left(self.ends, end)]
+
+class AvailabilityIndex:
+    """Per-process index of which ambulances are busy when.
+
+    The index is loaded from Postgres, updated incrementally by the booking and
+    ambulance handlers, and reloaded after AVAILABILITY_REFRESH_SECONDS so changes
+    made by other workers are picked up. Reserving a slot is synchronous, so two
+    requests in the same process cannot both claim an overlapping period.
+    """
+
+    def __init__(self, refresh_seconds: float = AVAILABILITY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.ambulances: Dict[str, dict] = {}
+        self.schedules: Dict[str, AmbulanceSchedule] = {}
+        self.booking_ambulance: Dict[str, str] = {}
+        self.positions = SpatialIndex()
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.refresh_seconds
+
+    async def load(self, conn):
+        cursor = await conn.execute(
+            "SELECT id, license_plate, model, capacity, status, current_latitude, current_longitude FROM ambulances"
+        )
+        ambulance_rows = await cursor.fetchall()
+        cursor = await conn.execute(
+            "SELECT id, assigned_ambulance_id, from_date, to_date FROM bookings "
+            "WHERE assigned_ambulance_id IS NOT NULL AND status = ANY(%s::booking_status[])",
+            (list(OCCUPYING_STATUSES),)
+        )
+        booking_rows = await cursor.fetchall()
+
+        self.ambulances = {}
+        self.schedules = {}
+        self.booking_ambulance = {}
+        positions = {}
+        for row in ambulance_rows:
+            self.upsert_ambulance(str(row[0]), row[1], row[2], row[3], row[4])
+            if row[5] is not None and row[6] is not None:
+                positions[str(row[0])] = (float(row[5]), float(row[6]))
+        self.positions = SpatialIndex.from_points(positions)
+        for booking_id, ambulance_id, from_date, to_date in booking_rows:
+            self.occupy(str(booking_id), str(ambulance_id), from_date, to_date, check=False)
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    async def ensure_loaded(self, conn):
+        if self.is_stale:
+            await self.load(conn)
+
+    def upsert_ambulance(self, ambulance_id: str, license_plate: str, model: str, capacity: int, status: str = "available"):
+        self.ambulances[ambulance_id] = {
+            "id": ambulance_id,
+            "license_plate": license_plate,
+            "model": model,
+            "capacity": capacity,
+            "status": status,
+        }
+        self.schedules.setdefault(ambulance_id, AmbulanceSchedule())
+
+    def update_position(self, ambulance_id: str, latitude: float, longitude: float):
+        self.positions.upsert(ambulance_id, latitude, longitude)
+
+    def remove_ambulance(self, ambulance_id: str):
+        self.ambulances.pop(ambulance_id, None)
+        self.positions.remove(ambulance_id)
+        schedule = self.schedules.pop(ambulance_id, None)
+        if schedule:
+            for booking_id in schedule.bookings:
+                self.booking_ambulance.pop(booking_id, None)
+
+    def is_free(self, ambulance_id: str, start: datetime, end: datetime, ignore_booking: Optional[str] = None) -> bool:
+        schedule = self.schedules.get(ambulance_id)
+        if schedule is None:
+            return True
+        count = schedule.overlap_count(start, end)
+        if ignore_booking is not None and ignore_booking in schedule.bookings:
+            booking_start, booking_end = schedule.bookings[ignore_booking]
+            if booking_start < end and booking_end > start:
+                count -= 1
+        return count <= 0
+
+    def available(self, start: datetime, end: datetime, min_capacity: int = 0) -> List[dict]:
+        """Ambulances in `available` status with no occupying booking overlapping [start, end)"""
+        return [
+            ambulance for ambulance_id, ambulance in self.ambulances.items()
+            if ambulance["status"] == "available"
+            and ambulance["capacity"] >= min_capacity
+            and self.is_free(ambulance_id, start, end)
+        ]
+
+    def nearest_available(self, latitude: float, longitude: float, n: int = 5, start: Optional[datetime] = None, end: Optional[datetime] = None, min_capacity: int = 0, max_km: Optional[float] = None) -> List[Tuple[dict, float]]:
+        """Closest ambulances by last reported position that are available, optionally for [start, end)"""
+        def eligible(ambulance_id: str) -> bool:
+            ambulance = self.ambulances.get(ambulance_id)
+            if ambulance is None or ambulance["status"] != "available" or ambulance["capacity"] < min_capacity:
+                return False
+            return start is None or end is None or self.is_free(ambulance_id, start, end)
+
+        nearest = self.positions.nearest(latitude, longitude, n, max_km=max_km, predicate=eligible)
+        return [(self.ambulances[ambulance_id], distance) for ambulance_id, distance in nearest]
+
+    def occupy(self, booking_id: str, ambulance_id: str, start: datetime, end: datetime, check: bool = True):
+        """Record `booking_id` on `ambulance_id`, moving it off any previous ambulance.
+
+        Raises BookingConflict, leaving the index unchanged, when `check` is set and
+        the period overlaps another booking of that ambulance.
+        """
+        schedule = self.schedules.setdefault(ambulance_id, AmbulanceSchedule())
+        if check and not self.is_free(ambulance_id, start, end, ignore_booking=booking_id):
+            raise BookingConflict(ambulance_id, schedule.find_overlap(start, end, ignore=booking_id))
+        self.release(booking_id)
+        schedule.add(booking_id, start, end)
+        self.booking_ambulance[booking_id] = ambulance_id
+
+    def release(self, booking_id: str):
+        ambulance_id = self.booking_ambulance.pop(booking_id, None)
+        if ambulance_id is None:
+            return None
+        schedule = self.schedules.get(ambulance_id)
+        if schedule and booking_id in schedule.bookings:
+            schedule.remove(booking_id)
+        return ambulance_id
+
+    def booking_slot(self, booking_id: str):
+        ambulance_id = self.booking_ambulance.get(booking_id)
+        if ambulance_id is None:
+            return None
+        start, end = self.schedules[ambulance_id].bookings[booking_id]
+        return ambulance_id, start, end
+
+availability_index = AvailabilityIndex()
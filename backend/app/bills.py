@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, NamedTuple, Optional
+
+BILL_UPLOAD_DIR = os.getenv("BILL_UPLOAD_DIR", "uploads/bills")
+BILL_MAX_BYTES = int(os.getenv("BILL_MAX_BYTES", str(20 * 1024 * 1024)))
+BILL_CHUNK_SIZE = 1024 * 1024
+# When set (e.g. "/protected-bills/"), downloads are handed to the reverse proxy via
+# X-Accel-Redirect so nginx serves the file itself with sendfile and range support.
+BILL_ACCEL_REDIRECT_PREFIX = os.getenv("BILL_ACCEL_REDIRECT_PREFIX", "")
+
+BILL_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "heic": "image/heic",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tif": "image/tiff",
+    "tiff": "image/tiff",
+}
+# One extension per media type, so the same bytes always land on the same path
+BILL_EXTENSION_ALIASES = {"jpeg": "jpg", "tiff": "tif"}
+MEDIA_TYPE_EXTENSIONS = {media_type: extension for extension, media_type in BILL_MEDIA_TYPES.items() if extension not in BILL_EXTENSION_ALIASES}
+BILL_SIGNATURES = (
+    (b"%PDF-", "pdf"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"II*\x00", "tif"),
+    (b"MM\x00*", "tif"),
+    (b"BM", "bmp"),
+)
+HEIC_BRANDS = {b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1"}
+
+class BillTooLarge(Exception):
+    pass
+
+class StoredBill(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    created: bool
+
+def bill_extension(filename: Optional[str]) -> str:
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    extension = re.sub(r"[^a-z0-9]", "", extension)[:10]
+    return BILL_EXTENSION_ALIASES.get(extension, extension) or "bin"
+
+def detect_bill_extension(head: bytes, content_type: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """Extension for a bill starting with `head`: from its magic bytes, else the declared content type, else the filename"""
+    for signature, extension in BILL_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIC_BRANDS:
+        return "heic"
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return MEDIA_TYPE_EXTENSIONS.get(media_type) or bill_extension(filename)
+
+def bill_path(sha256: str, extension: str, root: str = BILL_UPLOAD_DIR) -> str:
+    # Two-character fan-out keeps directories small once there are many receipts
+    return os.path.join(root, sha256[:2], f"{sha256}.{extension}")
+
+def _write_content_addressed(source: BinaryIO, content_type: Optional[str], filename: Optional[str], root: str, max_bytes: int) -> StoredBill:
+    """Copy `source` into the store in chunks, hashing as it goes. Runs in a worker thread."""
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while chunk := source.read(BILL_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BillTooLarge(f"Bill exceeds the {max_bytes} byte limit")
+                if not head:
+                    head = chunk[:16]
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = bill_path(sha256, detect_bill_extension(head, content_type, filename), root)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+            return StoredBill(path, sha256, size, created=False)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return StoredBill(path, sha256, size, created=True)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+async def store_bill(upload, root: str = BILL_UPLOAD_DIR, max_bytes: int = BILL_MAX_BYTES) -> StoredBill:
+    """Store an UploadFile under its SHA-256 without touching the event loop; identical files are kept once.
+
+    The extension comes from the content, not the client's filename, so `.JPG`, `.jpeg`
+    and an extensionless upload of the same photo share one file.
+    """
+    return await asyncio.to_thread(_write_content_addressed, upload.file, upload.content_type, upload.filename, root, max_bytes)
+
+def resolve_bill_path(path: str, root: str = BILL_UPLOAD_DIR) -> Optional[str]:
+    """Absolute path of a stored bill, or None if it is missing or outside the upload dir"""
+    root = os.path.realpath(root)
+    full_path = os.path.realpath(path)
+    if os.path.commonpath([root, full_path]) != root or not os.path.isfile(full_path):
+        return None
+    return full_path
+
+def bill_media_type(path: str) -> str:
+    return BILL_MEDIA_TYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
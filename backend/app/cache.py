@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import psycopg
+
+from app.db import DATABASE_URL
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_RECONNECT_SECONDS = float(os.getenv("RESPONSE_CACHE_RECONNECT_SECONDS", "5"))
+# Triggers from migration 0009 notify this channel with the name of every cached table written
+RESPONSE_CACHE_CHANNEL = "response_cache"
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    expires_at: float
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+class ResponseCache:
+    """Serialized JSON responses keyed by resource and query string, dropped when the resource changes.
+
+    Handlers that write a table call `invalidate` with its resource name after committing,
+    and `listen_for_invalidations` does the same for writes made by other workers. Each
+    resource has a version that `invalidate` bumps; a response is only stored if the version
+    is unchanged since before its query ran, so a read racing a write is never cached. While
+    `listening` is False the cache is bypassed, as other workers' writes would go unnoticed.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self.versions: Dict[str, int] = {}
+        self.clears = 0
+        self.hits = 0
+        self.misses = 0
+        self.listening = True
+
+    def version(self, resource: str) -> int:
+        return self.versions.get(resource, 0) + self.clears
+
+    def get(self, resource: str, key: str) -> Optional[CachedResponse]:
+        entry = self.entries.get((resource, key)) if self.listening else None
+        if entry is None or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+        self.entries.move_to_end((resource, key))
+        self.hits += 1
+        return entry
+
+    def put(self, resource: str, key: str, body: bytes, version: int) -> CachedResponse:
+        entry = CachedResponse(body, make_etag(body), time.monotonic() + self.ttl_seconds)
+        if version != self.version(resource) or not self.listening:
+            return entry
+        self.entries[(resource, key)] = entry
+        self.entries.move_to_end((resource, key))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *resources: str):
+        for resource in resources:
+            self.versions[resource] = self.versions.get(resource, 0) + 1
+        stale = [key for key in self.entries if key[0] in resources]
+        for key in stale:
+            del self.entries[key]
+
+    def clear(self):
+        self.clears += 1
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "max_size": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+response_cache = ResponseCache()
+
+async def listen_for_invalidations(cache: ResponseCache = response_cache, url: str = DATABASE_URL, reconnect_seconds: float = RESPONSE_CACHE_RECONNECT_SECONDS):
+    """Invalidate cached resources as any worker commits writes to them, until cancelled.
+
+    Holds its own connection outside the pool. The cache is bypassed until the connection
+    is listening and again whenever it drops, and emptied on every (re)connect since
+    notifications sent in between were missed.
+    """
+    while True:
+        cache.listening = False
+        try:
+            async with await psycopg.AsyncConnection.connect(url, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {RESPONSE_CACHE_CHANNEL}")
+                cache.clear()
+                cache.listening = True
+                async for notify in conn.notifies():
+                    cache.invalidate(notify.payload)
+        except psycopg.Error as e:
+            print(f"Response cache listener disconnected, retrying in {reconnect_seconds}s: {e}")
+        finally:
+            cache.listening = False
+        await asyncio.sleep(reconnect_seconds)
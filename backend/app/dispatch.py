@@ -0,0 +1,280 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.geo import haversine_matrix
+
+DISPATCH_AVG_SPEED_KMH = float(os.getenv("DISPATCH_AVG_SPEED_KMH", "30"))
+DISPATCH_TIME_LIMIT_SECONDS = float(os.getenv("DISPATCH_TIME_LIMIT_SECONDS", "5"))
+
+# Assigned trips this far outside the window still constrain the first and last trips in it
+DISPATCH_CONTEXT = timedelta(hours=12)
+
+class Trip:
+    __slots__ = ("booking_id", "start", "end", "day", "pickup", "drop", "ambulance_id", "from_date", "to_date")
+
+    def __init__(self, booking_id: str, from_date: datetime, to_date: datetime, pickup: Tuple[float, float], drop: Tuple[float, float], ambulance_id: Optional[str] = None):
+        self.booking_id = booking_id
+        self.from_date = from_date
+        self.to_date = to_date
+        self.start = from_date.timestamp()
+        self.end = to_date.timestamp()
+        self.day = from_date.date()
+        self.pickup = pickup
+        self.drop = drop
+        self.ambulance_id = ambulance_id
+
+    @property
+    def fixed(self) -> bool:
+        return self.ambulance_id is not None
+
+class DispatchPlanner:
+    """Assigns pending trips to ambulance routes minimising deadhead distance.
+
+    Every ambulance keeps a time-ordered route of trips. A trip fits between two
+    neighbours when the ambulance can drive from the previous drop-off to the pickup,
+    and from the trip's drop-off to the next pickup, at DISPATCH_AVG_SPEED_KMH in the
+    gaps between them. The cost of a slot is the deadhead it adds; the first trip of
+    a route is reached from the ambulance's last reported position, or for free when
+    it has none.
+
+    Pending trips are placed by cheapest insertion in pickup order, then a relocate
+    local search moves single trips to cheaper slots and retries unassigned ones until
+    no move improves or the time limit is reached. Slot costs for one trip are
+    evaluated against every ambulance at once from a precomputed distance matrix.
+    """
+
+    def __init__(self, trips: List[Trip], ambulance_ids: List[str], driver_days: Dict[date, Set[str]], positions: Optional[Dict[str, Tuple[float, float]]] = None, speed_kmh: float = DISPATCH_AVG_SPEED_KMH):
+        self.trips = trips
+        self.ambulance_ids = list(ambulance_ids)
+        ambulance_pos = {ambulance_id: pos for pos, ambulance_id in enumerate(self.ambulance_ids)}
+        self.seconds_per_km = 3600.0 / speed_kmh
+
+        count = len(trips)
+        self.starts = np.array([trip.start for trip in trips], dtype=np.float64)
+        self.ends = np.array([trip.end for trip in trips], dtype=np.float64)
+        pickups = np.array([trip.pickup for trip in trips], dtype=np.float64).reshape(count, 2)
+        drops = np.array([trip.drop for trip in trips], dtype=np.float64).reshape(count, 2)
+        # deadhead[i, j]: km from the drop-off of trip i to the pickup of trip j
+        self.deadhead = haversine_matrix(drops[:, 0], drops[:, 1], pickups[:, 0], pickups[:, 1]).astype(np.float32)
+        # start_deadhead[a, j]: km from ambulance a's last reported position to the pickup of trip j
+        self.start_deadhead = np.zeros((len(self.ambulance_ids), count), dtype=np.float32)
+        positions = positions or {}
+        located = [pos for pos, ambulance_id in enumerate(self.ambulance_ids) if ambulance_id in positions]
+        if located and count:
+            points = np.array([positions[self.ambulance_ids[pos]] for pos in located], dtype=np.float64)
+            self.start_deadhead[located] = haversine_matrix(points[:, 0], points[:, 1], pickups[:, 0], pickups[:, 1])
+        self.ambulance_range = np.arange(len(self.ambulance_ids))
+
+        self.driver_masks = {
+            day: np.array([ambulance_id in ambulances for ambulance_id in self.ambulance_ids], dtype=bool)
+            for day, ambulances in driver_days.items()
+        }
+        self.no_driver = np.zeros(len(self.ambulance_ids), dtype=bool)
+
+        self.route_trips: List[List[int]] = [[] for _ in self.ambulance_ids]
+        self.route_starts: List[List[float]] = [[] for _ in self.ambulance_ids]
+        self.assigned = np.full(count, -1, dtype=np.int64)
+        self.pending = []
+        for index, trip in enumerate(trips):
+            if trip.fixed:
+                if trip.ambulance_id in ambulance_pos:
+                    self._insert(index, ambulance_pos[trip.ambulance_id])
+            else:
+                self.pending.append(index)
+        self.pending.sort(key=lambda index: self.starts[index])
+
+    def _insert(self, index: int, ambulance: int):
+        pos = bisect_left(self.route_starts[ambulance], self.starts[index])
+        self.route_starts[ambulance].insert(pos, self.starts[index])
+        self.route_trips[ambulance].insert(pos, index)
+        self.assigned[index] = ambulance
+
+    def _remove(self, index: int) -> int:
+        ambulance = int(self.assigned[index])
+        pos = self.route_trips[ambulance].index(index)
+        del self.route_starts[ambulance][pos]
+        del self.route_trips[ambulance][pos]
+        self.assigned[index] = -1
+        return ambulance
+
+    def _slot_cost(self, index: int) -> float:
+        """Deadhead that the trip currently adds to its route"""
+        ambulance = int(self.assigned[index])
+        route = self.route_trips[ambulance]
+        pos = route.index(index)
+        prev_index = route[pos - 1] if pos > 0 else -1
+        next_index = route[pos + 1] if pos + 1 < len(route) else -1
+        if prev_index >= 0:
+            cost = self.deadhead[prev_index, index]
+        else:
+            cost = self.start_deadhead[ambulance, index]
+        if next_index >= 0:
+            cost += self.deadhead[index, next_index]
+            if prev_index >= 0:
+                cost -= self.deadhead[prev_index, next_index]
+            else:
+                cost -= self.start_deadhead[ambulance, next_index]
+        return float(cost)
+
+    def best_insertion(self, index: int) -> Tuple[Optional[int], float]:
+        """Cheapest feasible (ambulance, added deadhead) for an unassigned trip"""
+        start = self.starts[index]
+        prev_list = []
+        next_list = []
+        for route_starts, route_trips in zip(self.route_starts, self.route_trips):
+            pos = bisect_left(route_starts, start)
+            prev_list.append(route_trips[pos - 1] if pos else -1)
+            next_list.append(route_trips[pos] if pos < len(route_trips) else -1)
+        prev_index = np.array(prev_list, dtype=np.int64)
+        next_index = np.array(next_list, dtype=np.int64)
+
+        has_prev = prev_index >= 0
+        has_next = next_index >= 0
+        prev_safe = np.where(has_prev, prev_index, 0)
+        next_safe = np.where(has_next, next_index, 0)
+
+        to_pickup = np.where(has_prev, self.deadhead[prev_safe, index], self.start_deadhead[:, index])
+        from_drop = np.where(has_next, self.deadhead[index, next_safe], 0.0)
+        bridged = np.where(
+            has_next,
+            np.where(has_prev, self.deadhead[prev_safe, next_safe], self.start_deadhead[self.ambulance_range, next_safe]),
+            0.0
+        )
+
+        feasible = self.driver_masks.get(self.trips[index].day, self.no_driver).copy()
+        feasible &= ~has_prev | (self.ends[prev_safe] + to_pickup * self.seconds_per_km <= start)
+        feasible &= ~has_next | (self.ends[index] + from_drop * self.seconds_per_km <= self.starts[next_safe])
+        if not feasible.any():
+            return None, float("inf")
+
+        cost = np.where(feasible, to_pickup + from_drop - bridged, np.inf)
+        ambulance = int(np.argmin(cost))
+        return ambulance, float(cost[ambulance])
+
+    def solve(self, time_limit: float = DISPATCH_TIME_LIMIT_SECONDS) -> dict:
+        started = time.perf_counter()
+        deadline = started + time_limit
+
+        for index in self.pending:
+            ambulance, _ = self.best_insertion(index)
+            if ambulance is not None:
+                self._insert(index, ambulance)
+
+        passes = 0
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            passes += 1
+            for index in self.pending:
+                if time.perf_counter() >= deadline:
+                    break
+                if self.assigned[index] < 0:
+                    ambulance, _ = self.best_insertion(index)
+                    if ambulance is not None:
+                        self._insert(index, ambulance)
+                        improved = True
+                    continue
+                current_cost = self._slot_cost(index)
+                previous = self._remove(index)
+                ambulance, cost = self.best_insertion(index)
+                if ambulance is not None and ambulance != previous and cost < current_cost - 1e-6:
+                    self._insert(index, ambulance)
+                    improved = True
+                else:
+                    self._insert(index, previous)
+
+        return self._plan(passes, time.perf_counter() - started)
+
+    def _plan(self, passes: int, elapsed: float) -> dict:
+        deadhead_to = {}
+        for ambulance, route in enumerate(self.route_trips):
+            if route:
+                deadhead_to[route[0]] = float(self.start_deadhead[ambulance, route[0]])
+            for prev_index, index in zip(route, route[1:]):
+                deadhead_to[index] = float(self.deadhead[prev_index, index])
+
+        assignments = []
+        unassigned = []
+        for index in self.pending:
+            trip = self.trips[index]
+            if self.assigned[index] < 0:
+                unassigned.append(trip.booking_id)
+                continue
+            assignments.append({
+                "booking_id": trip.booking_id,
+                "ambulance_id": self.ambulance_ids[int(self.assigned[index])],
+                "from_date": trip.from_date,
+                "to_date": trip.to_date,
+                "deadhead_km": round(deadhead_to.get(index, 0.0), 3),
+            })
+
+        return {
+            "assignments": assignments,
+            "unassigned_booking_ids": unassigned,
+            "total_deadhead_km": round(sum(item["deadhead_km"] for item in assignments), 3),
+            "local_search_passes": passes,
+            "solve_ms": round(elapsed * 1000, 1),
+        }
+
+async def load_dispatch_problem(conn, window_start: datetime, window_end: datetime, min_capacity: int = 1):
+    """Pending trips in the window plus the assigned trips, fleet and driver rota around them"""
+    cursor = await conn.execute("""
+        SELECT b.id, b.from_date, b.to_date, pl.latitude, pl.longitude, dl.latitude, dl.longitude, b.assigned_ambulance_id
+        FROM bookings b
+        JOIN locations pl ON b.pickup_location_id = pl.id
+        JOIN locations dl ON b.drop_location_id = dl.id
+        WHERE (b.status = 'pending' AND b.from_date >= %s AND b.from_date < %s)
+           OR (b.status IN ('assigned', 'in_progress') AND b.assigned_ambulance_id IS NOT NULL
+               AND b.period && tstzrange(%s, %s, '[)'))
+    """, (window_start, window_end, window_start - DISPATCH_CONTEXT, window_end + DISPATCH_CONTEXT))
+    trips = [
+        Trip(
+            str(row[0]), row[1], row[2],
+            (float(row[3]), float(row[4])), (float(row[5]), float(row[6])),
+            str(row[7]) if row[7] is not None else None
+        )
+        for row in await cursor.fetchall()
+    ]
+
+    cursor = await conn.execute(
+        "SELECT id, current_latitude, current_longitude FROM ambulances WHERE status = 'available' AND capacity >= %s ORDER BY id",
+        (min_capacity,)
+    )
+    ambulance_ids = []
+    positions = {}
+    for ambulance_id, latitude, longitude in await cursor.fetchall():
+        ambulance_ids.append(str(ambulance_id))
+        if latitude is not None and longitude is not None:
+            positions[str(ambulance_id)] = (float(latitude), float(longitude))
+
+    cursor = await conn.execute(
+        "SELECT ambulance_id, assignment_date FROM driver_assignments WHERE assignment_date BETWEEN %s AND %s",
+        (window_start.date(), window_end.date())
+    )
+    driver_days: Dict[date, Set[str]] = {}
+    for ambulance_id, assignment_date in await cursor.fetchall():
+        driver_days.setdefault(assignment_date, set()).add(str(ambulance_id))
+
+    return trips, ambulance_ids, driver_days, positions
+
+async def plan_dispatch(conn, window_start: datetime, window_end: datetime, min_capacity: int = 1, time_limit: float = DISPATCH_TIME_LIMIT_SECONDS) -> dict:
+    trips, ambulance_ids, driver_days, positions = await load_dispatch_problem(conn, window_start, window_end, min_capacity)
+    if not trips or not ambulance_ids:
+        return {
+            "assignments": [],
+            "unassigned_booking_ids": [trip.booking_id for trip in trips if not trip.fixed],
+            "total_deadhead_km": 0.0,
+            "local_search_passes": 0,
+            "solve_ms": 0.0,
+        }
+    # Building the distance matrix and solving are CPU bound; keep them off the event loop
+    return await asyncio.to_thread(solve_dispatch, trips, ambulance_ids, driver_days, positions, time_limit)
+
+def solve_dispatch(trips: List[Trip], ambulance_ids: List[str], driver_days: Dict[date, Set[str]], positions: Optional[Dict[str, Tuple[float, float]]] = None, time_limit: float = DISPATCH_TIME_LIMIT_SECONDS) -> dict:
+    return DispatchPlanner(trips, ambulance_ids, driver_days, positions).solve(time_limit)
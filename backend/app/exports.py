@@ -0,0 +1,176 @@
+import asyncio
+import io
+import os
+import uuid
+from datetime import date
+from typing import AsyncIterator, List, NamedTuple, Sequence, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet exports are unavailable without pyarrow
+    pyarrow = None
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+class ExportDataset(NamedTuple):
+    """A billing extract: `columns` are (name, SQL expression, SQL type) read from `source`,
+    restricted to rows whose `date_column` falls in the requested range"""
+    name: str
+    source: str
+    date_column: str
+    order_by: str
+    columns: Sequence[Tuple[str, str, str]]
+
+# Straight-line distance between pickup and drop; there is no odometer data
+PICKUP_DROP_KM = """
+    2 * 6371 * asin(sqrt(
+        power(sin(radians(dl.latitude - pl.latitude) / 2), 2) +
+        cos(radians(pl.latitude)) * cos(radians(dl.latitude)) * power(sin(radians(dl.longitude - pl.longitude) / 2), 2)
+    ))
+"""
+
+BOOKING_COLUMNS = [
+    ("id", "b.id", "text"),
+    ("status", "b.status", "text"),
+    ("from_date", "b.from_date", "timestamptz"),
+    ("to_date", "b.to_date", "timestamptz"),
+    ("name", "b.name", "text"),
+    ("phone", "b.phone", "text"),
+    ("email", "b.email", "text"),
+    ("pickup_address", "pl.address", "text"),
+    ("pickup_latitude", "pl.latitude", "float8"),
+    ("pickup_longitude", "pl.longitude", "float8"),
+    ("drop_address", "dl.address", "text"),
+    ("drop_latitude", "dl.latitude", "float8"),
+    ("drop_longitude", "dl.longitude", "float8"),
+    ("ambulance_id", "b.assigned_ambulance_id", "text"),
+    ("ambulance_plate", "a.license_plate", "text"),
+    ("created_at", "b.created_at", "timestamptz"),
+]
+
+BOOKING_SOURCE = """
+    bookings b
+    JOIN locations pl ON b.pickup_location_id = pl.id
+    JOIN locations dl ON b.drop_location_id = dl.id
+    LEFT JOIN ambulances a ON b.assigned_ambulance_id = a.id
+"""
+
+EXPORT_DATASETS = {
+    "bookings": ExportDataset("bookings", BOOKING_SOURCE, "b.from_date", "b.from_date, b.id", BOOKING_COLUMNS),
+    "trips": ExportDataset(
+        "trips",
+        BOOKING_SOURCE + """
+    LEFT JOIN driver_assignments da ON da.ambulance_id = b.assigned_ambulance_id AND da.assignment_date = b.from_date::date
+    LEFT JOIN drivers d ON da.driver_id = d.id
+    WHERE b.status = 'completed'
+""",
+        "b.from_date",
+        "b.from_date, b.id",
+        BOOKING_COLUMNS[:4] + BOOKING_COLUMNS[7:15] + [
+            ("driver_id", "d.id", "text"),
+            ("driver_name", "d.name", "text"),
+            ("duration_minutes", "EXTRACT(EPOCH FROM b.to_date - b.from_date) / 60", "float8"),
+            ("straight_line_km", PICKUP_DROP_KM, "float8"),
+        ],
+    ),
+    "expenses": ExportDataset(
+        "expenses",
+        """
+    expenses e
+    LEFT JOIN employees emp ON e.employee_id = emp.id
+    LEFT JOIN ambulances a ON e.ambulance_id = a.id
+""",
+        "e.expense_date",
+        "e.expense_date, e.id",
+        [
+            ("id", "e.id", "text"),
+            ("expense_date", "e.expense_date", "date"),
+            ("category", "e.category", "text"),
+            ("type", "e.type", "text"),
+            ("amount", "e.amount", "float8"),
+            ("description", "e.description", "text"),
+            ("employee_id", "e.employee_id", "text"),
+            ("employee_name", "emp.name", "text"),
+            ("ambulance_id", "e.ambulance_id", "text"),
+            ("ambulance_plate", "a.license_plate", "text"),
+            ("has_bill", "e.bill_file_path IS NOT NULL", "bool"),
+            ("created_at", "e.created_at", "timestamptz"),
+        ],
+    ),
+}
+
+def export_query(dataset: ExportDataset) -> str:
+    """SELECT for `dataset` taking %(from_date)s (inclusive) and %(to_date)s (exclusive)"""
+    columns = ", ".join(f"({expression})::{type_} AS {name}" for name, expression, type_ in dataset.columns)
+    joiner = "AND" if "WHERE" in dataset.source else "WHERE"
+    return (
+        f"SELECT {columns} FROM {dataset.source} "
+        f"{joiner} {dataset.date_column} >= %(from_date)s AND {dataset.date_column} < %(to_date)s "
+        f"ORDER BY {dataset.order_by}"
+    )
+
+async def stream_csv(conn, dataset: ExportDataset, from_date: date, to_date: date) -> AsyncIterator[bytes]:
+    """CSV with a header row, produced by the server with COPY and passed through chunk by chunk"""
+    params = {"from_date": from_date, "to_date": to_date}
+    async with conn.cursor() as cur:
+        async with cur.copy(f"COPY ({export_query(dataset)}) TO STDOUT WITH (FORMAT csv, HEADER)", params) as copy:
+            async for chunk in copy:
+                yield bytes(chunk)
+
+ARROW_TYPES = {
+    "text": lambda: pyarrow.string(),
+    "timestamptz": lambda: pyarrow.timestamp("us", tz="UTC"),
+    "date": lambda: pyarrow.date32(),
+    "float8": lambda: pyarrow.float64(),
+    "bool": lambda: pyarrow.bool_(),
+}
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that collects what the Parquet writer emits until it is drained"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def _write_row_group(writer, schema, rows: list):
+    columns = list(zip(*rows))
+    writer.write_batch(pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    ))
+
+async def stream_parquet(conn, dataset: ExportDataset, from_date: date, to_date: date, batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[bytes]:
+    """Parquet read through a server-side cursor; each batch becomes a row group that is sent as soon as it is encoded"""
+    schema = pyarrow.schema([(name, ARROW_TYPES[type_]()) for name, _, type_ in dataset.columns])
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async with conn.cursor(name=f"export_{dataset.name}_{uuid.uuid4().hex}") as cur:
+            await cur.execute(export_query(dataset), {"from_date": from_date, "to_date": to_date})
+            while rows := await cur.fetchmany(batch_rows):
+                # Encoding and compression are CPU bound; keep them off the event loop
+                await asyncio.to_thread(_write_row_group, writer, schema, rows)
+                yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,139 @@
+import math
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+def haversine_matrix(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distances in km between every point of set 1 (rows) and set 2 (columns)"""
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))[None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    return float(haversine_matrix([lat1], [lon1], [lat2], [lon2])[0, 0])
+
+class SpatialIndex:
+    """Points bucketed into square lat/lon grid cells of `cell_km` (north-south) for proximity queries.
+
+    `nearest` scans rings of cells outwards from the query point and stops once
+    the n-th best distance is closer than anything an unscanned ring could hold,
+    so a query touches only the handful of cells around the point regardless of
+    how many points are indexed. Exact distances for the candidates are computed
+    in one vectorised haversine call.
+    """
+
+    def __init__(self, cell_km: float = 2.0):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.cells: Dict[Tuple[int, int], Set[str]] = {}
+        self.points: Dict[str, Tuple[float, float]] = {}
+
+    @classmethod
+    def from_points(cls, points: Dict[str, Tuple[float, float]], per_cell: float = 4.0, min_cell_km: float = 0.5) -> "SpatialIndex":
+        """Index sized so that an average occupied cell holds about `per_cell` points"""
+        cell_km = 2.0
+        if len(points) > 1:
+            lats = np.array([point[0] for point in points.values()])
+            lons = np.array([point[1] for point in points.values()])
+            height_km = np.ptp(lats) * KM_PER_DEGREE
+            width_km = np.ptp(lons) * KM_PER_DEGREE * math.cos(math.radians(float(np.mean(lats))))
+            area = max(height_km, min_cell_km) * max(width_km, min_cell_km)
+            cell_km = max(math.sqrt(area * per_cell / len(points)), min_cell_km)
+        index = cls(cell_km)
+        for key, (latitude, longitude) in points.items():
+            index.upsert(key, latitude, longitude)
+        return index
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg)
+
+    def upsert(self, key: str, latitude: float, longitude: float):
+        self.remove(key)
+        self.points[key] = (latitude, longitude)
+        self.cells.setdefault(self._cell(latitude, longitude), set()).add(key)
+
+    def remove(self, key: str):
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def _ring(self, center: Tuple[int, int], radius: int):
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for d in range(-radius, radius + 1):
+            yield row - radius, col + d
+            yield row + radius, col + d
+        for d in range(-radius + 1, radius):
+            yield row + d, col - radius
+            yield row + d, col + radius
+
+    def _ring_clearance_km(self, latitude: float, radius: int) -> float:
+        """Lower bound on the distance to any point outside rings 0..radius"""
+        # Longitude cells shrink towards the poles, so use the narrowest row the rings reach
+        widest_lat = min(abs(latitude) + (radius + 1) * self.cell_deg, 90.0)
+        shrink = min(1.0, math.cos(math.radians(widest_lat)))
+        return radius * self.cell_deg * KM_PER_DEGREE * shrink
+
+    def nearest(self, latitude: float, longitude: float, n: int = 5, max_km: Optional[float] = None, predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Up to `n` (key, km) pairs closest to the point, nearest first, optionally filtered"""
+        if not self.points or n <= 0:
+            return []
+
+        center = self._cell(latitude, longitude)
+        candidates: List[str] = []
+        best: List[Tuple[str, float]] = []
+        seen = 0
+        radius = 0
+        while True:
+            exhaustive = (2 * radius + 1) ** 2 > len(self.cells)
+            if exhaustive:
+                # The rings now span more cells than are occupied: finish with one pass over the rest
+                cells = [
+                    bucket for cell, bucket in self.cells.items()
+                    if max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) >= radius
+                ]
+            else:
+                cells = [self.cells[cell] for cell in self._ring(center, radius) if cell in self.cells]
+
+            found = []
+            for bucket in cells:
+                seen += len(bucket)
+                found.extend(key for key in bucket if predicate is None or predicate(key))
+            if found:
+                candidates.extend(found)
+                lats = [self.points[key][0] for key in candidates]
+                lons = [self.points[key][1] for key in candidates]
+                distances = haversine_matrix([latitude], [longitude], lats, lons)[0]
+                order = np.argsort(distances)[:n]
+                best = [(candidates[i], float(distances[i])) for i in order]
+                candidates = [key for key, _ in best]
+
+            if exhaustive or seen >= len(self.points):
+                break
+            clearance = self._ring_clearance_km(latitude, radius)
+            if len(best) >= n and best[-1][1] <= clearance:
+                break
+            if max_km is not None and clearance >= max_km:
+                break
+            radius += 1
+
+        if max_km is not None:
+            best = [(key, distance) for key, distance in best if distance <= max_km]
+        return best
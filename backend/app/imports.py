@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+import os
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "200000"))
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+class ImportFileError(Exception):
+    """The upload as a whole cannot be read; the message is safe to show to the caller"""
+
+class RowError(NamedTuple):
+    line: int
+    message: str
+
+class ImportSpec:
+    """How rows of one entity are imported.
+
+    Each row is validated with `model` and turned into a tuple of `columns` by `to_row`
+    (which may raise ValueError). Rows are then copied into a temporary staging table,
+    checked there against the SQL `checks` (predicate on `s` that is true for a bad row,
+    message) and `unique` columns (within the file and against `table`), and finally
+    written with `insert_select`, the SELECT list over `s` matching `columns`. A row that
+    `match` (predicate on `t` and `s`) pairs with an existing row updates that row instead
+    of inserting a new one, so importing the same file twice does not duplicate it.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        model: Type[BaseModel],
+        columns: Sequence[Tuple[str, str]],
+        to_row: Callable[[BaseModel], tuple],
+        unique: Sequence[str] = (),
+        checks: Sequence[Tuple[str, str]] = (),
+        insert_select: Optional[str] = None,
+        match: Optional[str] = None,
+    ):
+        self.table = table
+        self.model = model
+        self.columns = columns
+        self.to_row = to_row
+        self.unique = unique
+        self.checks = checks
+        self.column_names = ", ".join(name for name, _ in columns)
+        self.insert_select = insert_select or ", ".join(f"s.{name}" for name, _ in columns)
+        self.match = match
+
+    @property
+    def staging(self) -> str:
+        return f"import_{self.table}"
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> str:
+    if requested:
+        return requested
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def _blank_to_none(record: dict) -> dict:
+    return {key.strip(): (None if value is None or value.strip() == "" else value.strip()) for key, value in record.items() if key}
+
+def read_records(source: BinaryIO, format: str) -> Iterator[Tuple[int, dict]]:
+    """(line number, record) pairs from a CSV file with a header row or from NDJSON"""
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    try:
+        if format == "ndjson":
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ImportFileError(f"Line {line_number} is not valid JSON: {e}")
+                if not isinstance(record, dict):
+                    raise ImportFileError(f"Line {line_number} is not a JSON object")
+                yield line_number, record
+        else:
+            reader = csv.DictReader(text)
+            if not reader.fieldnames:
+                raise ImportFileError("CSV file has no header row")
+            for record in reader:
+                yield reader.line_num, _blank_to_none(record)
+    except UnicodeDecodeError:
+        raise ImportFileError("File is not UTF-8 encoded")
+    except csv.Error as e:
+        raise ImportFileError(f"Malformed CSV: {e}")
+    finally:
+        text.detach()
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+def validate_records(source: BinaryIO, format: str, spec: ImportSpec, max_rows: int = IMPORT_MAX_ROWS) -> Tuple[List[tuple], List[RowError]]:
+    """Parse and validate a whole upload; returns staging rows (line first) and rejected lines. Runs in a worker thread."""
+    rows = []
+    errors = []
+    validate = spec.model.model_validate
+    for count, (line, record) in enumerate(read_records(source, format), start=1):
+        if count > max_rows:
+            raise ImportFileError(f"File has more than {max_rows} rows")
+        try:
+            rows.append((line,) + spec.to_row(validate(record)))
+        except ValidationError as e:
+            errors.append(RowError(line, _describe(e)))
+        except ValueError as e:
+            errors.append(RowError(line, str(e)))
+    return rows, errors
+
+async def load_rows(conn, spec: ImportSpec, rows: List[tuple]) -> Tuple[List[tuple], List[tuple], List[RowError], int]:
+    """COPY rows into a staging table, check them, update the rows they match and insert the rest.
+
+    Returns (inserted rows and matched rows, each as (id, *columns), first rejected lines,
+    number rejected). The caller commits or rolls back; the staging table is dropped with
+    the transaction.
+    """
+    staging = spec.staging
+    column_definitions = ", ".join(f"{name} {type_}" for name, type_ in spec.columns)
+    await conn.execute(
+        f"""CREATE TEMP TABLE {staging} (
+                line INTEGER NOT NULL,
+                id UUID NOT NULL DEFAULT uuid_generate_v4(),
+                existing BOOLEAN NOT NULL DEFAULT false,
+                error TEXT,
+                {column_definitions}
+            ) ON COMMIT DROP"""
+    )
+
+    async with conn.cursor() as cur:
+        async with cur.copy(f"COPY {staging} (line, {spec.column_names}) FROM STDIN") as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+    for condition, message in spec.checks:
+        await conn.execute(f"UPDATE {staging} s SET error = %s WHERE s.error IS NULL AND ({condition})", (message,))
+    for column in spec.unique:
+        await conn.execute(
+            f"""UPDATE {staging} s SET error = %s
+                FROM (
+                    SELECT line, row_number() OVER (PARTITION BY {column} ORDER BY line) AS n
+                    FROM {staging} WHERE {column} IS NOT NULL
+                ) d
+                WHERE d.line = s.line AND d.n > 1 AND s.error IS NULL""",
+            (f"Duplicate {column} in file",)
+        )
+    if spec.match:
+        await conn.execute(
+            f"UPDATE {staging} s SET id = t.id, existing = true FROM {spec.table} t WHERE s.error IS NULL AND ({spec.match})"
+        )
+    for column in spec.unique:
+        # A matched row keeps its own values; any other row holding them is a conflict
+        await conn.execute(
+            f"UPDATE {staging} s SET error = %s FROM {spec.table} t WHERE t.{column} = s.{column} AND t.id <> s.id AND s.error IS NULL",
+            (f"{column} already exists",)
+        )
+
+    if spec.match:
+        await conn.execute(
+            f"""UPDATE {spec.table} t SET ({spec.column_names}) = ROW({spec.insert_select})
+                FROM {staging} s
+                WHERE s.existing AND s.error IS NULL AND t.id = s.id
+                  AND ROW({", ".join(f"t.{name}" for name, _ in spec.columns)}) IS DISTINCT FROM ROW({spec.insert_select})"""
+        )
+
+    # Rows that lose a race with a concurrent insert are skipped by ON CONFLICT and reported
+    await conn.execute(
+        f"""WITH inserted AS (
+                INSERT INTO {spec.table} (id, {spec.column_names})
+                SELECT s.id, {spec.insert_select} FROM {staging} s WHERE s.error IS NULL AND NOT s.existing
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            )
+            UPDATE {staging} s SET error = 'Conflicts with an existing row'
+            WHERE s.error IS NULL AND NOT s.existing AND NOT EXISTS (SELECT 1 FROM inserted i WHERE i.id = s.id)"""
+    )
+
+    cursor = await conn.execute(f"SELECT existing, id, {spec.column_names} FROM {staging} WHERE error IS NULL ORDER BY line")
+    inserted, matched = [], []
+    for existing, *row in await cursor.fetchall():
+        (matched if existing else inserted).append(tuple(row))
+    cursor = await conn.execute(f"SELECT line, error FROM {staging} WHERE error IS NOT NULL ORDER BY line LIMIT {IMPORT_MAX_REPORTED_ERRORS}")
+    errors = [RowError(line, error) for line, error in await cursor.fetchall()]
+    cursor = await conn.execute(f"SELECT count(*) FROM {staging} WHERE error IS NOT NULL")
+    error_count = (await cursor.fetchone())[0]
+    return inserted, matched, errors, error_count
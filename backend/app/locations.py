@@ -0,0 +1,158 @@
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "10000"))
+
+# 5 decimal places is ~1.1 m, well inside geocoder jitter for the same building
+COORDINATE_DECIMALS = 5
+
+def normalize_address(address: str) -> str:
+    """Case-, width- and whitespace-insensitive form of an address"""
+    address = unicodedata.normalize("NFKC", address).casefold()
+    return " ".join(address.replace(",", ", ").split()).strip(" ,.")
+
+def location_key(address: str, latitude: float, longitude: float) -> str:
+    return f"{normalize_address(address)}|{float(latitude):.{COORDINATE_DECIMALS}f}|{float(longitude):.{COORDINATE_DECIMALS}f}"
+
+class LocationCache:
+    """Bounded LRU of canonical key -> locations.id"""
+
+    def __init__(self, max_size: int = LOCATION_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        location_id = self.entries.get(key)
+        if location_id is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return location_id
+
+    def put(self, key: str, location_id: str):
+        self.entries[key] = location_id
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def update(self, entries: Dict[str, str]):
+        for key, location_id in entries.items():
+            self.put(key, location_id)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+location_cache = LocationCache()
+
+RESOLVE_LOCATION_SQL = """
+    WITH inserted AS (
+        INSERT INTO locations (address, latitude, longitude, canonical_key)
+        VALUES (%(address)s, %(latitude)s, %(longitude)s, %(key)s)
+        ON CONFLICT (canonical_key) DO NOTHING
+        RETURNING id
+    )
+    SELECT id FROM inserted
+    UNION ALL
+    SELECT id FROM locations WHERE canonical_key = %(key)s
+    LIMIT 1
+"""
+
+async def resolve_location(conn, address: str, latitude: float, longitude: float, resolved: Optional[Dict[str, str]] = None) -> str:
+    """Id of the canonical `locations` row for this address and position, creating it if needed.
+
+    A row inserted here only exists once the caller's transaction commits, so ids looked up
+    in the database are added to `resolved` (key -> id) rather than to the cache; the caller
+    passes that to `location_cache.update` after committing.
+    """
+    key = location_key(address, latitude, longitude)
+    location_id = location_cache.get(key)
+    if location_id is not None:
+        return location_id
+
+    params = {"address": address.strip(), "latitude": latitude, "longitude": longitude, "key": key}
+    row = None
+    # A row committed by a concurrent insert after our snapshot is invisible to the
+    # SELECT branch; the retry runs with a fresh snapshot and will see it.
+    for _ in range(2):
+        cursor = await conn.execute(RESOLVE_LOCATION_SQL, params)
+        row = await cursor.fetchone()
+        if row is not None:
+            break
+    if row is None:
+        raise RuntimeError(f"Could not resolve location {key!r}")
+
+    location_id = str(row[0])
+    if resolved is not None:
+        resolved[key] = location_id
+    return location_id
+
+def plan_location_merges(rows: List[Tuple]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Group (id, address, latitude, longitude, canonical_key, created_at) rows by key.
+
+    Returns ({duplicate_id: canonical_id}, {canonical_id: key}). A row that already
+    carries its key is kept as canonical, because running servers may have cached its
+    id; otherwise the oldest row wins.
+    """
+    groups: Dict[str, List[Tuple]] = {}
+    for row in rows:
+        groups.setdefault(location_key(row[1], row[2], row[3]), []).append(row)
+
+    merges: Dict[str, str] = {}
+    keys: Dict[str, str] = {}
+    for key, members in groups.items():
+        members.sort(key=lambda row: (row[4] != key, row[5] is None, row[5], str(row[0])))
+        canonical_id = str(members[0][0])
+        if members[0][4] != key:
+            keys[canonical_id] = key
+        for row in members[1:]:
+            merges[str(row[0])] = canonical_id
+    return merges, keys
+
+async def deduplicate_locations(conn) -> dict:
+    """Merge duplicate locations into one row per canonical key and repoint bookings.
+
+    Runs in the caller's transaction so either every booking moves or none do.
+    """
+    # Block concurrent inserts so no new keyed row can appear behind our snapshot
+    await conn.execute("LOCK TABLE locations IN SHARE ROW EXCLUSIVE MODE")
+    cursor = await conn.execute("SELECT id, address, latitude, longitude, canonical_key, created_at FROM locations")
+    rows = await cursor.fetchall()
+    merges, keys = plan_location_merges(rows)
+
+    await conn.execute("CREATE TEMP TABLE location_merges (duplicate_id UUID PRIMARY KEY, canonical_id UUID NOT NULL) ON COMMIT DROP")
+    async with conn.cursor() as cur:
+        async with cur.copy("COPY location_merges (duplicate_id, canonical_id) FROM STDIN") as copy:
+            for duplicate_id, canonical_id in merges.items():
+                await copy.write_row((duplicate_id, canonical_id))
+
+    pickups = await conn.execute(
+        "UPDATE bookings b SET pickup_location_id = m.canonical_id FROM location_merges m WHERE b.pickup_location_id = m.duplicate_id"
+    )
+    drops = await conn.execute(
+        "UPDATE bookings b SET drop_location_id = m.canonical_id FROM location_merges m WHERE b.drop_location_id = m.duplicate_id"
+    )
+    deleted = await conn.execute("DELETE FROM locations l USING location_merges m WHERE l.id = m.duplicate_id")
+
+    await conn.execute("CREATE TEMP TABLE location_keys (id UUID PRIMARY KEY, canonical_key TEXT NOT NULL) ON COMMIT DROP")
+    async with conn.cursor() as cur:
+        async with cur.copy("COPY location_keys (id, canonical_key) FROM STDIN") as copy:
+            for location_id, key in keys.items():
+                await copy.write_row((location_id, key))
+    await conn.execute("UPDATE locations l SET canonical_key = k.canonical_key FROM location_keys k WHERE l.id = k.id")
+
+    return {
+        "locations_before": len(rows),
+        "locations_after": len(rows) - deleted.rowcount,
+        "duplicates_removed": deleted.rowcount,
+        "pickups_repointed": pickups.rowcount,
+        "drops_repointed": drops.rowcount,
+        "keys_backfilled": len(keys),
+    }
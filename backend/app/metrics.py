@@ -0,0 +1,169 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Everything here is updated from the event loop thread only (database calls and handlers
+# run there; only CPU work is sent to threads), so plain increments need no locks.
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+UNMATCHED_ROUTE = "unmatched"
+BACKGROUND_ROUTE = "background"
+
+class Histogram:
+    """Counts per fixed upper bound; `counts[-1]` holds values above the last bucket"""
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class HistogramFamily:
+    """One Prometheus histogram metric with a child Histogram per label combination"""
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = Histogram(self.buckets)
+        return child
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        bounds = [repr(bucket) for bucket in self.buckets] + ["+Inf"]
+        for values, child in list(self.children.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {child.sum}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+
+HTTP_REQUEST_DURATION = HistogramFamily(
+    "http_request_duration_seconds", "Time to serve a request, by route template and status code.",
+    ("method", "route", "status"), HTTP_BUCKETS
+)
+DB_QUERY_DURATION = HistogramFamily(
+    "db_query_duration_seconds", "Time to execute a database statement, by the route that issued it.",
+    ("route",), DB_BUCKETS
+)
+DB_ACQUIRE_DURATION = HistogramFamily(
+    "db_acquire_duration_seconds", "Time spent waiting for a pooled connection, by the route that waited.",
+    ("route",), DB_BUCKETS
+)
+HISTOGRAMS = (HTTP_REQUEST_DURATION, DB_QUERY_DURATION, DB_ACQUIRE_DURATION)
+
+class RequestTimings:
+    """Database timings collected while a request runs.
+
+    The route template is only known once routing has happened, so timings are kept here
+    and moved into the route's histograms when the response is done; anything recorded
+    after that (e.g. by a task the handler spawned) goes straight to the route.
+    """
+    __slots__ = ("scope", "route", "queries", "acquires")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.route: Optional[str] = None
+        self.queries: List[float] = []
+        self.acquires: List[float] = []
+
+    def finish(self, route: str):
+        self.route = route
+        if self.queries:
+            histogram = DB_QUERY_DURATION.labels(route)
+            for seconds in self.queries:
+                histogram.observe(seconds)
+        if self.acquires:
+            histogram = DB_ACQUIRE_DURATION.labels(route)
+            for seconds in self.acquires:
+                histogram.observe(seconds)
+
+current_request: ContextVar[Optional[RequestTimings]] = ContextVar("current_request", default=None)
+
+def route_of(scope: dict) -> str:
+    # The router stores the matched route in the scope; its template keeps label cardinality bounded
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+def current_route() -> str:
+    """Route template of the request being served, or "background" outside a request"""
+    timings = current_request.get()
+    if timings is None:
+        return BACKGROUND_ROUTE
+    return timings.route or route_of(timings.scope)
+
+def _record(family: HistogramFamily, pending: Callable[[RequestTimings], List[float]], seconds: float):
+    timings = current_request.get()
+    if timings is None:
+        family.labels(BACKGROUND_ROUTE).observe(seconds)
+    elif timings.route is None:
+        pending(timings).append(seconds)
+    else:
+        family.labels(timings.route).observe(seconds)
+
+def record_query(seconds: float):
+    _record(DB_QUERY_DURATION, lambda timings: timings.queries, seconds)
+
+def record_acquire(seconds: float):
+    _record(DB_ACQUIRE_DURATION, lambda timings: timings.acquires, seconds)
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request from arrival until the response is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        timings = RequestTimings(scope)
+        token = current_request.set(timings)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            route = route_of(scope)
+            timings.finish(route)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+
+def render_metrics(gauges: Sequence[Tuple[str, str, float]] = ()) -> str:
+    """Prometheus text exposition of every histogram plus the given (name, help, value) gauges"""
+    lines: List[str] = []
+    for family in HISTOGRAMS:
+        family.render(lines)
+    for name, help, value in gauges:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple
+
+import psycopg
+
+MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.join(os.path.dirname(__file__), "..", "migrations"))
+# Arbitrary key shared by every worker; whoever holds it applies migrations, the rest wait
+MIGRATION_LOCK_KEY = 0x616D62756C65
+
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+logger = logging.getLogger(__name__)
+
+# Older releases created schema_version without the name/checksum columns and with one
+# row per startup; migration rows are the ones with a checksum.
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        id SERIAL PRIMARY KEY,
+        version VARCHAR(50) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    ALTER TABLE schema_version
+        ADD COLUMN IF NOT EXISTS name TEXT,
+        ADD COLUMN IF NOT EXISTS checksum CHAR(64),
+        ADD COLUMN IF NOT EXISTS execution_ms INTEGER;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_schema_version_migration ON schema_version(version) WHERE checksum IS NOT NULL;
+"""
+
+class Migration(NamedTuple):
+    version: str
+    name: str
+    sql: str
+    checksum: str
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Numbered NNNN_name.sql files in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), "rb") as f:
+            content = f.read()
+        migrations.append(Migration(match.group(1), match.group(2), content.decode(), hashlib.sha256(content).hexdigest()))
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration version in {directory}")
+    return migrations
+
+async def applied_migrations(conn) -> Dict[str, str]:
+    """version -> checksum of every recorded migration, in one query; empty before the first run"""
+    try:
+        cursor = await conn.execute("SELECT version, checksum FROM schema_version WHERE checksum IS NOT NULL")
+        rows = await cursor.fetchall()
+    except (psycopg.errors.UndefinedTable, psycopg.errors.UndefinedColumn):
+        await conn.rollback()
+        return {}
+    await conn.rollback()
+    return {version: checksum for version, checksum in rows}
+
+def pending_migrations(migrations: List[Migration], applied: Dict[str, str]) -> List[Migration]:
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None or checksum == migration.checksum:
+            continue
+        logger.warning("Migration %s_%s changed after it was applied; edit schema with a new migration instead", migration.version, migration.name)
+    return [migration for migration in migrations if migration.version not in applied]
+
+def log_warning(diagnostic):
+    if diagnostic.severity_nonlocalized == "WARNING":
+        logger.warning("%s", diagnostic.message_primary)
+
+async def run_migrations(conn, directory: str = MIGRATIONS_DIR) -> int:
+    """Apply pending migrations, each in its own transaction; returns how many were applied.
+
+    When everything is applied this costs one SELECT and no DDL or locking. Otherwise a
+    session advisory lock serializes workers starting together, and the applied set is
+    read again under it so a migration another worker just ran is not repeated. The first
+    failing migration stops the run and is raised.
+    """
+    migrations = load_migrations(directory)
+    if not pending_migrations(migrations, await applied_migrations(conn)):
+        print(f"Database schema is current (version {migrations[-1].version if migrations else 'none'})")
+        return 0
+
+    await conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    await conn.commit()
+    # Migrations RAISE WARNING about data they had to change; IF NOT EXISTS notices are dropped
+    conn.add_notice_handler(log_warning)
+    try:
+        await conn.execute(SCHEMA_VERSION_TABLE)
+        await conn.commit()
+
+        applied = 0
+        for migration in pending_migrations(migrations, await applied_migrations(conn)):
+            started = time.perf_counter()
+            try:
+                await conn.execute(migration.sql)
+                elapsed_ms = int((time.perf_counter() - started) * 1000)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum, elapsed_ms)
+                )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                print(f"Migration {migration.version}_{migration.name} failed")
+                raise
+            applied += 1
+            print(f"Applied migration {migration.version}_{migration.name} in {elapsed_ms} ms")
+        return applied
+    finally:
+        conn.remove_notice_handler(log_warning)
+        await conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        await conn.commit()
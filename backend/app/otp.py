@@ -0,0 +1,261 @@
+import asyncio
+import heapq
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.db import db_connection
+
+OTP_BACKEND = os.getenv("OTP_BACKEND", "postgres")
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+OTP_MAX_SENDS = int(os.getenv("OTP_MAX_SENDS", "3"))
+OTP_MAX_VERIFY_ATTEMPTS = int(os.getenv("OTP_MAX_VERIFY_ATTEMPTS", "5"))
+OTP_RATE_WINDOW_SECONDS = int(os.getenv("OTP_RATE_WINDOW_SECONDS", "600"))
+OTP_MAX_ENTRIES = int(os.getenv("OTP_MAX_ENTRIES", "100000"))
+OTP_SWEEP_INTERVAL_SECONDS = int(os.getenv("OTP_SWEEP_INTERVAL_SECONDS", "300"))
+
+class OTPError(Exception):
+    """Verification failed; the message is safe to show to the caller"""
+
+class OTPRateLimited(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+class RateLimiter:
+    """Sliding-window counter per key, holding at most `max_keys` keys (least recently used dropped)"""
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = OTP_MAX_ENTRIES):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def retry_after(self, key: str, now: float) -> float:
+        """Seconds until `key` may act again, 0 if it may act now"""
+        hits = self.hits.get(key)
+        if not hits:
+            return 0.0
+        while hits and hits[0] <= now - self.window_seconds:
+            hits.popleft()
+        if len(hits) < self.limit:
+            return 0.0
+        return hits[0] + self.window_seconds - now
+
+    def hit(self, key: str, now: float):
+        hits = self.hits.get(key)
+        if hits is None:
+            hits = self.hits[key] = deque()
+        hits.append(now)
+        self.hits.move_to_end(key)
+        while len(self.hits) > self.max_keys:
+            self.hits.popitem(last=False)
+
+    def reset(self, key: str):
+        self.hits.pop(key, None)
+
+class OTPBackend(ABC):
+    """Storage for phone OTPs. Methods take an optional connection a handler already holds."""
+
+    def __init__(self):
+        self.send_limiter = RateLimiter(OTP_MAX_SENDS, OTP_RATE_WINDOW_SECONDS)
+        self.verify_limiter = RateLimiter(OTP_MAX_VERIFY_ATTEMPTS, OTP_RATE_WINDOW_SECONDS)
+
+    def check_send(self, phone: str):
+        now = time.monotonic()
+        wait = self.send_limiter.retry_after(phone, now)
+        if wait > 0:
+            raise OTPRateLimited("Too many OTP requests. Please try again later", wait)
+        self.send_limiter.hit(phone, now)
+
+    def check_verify(self, phone: str):
+        wait = self.verify_limiter.retry_after(phone, time.monotonic())
+        if wait > 0:
+            raise OTPRateLimited("Too many failed attempts. Please request a new OTP later", wait)
+
+    def record_failure(self, phone: str):
+        self.verify_limiter.hit(phone, time.monotonic())
+
+    @abstractmethod
+    async def issue(self, phone: str, code: str, expires_at: datetime, conn=None):
+        """Store `code` for the phone, replacing any earlier one"""
+
+    @abstractmethod
+    async def verify(self, phone: str, code: str, conn=None):
+        """Mark the phone's OTP verified; raises OTPError or OTPRateLimited"""
+
+    @abstractmethod
+    async def verified_until(self, phone: str, conn=None) -> Optional[datetime]:
+        """Expiry of the phone's latest verified OTP (possibly in the past), None if never verified"""
+
+    @abstractmethod
+    async def consume(self, phone: str, conn=None):
+        """Forget the phone's OTP once its verification has been used"""
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Drop expired OTPs; returns how many were removed"""
+
+class OTPEntry:
+    __slots__ = ("code", "expires_at", "verified", "generation")
+
+    def __init__(self, code: str, expires_at: datetime, generation: int):
+        self.code = code
+        self.expires_at = expires_at
+        self.verified = False
+        self.generation = generation
+
+class MemoryOTPBackend(OTPBackend):
+    """Per-process OTP store: a dict of entries plus a min-heap of expiry times.
+
+    Expired entries are dropped lazily from the heap on every call, so memory stays
+    proportional to live OTPs, and the store never holds more than `max_entries`
+    (the soonest-expiring entries go first). Only suitable for a single worker process.
+    """
+
+    def __init__(self, max_entries: int = OTP_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self.entries: Dict[str, OTPEntry] = {}
+        self.expiry_heap: List[Tuple[float, int, str]] = []
+        self.generation = 0
+
+    def _evict(self, now: float) -> int:
+        evicted = 0
+        heap = self.expiry_heap
+        while heap and (heap[0][0] <= now or len(self.entries) > self.max_entries):
+            _, generation, phone = heapq.heappop(heap)
+            entry = self.entries.get(phone)
+            # Stale heap items belong to entries that were replaced or consumed
+            if entry is not None and entry.generation == generation:
+                del self.entries[phone]
+                evicted += 1
+        return evicted
+
+    def _entry(self, phone: str) -> Optional[OTPEntry]:
+        self._evict(time.time())
+        return self.entries.get(phone)
+
+    async def issue(self, phone: str, code: str, expires_at: datetime, conn=None):
+        self.check_send(phone)
+        self.generation += 1
+        self.entries[phone] = OTPEntry(code, expires_at, self.generation)
+        heapq.heappush(self.expiry_heap, (expires_at.timestamp(), self.generation, phone))
+        self.verify_limiter.reset(phone)
+        self._evict(time.time())
+
+    async def verify(self, phone: str, code: str, conn=None):
+        self.check_verify(phone)
+        entry = self._entry(phone)
+        if entry is None:
+            raise OTPError("No OTP found for this phone number")
+        if entry.code != code:
+            self.record_failure(phone)
+            raise OTPError("Invalid OTP")
+        entry.verified = True
+
+    async def verified_until(self, phone: str, conn=None) -> Optional[datetime]:
+        entry = self._entry(phone)
+        if entry is None or not entry.verified:
+            return None
+        return entry.expires_at
+
+    async def consume(self, phone: str, conn=None):
+        self.entries.pop(phone, None)
+
+    async def sweep(self) -> int:
+        evicted = self._evict(time.time())
+        # Compact the heap when replaced or consumed entries dominate it
+        if len(self.expiry_heap) > 2 * len(self.entries) + 1024:
+            self.expiry_heap = [(entry.expires_at.timestamp(), entry.generation, phone) for phone, entry in self.entries.items()]
+            heapq.heapify(self.expiry_heap)
+        return evicted
+
+class PostgresOTPBackend(OTPBackend):
+    """OTPs in the otp_verifications table, shared by every worker. Rate limits are per process."""
+
+    @asynccontextmanager
+    async def _connection(self, conn):
+        if conn is not None:
+            yield conn
+        else:
+            async with db_connection() as own_conn:
+                yield own_conn
+
+    async def issue(self, phone: str, code: str, expires_at: datetime, conn=None):
+        self.check_send(phone)
+        async with self._connection(conn) as conn:
+            await conn.execute(
+                """WITH replaced AS (DELETE FROM otp_verifications WHERE phone = %s)
+                   INSERT INTO otp_verifications (phone, otp_code, expires_at) VALUES (%s, %s, %s)""",
+                (phone, phone, code, expires_at)
+            )
+            await conn.commit()
+        self.verify_limiter.reset(phone)
+
+    async def verify(self, phone: str, code: str, conn=None):
+        self.check_verify(phone)
+        async with self._connection(conn) as conn:
+            cursor = await conn.execute(
+                "SELECT id, otp_code, expires_at FROM otp_verifications WHERE phone = %s ORDER BY created_at DESC LIMIT 1",
+                (phone,)
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                raise OTPError("No OTP found for this phone number")
+
+            otp_id, otp_code, expires_at = row
+            if datetime.now(timezone.utc) > expires_at:
+                await conn.execute("DELETE FROM otp_verifications WHERE phone = %s", (phone,))
+                await conn.commit()
+                raise OTPError("OTP has expired")
+            if otp_code != code:
+                self.record_failure(phone)
+                raise OTPError("Invalid OTP")
+
+            await conn.execute("UPDATE otp_verifications SET verified = true, verified_at = CURRENT_TIMESTAMP WHERE id = %s", (otp_id,))
+            await conn.commit()
+
+    async def verified_until(self, phone: str, conn=None) -> Optional[datetime]:
+        async with self._connection(conn) as conn:
+            cursor = await conn.execute(
+                "SELECT expires_at FROM otp_verifications WHERE phone = %s AND verified = true ORDER BY verified_at DESC LIMIT 1",
+                (phone,)
+            )
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def consume(self, phone: str, conn=None):
+        async with self._connection(conn) as conn:
+            await conn.execute("DELETE FROM otp_verifications WHERE phone = %s", (phone,))
+            await conn.commit()
+
+    async def sweep(self) -> int:
+        async with db_connection() as conn:
+            cursor = await conn.execute("SELECT cleanup_expired_otps()")
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+def create_otp_backend(name: str = OTP_BACKEND) -> OTPBackend:
+    if name == "memory":
+        return MemoryOTPBackend()
+    if name == "postgres":
+        return PostgresOTPBackend()
+    raise ValueError(f"Unknown OTP_BACKEND {name!r}, expected 'memory' or 'postgres'")
+
+otp_backend = create_otp_backend()
+
+async def run_otp_sweeper(backend: OTPBackend, interval_seconds: float = OTP_SWEEP_INTERVAL_SECONDS):
+    """Periodically drop expired OTPs until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            removed = await backend.sweep()
+            if removed:
+                print(f"Removed {removed} expired OTPs")
+        except Exception as e:
+            print(f"OTP sweep failed: {e}")
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# scrypt with N=2^14, r=8 needs 16 MiB per hash and takes tens of milliseconds
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+
+LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=dklen, maxmem=2 * 128 * r * n + 1024 * 1024)
+
+def hash_password(password: str) -> str:
+    """scrypt$N$r$p$salt$hash, with a fresh random salt"""
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+def verify_password(password: str, stored_hash: str) -> Tuple[bool, bool]:
+    """(matches, needs_rehash). Accepts scrypt hashes and legacy unsalted SHA-256 hex digests."""
+    if LEGACY_SHA256.match(stored_hash):
+        matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored_hash)
+        return matches, matches
+
+    try:
+        scheme, n, r, p, salt, digest = stored_hash.split("$")
+        if scheme != "scrypt":
+            return False, False
+        n, r, p = int(n), int(r), int(p)
+        expected = _b64decode(digest)
+        actual = _scrypt(password, _b64decode(salt), n, r, p, len(expected))
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(actual, expected)
+    return matches, matches and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+# Verified against when the username does not exist, so unknown users take as long as known ones
+DUMMY_HASH = hash_password(secrets.token_urlsafe(16))
+
+class PasswordHasher:
+    """Runs the KDF in a bounded thread pool; hashlib releases the GIL while it works.
+
+    With `workers=0` hashing runs inline on the caller's thread (used as the
+    blocking baseline in benchmarks/login_load.py).
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self.workers = workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, stored_hash: Optional[str]) -> Tuple[bool, bool]:
+        if stored_hash is None:
+            await self._run(verify_password, password, DUMMY_HASH)
+            return False, False
+        return await self._run(verify_password, password, stored_hash)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+password_hasher = PasswordHasher()
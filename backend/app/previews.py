@@ -0,0 +1,103 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Awaitable, Callable, Optional, Set, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # previews are skipped without Pillow
+    Image = None
+
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+THUMBNAIL_SIZE = 256
+PREVIEW_MAX_SIDE = 1600
+PREVIEW_QUALITY = 80
+
+PREVIEWABLE_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif", "tif", "tiff", "bmp"}
+
+def is_previewable(path: str) -> bool:
+    return Image is not None and path.rsplit(".", 1)[-1].lower() in PREVIEWABLE_EXTENSIONS
+
+def preview_paths(source_path: str) -> Tuple[str, str]:
+    """Thumbnail and preview live next to the original and share its (content-hash) name"""
+    stem = source_path.rsplit(".", 1)[0]
+    return f"{stem}.thumb.jpg", f"{stem}.preview.jpg"
+
+def _save_jpeg(image, path: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, "JPEG", quality=PREVIEW_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+def render_previews(source_path: str) -> Tuple[str, str]:
+    """Write a downscaled JPEG preview and thumbnail for an image. Runs in a worker process."""
+    thumbnail_path, preview_path = preview_paths(source_path)
+    if os.path.exists(thumbnail_path) and os.path.exists(preview_path):
+        return thumbnail_path, preview_path
+
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale by a power of two while decoding when it can
+        image.draft("RGB", (PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE), Image.Resampling.LANCZOS)
+        _save_jpeg(image, preview_path)
+        image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+        _save_jpeg(image, thumbnail_path)
+    return thumbnail_path, preview_path
+
+PreviewCallback = Callable[[str, Optional[str], Optional[str]], Awaitable[None]]
+
+class PreviewPipeline:
+    """Generates bill previews in a process pool and reports the outcome through a callback.
+
+    Image decoding and resampling are CPU bound, so they run in separate processes
+    rather than threads; the event loop only awaits the result.
+    """
+
+    def __init__(self, workers: int = PREVIEW_WORKERS):
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self.executor is not None
+
+    def start(self):
+        if self.executor is None and self.workers > 0 and Image is not None:
+            # spawn rather than fork so workers do not inherit the event loop or pool sockets
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+
+    async def shutdown(self):
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def submit(self, source_path: str, on_done: PreviewCallback) -> bool:
+        """Queue previews for `source_path`; False if it cannot be previewed here"""
+        if not self.running or not is_previewable(source_path):
+            return False
+        task = asyncio.create_task(self._process(source_path, on_done))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def _process(self, source_path: str, on_done: PreviewCallback):
+        loop = asyncio.get_running_loop()
+        try:
+            thumbnail_path, preview_path = await loop.run_in_executor(self.executor, render_previews, source_path)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Preview generation failed for {source_path}: {e}")
+            await on_done("failed", None, None)
+            return
+        await on_done("ready", thumbnail_path, preview_path)
+
+preview_pipeline = PreviewPipeline()
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import hashlib
+import os
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from app.metrics import current_route
+
+# Off unless a threshold is set, e.g. SLOW_QUERY_THRESHOLD_MS=200
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0"))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+# A statement's plan is captured again at most this often
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "600"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+SLOW_QUERY_MAX_STATEMENTS = int(os.getenv("SLOW_QUERY_MAX_STATEMENTS", "500"))
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+WHITESPACE = re.compile(r"\s+")
+# EXPLAIN ANALYZE executes the statement; only plain reads are sampled
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+def query_text(query, connection=None) -> str:
+    if isinstance(query, bytes):
+        return query.decode()
+    if isinstance(query, str):
+        return query
+    return query.as_string(connection)
+
+def normalize_sql(sql: str) -> str:
+    """Statement text with literals replaced by ? and whitespace collapsed, so executions with different values group together"""
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+def _value_shape(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def param_shape(params) -> Optional[str]:
+    """Parameter types without their values, which may be personal data"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {_value_shape(value)}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(_value_shape(value) for value in params) + ")"
+
+class SlowQuery:
+    """Aggregate for one normalized statement"""
+    __slots__ = ("fingerprint", "sql", "count", "total_ms", "max_ms", "last_ms", "last_seen", "params", "routes", "plan", "plan_captured_at")
+
+    def __init__(self, fingerprint: str, sql: str):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.last_seen = 0.0
+        self.params: Optional[str] = None
+        self.routes: Dict[str, int] = {}
+        self.plan: Optional[str] = None
+        self.plan_captured_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+            "last_seen": self.last_seen,
+            "params": self.params,
+            "routes": dict(self.routes),
+            "plan": self.plan,
+            "plan_captured_at": self.plan_captured_at,
+        }
+
+class SlowQueryLog:
+    """Statements slower than a threshold, grouped by normalized text, with a sampled EXPLAIN plan.
+
+    The connection layer calls `observe` after every statement; below the threshold that is a
+    single comparison. A plan is captured in a background task on its own pooled connection,
+    one at a time, inside a transaction that is always rolled back.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS, sample_rate: float = SLOW_QUERY_EXPLAIN_SAMPLE_RATE, max_statements: int = SLOW_QUERY_MAX_STATEMENTS):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.max_statements = max_statements
+        self.statements: Dict[str, SlowQuery] = {}
+        self.explaining: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def observe(self, query, params, seconds: float, connection=None, pool=None):
+        elapsed_ms = seconds * 1000
+        if not self.enabled or elapsed_ms < self.threshold_ms:
+            return
+        sql = query_text(query, connection)
+        if sql.lstrip()[:7].upper() == "EXPLAIN":
+            return
+
+        normalized = normalize_sql(sql)
+        fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+        entry = self.statements.get(fingerprint)
+        if entry is None:
+            if len(self.statements) >= self.max_statements:
+                del self.statements[min(self.statements.values(), key=lambda e: e.total_ms).fingerprint]
+            entry = self.statements[fingerprint] = SlowQuery(fingerprint, normalized)
+
+        route = current_route()
+        entry.count += 1
+        entry.total_ms += elapsed_ms
+        entry.max_ms = max(entry.max_ms, elapsed_ms)
+        entry.last_ms = elapsed_ms
+        entry.last_seen = time.time()
+        entry.params = param_shape(params)
+        entry.routes[route] = entry.routes.get(route, 0) + 1
+        print(f"Slow query ({elapsed_ms:.1f} ms, {route}) [{fingerprint}] {normalized[:500]} params={entry.params}")
+
+        if pool is not None and self._should_explain(entry, sql):
+            # A fresh context keeps the EXPLAIN out of the calling route's metrics
+            self.explaining = asyncio.create_task(self._explain(pool, entry, sql, params), context=contextvars.Context())
+
+    def _should_explain(self, entry: SlowQuery, sql: str) -> bool:
+        if self.explaining is not None and not self.explaining.done():
+            return False
+        if entry.plan_captured_at is not None and time.time() - entry.plan_captured_at < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        if not EXPLAINABLE.match(sql) or DATA_MODIFYING.search(sql):
+            return False
+        return random.random() < self.sample_rate
+
+    async def _explain(self, pool, entry: SlowQuery, sql: str, params):
+        try:
+            async with pool.connection() as conn:
+                try:
+                    await conn.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+                    cursor = await conn.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+                    entry.plan = "\n".join(row[0] for row in await cursor.fetchall())
+                    entry.plan_captured_at = time.time()
+                finally:
+                    await conn.rollback()
+        except Exception as e:
+            print(f"EXPLAIN failed for slow query [{entry.fingerprint}]: {e}")
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> List[dict]:
+        entries = sorted(self.statements.values(), key=lambda entry: getattr(entry, order_by), reverse=True)
+        return [entry.to_dict() for entry in entries[:limit]]
+
+    def reset(self):
+        self.statements.clear()
+
+slow_query_log = SlowQueryLog()
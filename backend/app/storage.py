@@ -0,0 +1,574 @@
+import functools
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import psycopg
+
+from app.db import DatabaseUnavailable, db_connection
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+
+# SQLSTATEs (or classes) sent as the server drops a connection: connection exceptions and shutdowns
+CONNECTION_LOST_SQLSTATES = ("08", "57P01", "57P02", "57P03")
+
+class InvalidRecord(Exception):
+    """The values were rejected (unknown reference, failed check); the message is safe to show to the caller"""
+
+class DuplicateRecord(InvalidRecord):
+    """A unique field is already taken"""
+
+def is_database_unreachable(error: Exception) -> bool:
+    """True if no connection could be had or it was closed or broken mid-call.
+
+    Statement and lock timeouts and cancellations are OperationalErrors too, but they come
+    from a live server, and serving those requests from memory would hide the problem.
+    """
+    if isinstance(error, DatabaseUnavailable):
+        return True
+    if not isinstance(error, psycopg.OperationalError):
+        return False
+    # Errors raised by the client itself (connection refused, closed, lost) carry no SQLSTATE
+    return error.sqlstate is None or error.sqlstate.startswith(CONNECTION_LOST_SQLSTATES)
+
+def is_uuid(value: Optional[str]) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+EMPLOYEE_COLUMNS = "id, name, phone, email, position, status"
+ATTENDANCE_COLUMNS = "id, employee_id, check_in_time, check_out_time, date"
+
+EXPENSE_SELECT = """
+    SELECT e.id, e.category, e.type, e.amount, e.description, e.bill_file_path, e.employee_id, e.ambulance_id,
+           e.expense_date, e.created_at, emp.name as employee_name, a.license_plate as ambulance_plate,
+           e.bill_processing_status, e.bill_thumbnail_path, e.bill_preview_path
+    FROM expenses e
+    LEFT JOIN employees emp ON e.employee_id = emp.id
+    LEFT JOIN ambulances a ON e.ambulance_id = a.id
+"""
+
+# Each statement upserts the whole roster and, in the same round trip, reports the
+# pre-statement row for employees it did not change so the reason can be given.
+# The outer SELECT reads the snapshot from before the CTE's write.
+ATTENDANCE_CHECK_IN_SQL = """
+    WITH roster AS (SELECT DISTINCT unnest(%(employee_ids)s::uuid[]) AS employee_id),
+    changed AS (
+        INSERT INTO attendance (employee_id, check_in_time, date)
+        SELECT r.employee_id, %(now)s, %(date)s FROM roster r JOIN employees e ON e.id = r.employee_id
+        ON CONFLICT (employee_id, date) DO UPDATE SET check_in_time = EXCLUDED.check_in_time
+            WHERE attendance.check_in_time IS NULL
+        RETURNING id, employee_id, check_in_time, check_out_time, date
+    )
+    SELECT r.employee_id, c.id, c.check_in_time, c.check_out_time, c.date,
+           e.id IS NOT NULL, a.check_in_time, a.check_out_time
+    FROM roster r
+    LEFT JOIN changed c ON c.employee_id = r.employee_id
+    LEFT JOIN employees e ON e.id = r.employee_id
+    LEFT JOIN attendance a ON a.employee_id = r.employee_id AND a.date = %(date)s
+"""
+
+ATTENDANCE_CHECK_OUT_SQL = """
+    WITH roster AS (SELECT DISTINCT unnest(%(employee_ids)s::uuid[]) AS employee_id),
+    changed AS (
+        UPDATE attendance a SET check_out_time = %(now)s
+        FROM roster r
+        WHERE a.employee_id = r.employee_id AND a.date = %(date)s
+          AND a.check_in_time IS NOT NULL AND a.check_out_time IS NULL
+        RETURNING a.id, a.employee_id, a.check_in_time, a.check_out_time, a.date
+    )
+    SELECT r.employee_id, c.id, c.check_in_time, c.check_out_time, c.date,
+           e.id IS NOT NULL, a.check_in_time, a.check_out_time
+    FROM roster r
+    LEFT JOIN changed c ON c.employee_id = r.employee_id
+    LEFT JOIN employees e ON e.id = r.employee_id
+    LEFT JOIN attendance a ON a.employee_id = r.employee_id AND a.date = %(date)s
+"""
+
+class Storage(ABC):
+    """Employees, attendance and expenses.
+
+    Reads return tuples in the column order of the matching SELECT (EMPLOYEE_COLUMNS,
+    ATTENDANCE_COLUMNS, EXPENSE_SELECT) so callers convert them with the same *_from_row
+    helpers whichever backend answered.
+    """
+
+    # Requests answered from the in-memory fallback; see PostgresStorage
+    fallbacks = 0
+
+    @abstractmethod
+    async def create_employee(self, employee_id: str, name: str, phone: str, email: Optional[str], position: str):
+        """Raises DuplicateRecord if the phone is taken"""
+
+    @abstractmethod
+    async def get_employee(self, employee_id: str) -> Optional[tuple]:
+        """The employee's row, None if there is no such employee"""
+
+    @abstractmethod
+    async def list_employees(self, status: Optional[str] = None) -> List[tuple]:
+        """Newest first, optionally only those with `status`"""
+
+    @abstractmethod
+    async def update_employee(self, employee_id: str, fields: dict) -> Optional[tuple]:
+        """Set `fields` and return the updated row, None if there is no such employee.
+        Raises DuplicateRecord if the new phone is taken."""
+
+    @abstractmethod
+    async def delete_employee(self, employee_id: str) -> bool:
+        """Also deletes their attendance and unlinks their expenses; False if there was no such employee"""
+
+    @abstractmethod
+    async def record_attendance(self, action: str, employee_ids: List[str], now: datetime) -> List[tuple]:
+        """Check employees in or out for `now`'s date. One row per distinct id:
+        (employee_id, changed id, check_in_time, check_out_time, date, employee exists,
+        previous check_in_time, previous check_out_time); the changed columns are None
+        for employees that were not changed."""
+
+    @abstractmethod
+    async def list_attendance(self, employee_id: Optional[str] = None) -> List[tuple]:
+        """Newest date first; all employees by latest check-in within a date, or only `employee_id`'s"""
+
+    @abstractmethod
+    async def create_expense(self, expense_id: str, category: str, type: str, amount: float, description: Optional[str],
+                             employee_id: Optional[str], ambulance_id: Optional[str], expense_date: date, created_at: datetime):
+        """Raises InvalidRecord if the database rejects the values"""
+
+    @abstractmethod
+    async def list_expenses(self) -> List[tuple]:
+        """Newest first"""
+
+    @abstractmethod
+    async def update_expense(self, expense_id: str, fields: dict) -> bool:
+        """False if there is no such expense; raises InvalidRecord if the database rejects the values"""
+
+    @abstractmethod
+    async def delete_expense(self, expense_id: str) -> bool:
+        """False if there was no such expense"""
+
+    @abstractmethod
+    async def set_expense_bill(self, expense_id: str, fields: dict) -> bool:
+        """Store bill file and preview columns; False if there is no such expense"""
+
+    @abstractmethod
+    async def record_bill_previews(self, expense_id: str, file_path: str, status: str, thumbnail_path: Optional[str], preview_path: Optional[str]):
+        """Store rendered previews, unless the bill was replaced by another file meanwhile"""
+
+    @abstractmethod
+    async def expense_bill_path(self, expense_id: str, column: str) -> Optional[str]:
+        """The expense's `column` (a bill path column), None if unset or there is no such expense"""
+
+class EmployeeRecord:
+    __slots__ = ("id", "name", "phone", "email", "position", "status", "seq")
+
+    def __init__(self, id: str, name: str, phone: str, email: Optional[str], position: str, status: str = "active", seq: int = 0):
+        self.id = id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.position = position
+        self.status = status
+        self.seq = seq
+
+    def row(self) -> tuple:
+        return (self.id, self.name, self.phone, self.email, self.position, self.status)
+
+class AttendanceRecord:
+    __slots__ = ("id", "employee_id", "check_in_time", "check_out_time", "date")
+
+    def __init__(self, id: str, employee_id: str, date: date):
+        self.id = id
+        self.employee_id = employee_id
+        self.check_in_time: Optional[datetime] = None
+        self.check_out_time: Optional[datetime] = None
+        self.date = date
+
+    def row(self) -> tuple:
+        return (self.id, self.employee_id, self.check_in_time, self.check_out_time, self.date)
+
+class ExpenseRecord:
+    __slots__ = ("id", "category", "type", "amount", "description", "employee_id", "ambulance_id", "expense_date", "created_at",
+                 "bill_file_path", "bill_processing_status", "bill_thumbnail_path", "bill_preview_path")
+
+    def __init__(self, id: str, category: str, type: str, amount: float, description: Optional[str],
+                 employee_id: Optional[str], ambulance_id: Optional[str], expense_date: date, created_at: datetime):
+        self.id = id
+        self.category = category
+        self.type = type
+        self.amount = amount
+        self.description = description
+        self.employee_id = employee_id
+        self.ambulance_id = ambulance_id
+        self.expense_date = expense_date
+        self.created_at = created_at
+        self.bill_file_path: Optional[str] = None
+        self.bill_processing_status: Optional[str] = None
+        self.bill_thumbnail_path: Optional[str] = None
+        self.bill_preview_path: Optional[str] = None
+
+def _index_add(index: Dict, key, record_id: str):
+    if key is not None:
+        index.setdefault(key, {})[record_id] = None
+
+def _index_remove(index: Dict, key, record_id: str):
+    ids = index.get(key)
+    if ids is not None:
+        ids.pop(record_id, None)
+        if not ids:
+            del index[key]
+
+class MemoryStorage(Storage):
+    """Process-local storage with the secondary indexes the reads and cascades need.
+
+    Primary dicts keep insertion order, which is creation order, so newest-first lists
+    are a reversed walk rather than a sort. Index buckets are dicts used as ordered sets, so
+    they keep that order too. Employee phones are unique as in the schema;
+    deleting an employee drops their attendance and clears their expenses' employee_id.
+    """
+
+    def __init__(self):
+        self.employees: Dict[str, EmployeeRecord] = {}
+        self.employee_by_phone: Dict[str, str] = {}
+        self.employees_by_status: Dict[str, Dict[str, None]] = {}
+        self.attendance: Dict[str, AttendanceRecord] = {}
+        self.attendance_by_day: Dict[Tuple[str, date], str] = {}
+        self.attendance_by_employee: Dict[str, Dict[str, None]] = {}
+        self.attendance_by_date: Dict[date, Dict[str, None]] = {}
+        self.expenses: Dict[str, ExpenseRecord] = {}
+        self.expenses_by_employee: Dict[str, Dict[str, None]] = {}
+        self.employee_seq = 0
+
+    async def create_employee(self, employee_id, name, phone, email, position):
+        if phone in self.employee_by_phone:
+            raise DuplicateRecord("An employee with this phone number already exists")
+        self.employee_seq += 1
+        self.employees[employee_id] = EmployeeRecord(employee_id, name, phone, email, position, seq=self.employee_seq)
+        self.employee_by_phone[phone] = employee_id
+        _index_add(self.employees_by_status, "active", employee_id)
+
+    async def get_employee(self, employee_id):
+        employee = self.employees.get(employee_id)
+        return employee.row() if employee else None
+
+    async def list_employees(self, status=None):
+        if status is None:
+            return [employee.row() for employee in reversed(self.employees.values())]
+        return [self.employees[employee_id].row() for employee_id in reversed(self.employees_by_status.get(status, {}))]
+
+    async def update_employee(self, employee_id, fields):
+        employee = self.employees.get(employee_id)
+        if employee is None:
+            return None
+        phone = fields.get("phone", employee.phone)
+        if phone != employee.phone:
+            if phone in self.employee_by_phone:
+                raise DuplicateRecord("An employee with this phone number already exists")
+            del self.employee_by_phone[employee.phone]
+            self.employee_by_phone[phone] = employee_id
+        if "status" in fields:
+            _index_remove(self.employees_by_status, employee.status, employee_id)
+            self._move_to_status(employee, fields["status"])
+        for field, value in fields.items():
+            setattr(employee, field, value)
+        return employee.row()
+
+    def _move_to_status(self, employee: EmployeeRecord, status: str):
+        """Add to the `status` bucket, keeping it in creation order when an older employee moves in"""
+        bucket = self.employees_by_status.setdefault(status, {})
+        newest = next(reversed(bucket), None)
+        bucket[employee.id] = None
+        if newest is not None and self.employees[newest].seq > employee.seq:
+            self.employees_by_status[status] = dict.fromkeys(sorted(bucket, key=lambda employee_id: self.employees[employee_id].seq))
+
+    async def delete_employee(self, employee_id):
+        employee = self.employees.pop(employee_id, None)
+        if employee is None:
+            return False
+        del self.employee_by_phone[employee.phone]
+        _index_remove(self.employees_by_status, employee.status, employee_id)
+        for attendance_id in self.attendance_by_employee.pop(employee_id, ()):
+            attendance = self.attendance.pop(attendance_id)
+            del self.attendance_by_day[(employee_id, attendance.date)]
+            _index_remove(self.attendance_by_date, attendance.date, attendance_id)
+        for expense_id in self.expenses_by_employee.pop(employee_id, ()):
+            self.expenses[expense_id].employee_id = None
+        return True
+
+    async def record_attendance(self, action, employee_ids, now):
+        day = now.date()
+        rows = []
+        for employee_id in dict.fromkeys(employee_ids):
+            exists = employee_id in self.employees
+            attendance_id = self.attendance_by_day.get((employee_id, day))
+            attendance = self.attendance.get(attendance_id) if attendance_id else None
+            previous = (attendance.check_in_time, attendance.check_out_time) if attendance else (None, None)
+
+            changed = None
+            if action == "check_in" and exists and previous[0] is None:
+                if attendance is None:
+                    attendance = AttendanceRecord(str(uuid.uuid4()), employee_id, day)
+                    self.attendance[attendance.id] = attendance
+                    self.attendance_by_day[(employee_id, day)] = attendance.id
+                    _index_add(self.attendance_by_employee, employee_id, attendance.id)
+                    _index_add(self.attendance_by_date, day, attendance.id)
+                attendance.check_in_time = now
+                changed = attendance
+            elif action == "check_out" and attendance is not None and previous[0] is not None and previous[1] is None:
+                attendance.check_out_time = now
+                changed = attendance
+
+            if changed is None:
+                rows.append((employee_id, None, None, None, None, exists) + previous)
+            else:
+                rows.append((employee_id, changed.id, changed.check_in_time, changed.check_out_time, changed.date, exists) + previous)
+        return rows
+
+    async def list_attendance(self, employee_id=None):
+        if employee_id is not None:
+            records = [self.attendance[attendance_id] for attendance_id in self.attendance_by_employee.get(employee_id, ())]
+            return [record.row() for record in sorted(records, key=lambda record: record.date, reverse=True)]
+        rows = []
+        no_check_in = datetime.min.replace(tzinfo=timezone.utc)
+        for day in sorted(self.attendance_by_date, reverse=True):
+            records = [self.attendance[attendance_id] for attendance_id in self.attendance_by_date[day]]
+            records.sort(key=lambda record: record.check_in_time or no_check_in, reverse=True)
+            rows.extend(record.row() for record in records)
+        return rows
+
+    async def create_expense(self, expense_id, category, type, amount, description, employee_id, ambulance_id, expense_date, created_at):
+        self.expenses[expense_id] = ExpenseRecord(expense_id, category, type, amount, description, employee_id, ambulance_id, expense_date, created_at)
+        _index_add(self.expenses_by_employee, employee_id, expense_id)
+
+    def _expense_row(self, expense: ExpenseRecord) -> tuple:
+        employee = self.employees.get(expense.employee_id) if expense.employee_id else None
+        return (
+            expense.id, expense.category, expense.type, expense.amount, expense.description, expense.bill_file_path,
+            expense.employee_id, expense.ambulance_id, expense.expense_date, expense.created_at,
+            employee.name if employee else None, None,
+            expense.bill_processing_status, expense.bill_thumbnail_path, expense.bill_preview_path,
+        )
+
+    async def list_expenses(self):
+        return [self._expense_row(expense) for expense in reversed(self.expenses.values())]
+
+    async def update_expense(self, expense_id, fields):
+        expense = self.expenses.get(expense_id)
+        if expense is None:
+            return False
+        if "employee_id" in fields:
+            _index_remove(self.expenses_by_employee, expense.employee_id, expense_id)
+            _index_add(self.expenses_by_employee, fields["employee_id"], expense_id)
+        for field, value in fields.items():
+            setattr(expense, field, value)
+        return True
+
+    async def delete_expense(self, expense_id):
+        expense = self.expenses.pop(expense_id, None)
+        if expense is None:
+            return False
+        _index_remove(self.expenses_by_employee, expense.employee_id, expense_id)
+        return True
+
+    async def set_expense_bill(self, expense_id, fields):
+        return await self.update_expense(expense_id, fields)
+
+    async def record_bill_previews(self, expense_id, file_path, status, thumbnail_path, preview_path):
+        expense = self.expenses.get(expense_id)
+        if expense is not None and expense.bill_file_path == file_path:
+            expense.bill_processing_status = status
+            expense.bill_thumbnail_path = thumbnail_path
+            expense.bill_preview_path = preview_path
+
+    async def expense_bill_path(self, expense_id, column):
+        expense = self.expenses.get(expense_id)
+        return getattr(expense, column) if expense else None
+
+def with_fallback(method):
+    """Run the Postgres method, or the same method of the in-memory fallback when the database is unreachable"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        try:
+            return await method(self, *args, **kwargs)
+        except (DatabaseUnavailable, psycopg.OperationalError) as e:
+            if not is_database_unreachable(e):
+                raise
+            print(f"Database error: {e}")
+            self.fallbacks += 1
+            return await getattr(self.fallback, method.__name__)(*args, **kwargs)
+    return wrapper
+
+class PostgresStorage(Storage):
+    """Storage in the application tables. While the database is unreachable, reads and
+    writes go to an in-memory store instead so the admin screens keep working; records
+    written there are not copied back when the database returns."""
+
+    def __init__(self, fallback: Optional[Storage] = None):
+        self.fallback = fallback or MemoryStorage()
+
+    @with_fallback
+    async def create_employee(self, employee_id, name, phone, email, position):
+        try:
+            async with db_connection() as conn:
+                await conn.execute(
+                    "INSERT INTO employees (id, name, phone, email, position) VALUES (%s, %s, %s, %s, %s)",
+                    (employee_id, name, phone, email, position)
+                )
+                await conn.commit()
+        except psycopg.errors.UniqueViolation:
+            raise DuplicateRecord("An employee with this phone number already exists")
+        except (psycopg.errors.IntegrityError, psycopg.errors.DataError) as e:
+            raise InvalidRecord(f"Invalid employee: {e.diag.message_primary}")
+
+    @with_fallback
+    async def get_employee(self, employee_id):
+        if not is_uuid(employee_id):
+            return None
+        async with db_connection() as conn:
+            cursor = await conn.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE id = %s", (employee_id,))
+            return await cursor.fetchone()
+
+    @with_fallback
+    async def list_employees(self, status=None):
+        async with db_connection() as conn:
+            if status is None:
+                cursor = await conn.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees ORDER BY created_at DESC")
+            else:
+                cursor = await conn.execute(f"SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE status = %s ORDER BY created_at DESC", (status,))
+            return await cursor.fetchall()
+
+    @with_fallback
+    async def update_employee(self, employee_id, fields):
+        if not fields:
+            return await self.get_employee(employee_id)
+        if not is_uuid(employee_id):
+            return None
+        assignments = ", ".join(f"{field} = %s" for field in fields)
+        try:
+            async with db_connection() as conn:
+                cursor = await conn.execute(
+                    f"UPDATE employees SET {assignments} WHERE id = %s RETURNING {EMPLOYEE_COLUMNS}",
+                    (*fields.values(), employee_id)
+                )
+                row = await cursor.fetchone()
+                await conn.commit()
+                return row
+        except psycopg.errors.UniqueViolation:
+            raise DuplicateRecord("An employee with this phone number already exists")
+        except (psycopg.errors.IntegrityError, psycopg.errors.DataError) as e:
+            raise InvalidRecord(f"Invalid employee: {e.diag.message_primary}")
+
+    @with_fallback
+    async def delete_employee(self, employee_id):
+        if not is_uuid(employee_id):
+            return False
+        async with db_connection() as conn:
+            cursor = await conn.execute("DELETE FROM employees WHERE id = %s", (employee_id,))
+            await conn.commit()
+            return cursor.rowcount > 0
+
+    @with_fallback
+    async def record_attendance(self, action, employee_ids, now):
+        query = ATTENDANCE_CHECK_IN_SQL if action == "check_in" else ATTENDANCE_CHECK_OUT_SQL
+        async with db_connection() as conn:
+            cursor = await conn.execute(query, {"employee_ids": employee_ids, "now": now, "date": now.date()})
+            rows = await cursor.fetchall()
+            await conn.commit()
+        return [(str(row[0]),) + tuple(row[1:]) for row in rows]
+
+    @with_fallback
+    async def list_attendance(self, employee_id=None):
+        if employee_id is not None and not is_uuid(employee_id):
+            return []
+        async with db_connection() as conn:
+            if employee_id is None:
+                cursor = await conn.execute(f"SELECT {ATTENDANCE_COLUMNS} FROM attendance ORDER BY date DESC, check_in_time DESC")
+            else:
+                cursor = await conn.execute(f"SELECT {ATTENDANCE_COLUMNS} FROM attendance WHERE employee_id = %s ORDER BY date DESC", (employee_id,))
+            return await cursor.fetchall()
+
+    @with_fallback
+    async def create_expense(self, expense_id, category, type, amount, description, employee_id, ambulance_id, expense_date, created_at):
+        try:
+            async with db_connection() as conn:
+                await conn.execute(
+                    """INSERT INTO expenses (id, category, type, amount, description, employee_id, ambulance_id, expense_date, created_at)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                    (expense_id, category, type, amount, description, employee_id, ambulance_id, expense_date, created_at)
+                )
+                await conn.commit()
+        except (psycopg.errors.IntegrityError, psycopg.errors.DataError) as e:
+            raise InvalidRecord(f"Invalid expense: {e.diag.message_primary}")
+
+    @with_fallback
+    async def list_expenses(self):
+        async with db_connection() as conn:
+            cursor = await conn.execute(EXPENSE_SELECT + " ORDER BY e.created_at DESC")
+            return await cursor.fetchall()
+
+    @with_fallback
+    async def update_expense(self, expense_id, fields):
+        if not is_uuid(expense_id):
+            return False
+        assignments = "".join(f"{field} = %s, " for field in fields)
+        try:
+            async with db_connection() as conn:
+                cursor = await conn.execute(
+                    f"UPDATE expenses SET {assignments}updated_at = %s WHERE id = %s",
+                    (*fields.values(), datetime.now(timezone.utc), expense_id)
+                )
+                await conn.commit()
+                return cursor.rowcount > 0
+        except (psycopg.errors.IntegrityError, psycopg.errors.DataError) as e:
+            raise InvalidRecord(f"Invalid expense: {e.diag.message_primary}")
+
+    @with_fallback
+    async def delete_expense(self, expense_id):
+        if not is_uuid(expense_id):
+            return False
+        async with db_connection() as conn:
+            cursor = await conn.execute("DELETE FROM expenses WHERE id = %s", (expense_id,))
+            await conn.commit()
+            return cursor.rowcount > 0
+
+    @with_fallback
+    async def set_expense_bill(self, expense_id, fields):
+        if not is_uuid(expense_id):
+            return False
+        assignments = ", ".join(f"{field} = %s" for field in fields)
+        async with db_connection() as conn:
+            cursor = await conn.execute(f"UPDATE expenses SET {assignments} WHERE id = %s RETURNING id", (*fields.values(), expense_id))
+            updated = await cursor.fetchone() is not None
+            await conn.commit()
+            return updated
+
+    @with_fallback
+    async def record_bill_previews(self, expense_id, file_path, status, thumbnail_path, preview_path):
+        async with db_connection() as conn:
+            # Only if the bill was not replaced while its previews were rendering
+            await conn.execute(
+                """UPDATE expenses SET bill_processing_status = %s, bill_thumbnail_path = %s, bill_preview_path = %s
+                   WHERE id = %s AND bill_file_path = %s""",
+                (status, thumbnail_path, preview_path, expense_id, file_path)
+            )
+            await conn.commit()
+
+    @with_fallback
+    async def expense_bill_path(self, expense_id, column):
+        if not is_uuid(expense_id):
+            return None
+        async with db_connection() as conn:
+            cursor = await conn.execute(f"SELECT {column} FROM expenses WHERE id = %s", (expense_id,))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+def create_storage(name: str = STORAGE_BACKEND) -> Storage:
+    if name == "memory":
+        return MemoryStorage()
+    if name == "postgres":
+        return PostgresStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND {name!r}, expected 'memory' or 'postgres'")
+
+storage = create_storage()
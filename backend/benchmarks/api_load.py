@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the booking, dashboard and assignment paths against a seeded database.
+
+Seeds a scratch Postgres database with realistic volumes (bookings, locations, a fleet,
+drivers and their daily assignments, staff with attendance history, and expenses), then
+drives the app in-process over ASGI with the real lifespan (migrations, pool, availability
+index) and reports throughput plus p50/p95/p99 latency per endpoint for each scenario:
+
+  funnel      send-otp -> verify-otp -> create booking -> bookings by phone
+  dashboard   admin dashboard, first bookings page, expense and attendance summaries
+  assignment  available ambulances for a pending booking -> assign-ambulance, plus a dispatch dry run
+
+The seed TRUNCATEs the application tables, so the database must be given explicitly:
+
+    python benchmarks/api_load.py --database-url postgresql://localhost/ambulette_bench --bookings 1000000
+    python benchmarks/api_load.py --database-url ... --skip-seed --requests 2000 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SLOT_HOURS = 4
+SCENARIOS = ("funnel", "dashboard", "assignment")
+
+TRUNCATE_SQL = """
+TRUNCATE bookings, locations, driver_assignments, drivers, ambulances, attendance, expenses, expense_rollups, employees, otp_verifications CASCADE;
+"""
+
+# Every generator works from generate_series on the server so a million rows take seconds, not minutes
+SEED_SQL = [
+    ("locations", """
+        INSERT INTO locations (address, latitude, longitude, canonical_key)
+        SELECT format('%%s Bench Street, Unit %%s', g, g %% 97), lat, lon,
+               format('%%s bench street, unit %%s', g, g %% 97) || '|' || round(lat, 5)::text || '|' || round(lon, 5)::text
+        FROM (
+            SELECT g, round((40.5 + random() * 0.4)::numeric, 6) AS lat, round((-74.2 + random() * 0.5)::numeric, 6) AS lon
+            FROM generate_series(1, %(locations)s) g
+        ) s
+    """),
+    ("ambulances", """
+        INSERT INTO ambulances (license_plate, model, capacity, status, current_latitude, current_longitude, position_updated_at)
+        SELECT format('BENCH-%%s', g), (ARRAY['Ford Transit', 'Mercedes Sprinter', 'Ram ProMaster'])[1 + g %% 3], 1 + g %% 4,
+               CASE WHEN g %% 25 = 0 THEN 'maintenance' ELSE 'available' END::ambulance_status,
+               40.5 + random() * 0.4, -74.2 + random() * 0.5, now()
+        FROM generate_series(1, %(ambulances)s) g
+    """),
+    ("drivers", """
+        INSERT INTO drivers (name, phone, license_number, status)
+        SELECT format('Bench Driver %%s', g), format('+1555%%s', lpad(g::text, 7, '0')), format('BENCH-DL-%%s', g),
+               CASE WHEN g %% 10 = 0 THEN 'off_duty' ELSE 'available' END::driver_status
+        FROM generate_series(1, %(drivers)s) g
+    """),
+    ("driver_assignments", """
+        INSERT INTO driver_assignments (driver_id, ambulance_id, assignment_date)
+        SELECT d.id, a.id, day::date
+        FROM (SELECT id, row_number() OVER (ORDER BY license_plate) AS n FROM ambulances) a
+        JOIN (SELECT id, row_number() OVER (ORDER BY license_number) AS n FROM drivers) d ON d.n = a.n
+        CROSS JOIN generate_series(current_date - %(history_days)s, current_date + 7, interval '1 day') day
+    """),
+    # Bookings are spread over the fleet in back-to-back slots, half in the past (completed or
+    # cancelled) and half ahead (pending or assigned), so the overlap constraint always holds
+    ("bookings", """
+        WITH fleet AS (
+            SELECT id, row_number() OVER (ORDER BY license_plate) - 1 AS n, count(*) OVER () AS size FROM ambulances
+        ),
+        spots AS (
+            SELECT id, row_number() OVER () - 1 AS n, count(*) OVER () AS size FROM locations
+        ),
+        slots AS (
+            SELECT g, now() - (%(bookings)s / (SELECT count(*) FROM ambulances) / 2) * make_interval(hours => %(slot_hours)s)
+                       + (g / (SELECT count(*) FROM ambulances)) * make_interval(hours => %(slot_hours)s) AS starts_at
+            FROM generate_series(0::bigint, %(bookings)s - 1) g
+        )
+        INSERT INTO bookings (name, phone, email, pickup_location_id, drop_location_id, from_date, to_date, status, assigned_ambulance_id, created_at)
+        SELECT format('Bench Patient %%s', s.g), format('+1666%%s', lpad((s.g %% 9000000)::text, 7, '0')),
+               CASE WHEN s.g %% 3 = 0 THEN format('patient%%s@example.com', s.g) END,
+               p.id, d.id, s.starts_at, s.starts_at + interval '1 hour' * (1 + s.g %% 3),
+               status, CASE WHEN status IN ('completed', 'assigned') THEN f.id END,
+               least(s.starts_at, now()) - interval '2 days'
+        FROM slots s
+        CROSS JOIN LATERAL (
+            SELECT (CASE
+                WHEN s.starts_at < now() AND s.g %% 10 = 0 THEN 'cancelled'
+                WHEN s.starts_at < now() THEN 'completed'
+                WHEN s.g %% 2 = 0 THEN 'assigned'
+                ELSE 'pending'
+            END)::booking_status AS status
+        ) st
+        JOIN fleet f ON f.n = s.g %% f.size
+        JOIN spots p ON p.n = (s.g * 7919) %% p.size
+        JOIN spots d ON d.n = (s.g * 104729 + 1) %% d.size
+    """),
+    ("employees", """
+        INSERT INTO employees (name, phone, email, position, status)
+        SELECT format('Bench Employee %%s', g), format('+1777%%s', lpad(g::text, 7, '0')), format('employee%%s@example.com', g),
+               (ARRAY['Driver', 'Paramedic', 'Dispatcher', 'Mechanic'])[1 + g %% 4],
+               CASE WHEN g %% 20 = 0 THEN 'inactive' ELSE 'active' END
+        FROM generate_series(1, %(employees)s) g
+    """),
+    ("attendance", """
+        INSERT INTO attendance (employee_id, date, check_in_time, check_out_time)
+        SELECT e.id, day::date, day + interval '8 hours' + random() * interval '1 hour',
+               day + interval '16 hours' + random() * interval '2 hours'
+        FROM employees e
+        CROSS JOIN generate_series(current_date - %(history_days)s, current_date - 1, interval '1 day') day
+        WHERE e.status = 'active' AND extract(isodow FROM day) < 6
+    """),
+    ("expenses", """
+        WITH staff AS (SELECT array_agg(id) AS ids FROM employees),
+        fleet AS (SELECT array_agg(id) AS ids FROM ambulances)
+        INSERT INTO expenses (category, type, amount, description, bill_file_path, employee_id, ambulance_id, expense_date)
+        SELECT category::expense_category, type::expense_type, round((20 + random() * 480)::numeric, 2), format('Bench expense %%s', g),
+               CASE WHEN type IN ('fuel', 'maintenance') THEN 'bench/bill.pdf' END,
+               CASE WHEN category = 'employee' THEN staff.ids[1 + g %% cardinality(staff.ids)] END,
+               CASE WHEN category = 'ambulette' THEN fleet.ids[1 + g %% cardinality(fleet.ids)] END,
+               current_date - (g %% %(history_days)s)
+        FROM generate_series(1, %(expenses)s) g
+        CROSS JOIN staff
+        CROSS JOIN fleet
+        CROSS JOIN LATERAL (
+            SELECT CASE WHEN g %% 4 = 0 THEN 'employee' ELSE 'ambulette' END AS category,
+                   CASE WHEN g %% 4 = 0 THEN (ARRAY['salary', 'bonus', 'other'])[1 + g %% 3]
+                        ELSE (ARRAY['fuel', 'maintenance', 'other'])[1 + g %% 3] END AS type
+        ) t
+    """),
+]
+
+OTP_IN_MESSAGE = re.compile(r"For testing: (\d{6})")
+
+def summarize(durations):
+    ordered = sorted(durations)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+async def seed(args):
+    conn = await psycopg.AsyncConnection.connect(args.database_url)
+    params = {
+        "locations": args.locations or args.bookings,
+        "bookings": args.bookings,
+        "ambulances": args.ambulances,
+        "drivers": args.ambulances,
+        "employees": args.employees,
+        "expenses": args.expenses,
+        "history_days": args.history_days,
+        "slot_hours": SLOT_HOURS,
+    }
+    try:
+        await conn.execute(TRUNCATE_SQL)
+        # Rollups are rebuilt once at the end rather than by the per-row trigger
+        await conn.execute("ALTER TABLE expenses DISABLE TRIGGER expenses_rollup_insert_delete")
+        for table, sql in SEED_SQL:
+            t0 = time.perf_counter()
+            cursor = await conn.execute(sql, params)
+            print(f"Seeded {cursor.rowcount} {table} in {time.perf_counter() - t0:.1f}s")
+        await conn.execute("ALTER TABLE expenses ENABLE TRIGGER expenses_rollup_insert_delete")
+        await conn.execute("SELECT rebuild_expense_rollups()")
+        await conn.commit()
+        await conn.execute("ANALYZE")
+        await conn.commit()
+    finally:
+        await conn.close()
+
+class Recorder:
+    """Latencies per endpoint label, and responses that were not expected"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client, label, method, url, expected=(200,), **kwargs):
+        t0 = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.durations[label].append((time.perf_counter() - t0) * 1000)
+        if response.status_code not in expected:
+            self.errors[f"{label} {response.status_code}"] += 1
+        return response
+
+    def report(self):
+        return {
+            "endpoints": {label: summarize(durations) for label, durations in sorted(self.durations.items())},
+            "errors": dict(self.errors),
+        }
+
+def funnel(client, recorder, admin_headers, state):
+    async def iteration(i):
+        phone = f"+1888{state['run']:03d}{i:05d}"
+        response = await recorder.request(client, "POST /api/send-otp", "POST", "/api/send-otp", json={"phone": phone})
+        match = OTP_IN_MESSAGE.search(response.json().get("message", "")) if response.status_code == 200 else None
+        if not match:
+            return
+        response = await recorder.request(client, "POST /api/verify-otp", "POST", "/api/verify-otp", json={"phone": phone, "otp": match.group(1)})
+        if response.status_code != 200:
+            return
+        phone_headers = {"X-Phone-Token": response.json()["phone_token"]}
+        starts_at = datetime.now(timezone.utc) + timedelta(days=1 + i % 14, hours=i % 12)
+        pickup, drop = state["locations"][i % len(state["locations"])], state["locations"][(i * 7 + 3) % len(state["locations"])]
+        await recorder.request(client, "POST /api/bookings", "POST", "/api/bookings", headers=phone_headers, json={
+            "name": f"Funnel Patient {i}",
+            "phone": phone,
+            "pickup_location": pickup,
+            "drop_location": drop,
+            "from_date": starts_at.isoformat(),
+            "to_date": (starts_at + timedelta(hours=2)).isoformat(),
+        })
+        await recorder.request(client, "POST /api/bookings/by-phone", "POST", "/api/bookings/by-phone", headers=phone_headers, json={"phone": phone})
+    return iteration
+
+def dashboard(client, recorder, admin_headers, state):
+    today = datetime.now(timezone.utc).date()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    async def iteration(i):
+        await recorder.request(client, "GET /api/admin/dashboard", "GET", "/api/admin/dashboard", headers=admin_headers)
+        await recorder.request(client, "GET /api/bookings", "GET", "/api/bookings", headers=admin_headers, params={"limit": 50})
+        await recorder.request(client, "GET /api/admin/expenses/summary", "GET", "/api/admin/expenses/summary", headers=admin_headers,
+                               params={"from_date": month_ago, "to_date": today.isoformat()})
+        await recorder.request(client, "GET /api/admin/attendance/summary", "GET", "/api/admin/attendance/summary", headers=admin_headers,
+                               params={"from_date": month_ago, "to_date": today.isoformat(), "period": "week"})
+    return iteration
+
+def assignment(client, recorder, admin_headers, state):
+    async def iteration(i):
+        if i % 50 == 0:
+            starts_at = datetime.now(timezone.utc) + timedelta(days=1)
+            await recorder.request(client, "POST /api/admin/dispatch", "POST", "/api/admin/dispatch", headers=admin_headers, json={
+                "from_date": starts_at.isoformat(), "to_date": (starts_at + timedelta(hours=6)).isoformat(), "dry_run": True,
+            })
+        if not state["pending"]:
+            return
+        booking_id, from_date, to_date = state["pending"].pop()
+        response = await recorder.request(client, "GET /api/admin/ambulances/available", "GET", "/api/admin/ambulances/available",
+                                          headers=admin_headers, params={"from_date": from_date.isoformat(), "to_date": to_date.isoformat()})
+        available = response.json() if response.status_code == 200 else []
+        if not available:
+            return
+        # Concurrent workers race for the same ambulances; a 409 is the expected loser's answer
+        await recorder.request(client, "POST /api/admin/assign-ambulance", "POST", "/api/admin/assign-ambulance", expected=(200, 409),
+                               headers=admin_headers, json={"booking_id": booking_id, "ambulance_id": available[0]["id"]})
+    return iteration
+
+SCENARIO_BUILDERS = {"funnel": funnel, "dashboard": dashboard, "assignment": assignment}
+
+async def load_state(args) -> dict:
+    conn = await psycopg.AsyncConnection.connect(args.database_url)
+    try:
+        cursor = await conn.execute("SELECT address, latitude::float8, longitude::float8 FROM locations ORDER BY random() LIMIT 1000")
+        locations = [{"address": address, "latitude": latitude, "longitude": longitude} for address, latitude, longitude in await cursor.fetchall()]
+        cursor = await conn.execute(
+            "SELECT id::text, from_date, to_date FROM bookings WHERE status = 'pending' AND from_date > now() ORDER BY from_date DESC LIMIT %s",
+            (args.requests,)
+        )
+        pending = await cursor.fetchall()
+    finally:
+        await conn.close()
+    return {"locations": locations, "pending": pending, "run": int(time.time()) % 1000}
+
+async def run_scenario(name, app, args, state) -> dict:
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        response = await client.post("/api/admin/login", json={"username": args.admin_user, "password": args.admin_password})
+        response.raise_for_status()
+        admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        iteration = SCENARIO_BUILDERS[name](client, recorder, admin_headers, state)
+
+        # Warm caches and prepared plans before measuring
+        for i in range(min(args.warmup, args.requests)):
+            await iteration(args.requests + i)
+        recorder.reset()
+
+        remaining = iter(range(args.requests))
+        async def worker():
+            for i in remaining:
+                await iteration(i)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    requests = sum(len(durations) for durations in recorder.durations.values())
+    return {
+        "scenario": name,
+        "iterations": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+        **recorder.report(),
+    }
+
+async def run(args):
+    # The app reads its settings at import, so point it at the benchmark database first
+    os.environ["DATABASE_URL"] = args.database_url
+    from app.main import app, init_database
+
+    print("=" * 60)
+    print(f"API load benchmark: {args.bookings} bookings, {args.requests} iterations x {args.concurrency} concurrent per scenario")
+    print("=" * 60)
+
+    if not args.skip_seed:
+        await init_database()
+        t0 = time.perf_counter()
+        await seed(args)
+        print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+    state = await load_state(args)
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "seed": {
+            "bookings": args.bookings, "locations": args.locations or args.bookings, "ambulances": args.ambulances,
+            "employees": args.employees, "expenses": args.expenses, "history_days": args.history_days,
+        },
+        "results": [],
+    }
+    async with app.router.lifespan_context(app):
+        for name in args.scenarios:
+            result = await run_scenario(name, app, args, state)
+            print(f"{name}: {result['requests_per_second']} req/s, {sum(result['errors'].values())} unexpected responses")
+            report["results"].append(result)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"), help="scratch database to seed (or BENCH_DATABASE_URL); its tables are truncated")
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--locations", type=int, help="defaults to the number of bookings")
+    parser.add_argument("--ambulances", type=int, default=200)
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--expenses", type=int, default=50_000)
+    parser.add_argument("--history-days", type=int, default=180)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required; the seed truncates its tables")
+    asyncio.run(run(args))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark admin login under concurrent load, and its effect on other endpoints.
+
+Drives the app in-process over ASGI (no server, no database: the built-in admin
+accounts are used) with `--concurrency` clients logging in while a second group
+polls /healthz. It runs twice: once with scrypt inline on the event loop
+(PASSWORD_HASH_WORKERS=0) and once on the thread pool, and reports
+p50/p95/p99 latency for both request types.
+
+    python benchmarks/login_load.py --logins 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.main import app
+from app.passwords import PASSWORD_HASH_WORKERS, hash_password, password_hasher
+from app import main
+
+def summarize(durations):
+    ordered = sorted(durations)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+async def timed(client, method, url, durations, **kwargs):
+    t0 = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    durations.append((time.perf_counter() - t0) * 1000)
+    return response
+
+async def run_mode(workers: int, args) -> dict:
+    password_hasher.shutdown()
+    password_hasher.workers = workers
+    # Start from an scrypt hash so every login does a full KDF without rehashing
+    main.admin_directory.users["admin"].password_hash = hash_password("admin123")
+
+    login_durations = []
+    health_durations = []
+    remaining = args.logins
+    stop = asyncio.Event()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await timed(client, "POST", "/api/admin/login", login_durations,
+                                       json={"username": "admin", "password": "admin123"})
+                if response.status_code != 200:
+                    raise RuntimeError(f"login failed: {response.status_code} {response.text}")
+
+        async def health_worker():
+            while not stop.is_set():
+                await timed(client, "GET", "/healthz", health_durations)
+                await asyncio.sleep(args.health_interval / 1000)
+
+        health_tasks = [asyncio.create_task(health_worker()) for _ in range(args.health_clients)]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await asyncio.gather(*health_tasks)
+
+    return {
+        "mode": "inline" if workers == 0 else f"thread_pool[{workers}]",
+        "logins_per_second": round(args.logins / elapsed, 1),
+        "login": summarize(login_durations),
+        "healthz": summarize(health_durations),
+    }
+
+async def run(args):
+    print("=" * 60)
+    print(f"Login load benchmark: {args.logins} logins, {args.concurrency} concurrent, {args.health_clients} /healthz pollers")
+    print("=" * 60)
+
+    report = {"logins": args.logins, "concurrency": args.concurrency, "results": []}
+    for workers in (0, args.workers):
+        report["results"].append(await run_mode(workers, args))
+    password_hasher.shutdown()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=max(PASSWORD_HASH_WORKERS, 1), help="thread pool size for the pooled run")
+    parser.add_argument("--health-clients", type=int, default=4)
+    parser.add_argument("--health-interval", type=float, default=5, help="milliseconds between /healthz polls per client")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    asyncio.run(run(parser.parse_args()))
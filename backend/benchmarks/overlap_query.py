@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ambulance availability query: the original NOT IN / three-OR
+overlap check on B-tree indexed from_date/to_date against the tstzrange
+period column probed through the no_overlapping_assignments GiST index.
+
+Runs in a throwaway `bench_overlap` schema so the real tables are untouched:
+
+    python benchmarks/overlap_query.py --bookings 1000000 --ambulances 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db import DATABASE_URL
+
+SCHEMA = "bench_overlap"
+SLOT_HOURS = 4
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE TABLE {SCHEMA}.ambulances (
+    id UUID PRIMARY KEY,
+    license_plate VARCHAR(20) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    capacity INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'available'
+);
+
+CREATE TABLE {SCHEMA}.bookings (
+    id BIGSERIAL PRIMARY KEY,
+    assigned_ambulance_id UUID REFERENCES {SCHEMA}.ambulances(id),
+    from_date TIMESTAMP WITH TIME ZONE NOT NULL,
+    to_date TIMESTAMP WITH TIME ZONE NOT NULL,
+    status TEXT NOT NULL,
+    period TSTZRANGE GENERATED ALWAYS AS (tstzrange(from_date, to_date, '[)')) STORED
+);
+"""
+
+# Each ambulance gets consecutive SLOT_HOURS slots with a 1-3 hour trip inside,
+# so assigned bookings never overlap and the exclusion constraint can be built.
+SEED_AMBULANCES_SQL = f"""
+INSERT INTO {SCHEMA}.ambulances (id, license_plate, model, capacity, status)
+SELECT gen_random_uuid(), 'BENCH-' || n, 'Bench Van', 1 + n %% 4,
+       CASE WHEN n %% 20 = 0 THEN 'maintenance' ELSE 'available' END
+FROM generate_series(1, %(ambulances)s) AS n
+"""
+
+SEED_BOOKINGS_SQL = f"""
+WITH fleet AS (
+    SELECT id, row_number() OVER (ORDER BY id) - 1 AS idx FROM {SCHEMA}.ambulances
+)
+INSERT INTO {SCHEMA}.bookings (assigned_ambulance_id, from_date, to_date, status)
+SELECT f.id,
+       %(base)s + make_interval(hours => (n / %(ambulances)s) * {SLOT_HOURS}, mins => (n * 7) %% 60),
+       %(base)s + make_interval(hours => (n / %(ambulances)s) * {SLOT_HOURS} + 1 + n %% 3, mins => (n * 7) %% 60),
+       (ARRAY['completed', 'completed', 'completed', 'assigned', 'in_progress', 'cancelled', 'pending'])[1 + n %% 7]
+FROM generate_series(0, %(bookings)s - 1) AS n
+JOIN fleet f ON f.idx = n %% %(ambulances)s
+"""
+
+LEGACY_INDEXES_SQL = f"""
+CREATE INDEX ON {SCHEMA}.bookings(from_date);
+CREATE INDEX ON {SCHEMA}.bookings(to_date);
+CREATE INDEX ON {SCHEMA}.bookings(assigned_ambulance_id);
+CREATE INDEX ON {SCHEMA}.bookings(status);
+"""
+
+RANGE_INDEXES_SQL = f"""
+ALTER TABLE {SCHEMA}.bookings ADD CONSTRAINT bench_no_overlapping_assignments
+    EXCLUDE USING gist (assigned_ambulance_id WITH =, period WITH &&)
+    WHERE (status IN ('assigned', 'in_progress'));
+CREATE INDEX ON {SCHEMA}.bookings USING gist (period);
+ANALYZE {SCHEMA}.ambulances;
+ANALYZE {SCHEMA}.bookings;
+"""
+
+LEGACY_QUERY = f"""
+SELECT a.id, a.license_plate, a.model, a.capacity
+FROM {SCHEMA}.ambulances a
+WHERE a.status = 'available'
+AND a.id NOT IN (
+    SELECT DISTINCT b.assigned_ambulance_id
+    FROM {SCHEMA}.bookings b
+    WHERE b.assigned_ambulance_id IS NOT NULL
+    AND b.status IN ('assigned', 'in_progress')
+    AND (
+        (b.from_date <= %(start)s AND b.to_date > %(start)s) OR
+        (b.from_date < %(end)s AND b.to_date >= %(end)s) OR
+        (b.from_date >= %(start)s AND b.to_date <= %(end)s)
+    )
+)
+"""
+
+RANGE_QUERY = f"""
+SELECT a.id, a.license_plate, a.model, a.capacity
+FROM {SCHEMA}.ambulances a
+WHERE a.status = 'available'
+AND NOT EXISTS (
+    SELECT 1
+    FROM {SCHEMA}.bookings b
+    WHERE b.assigned_ambulance_id = a.id
+    AND b.status IN ('assigned', 'in_progress')
+    AND b.period && tstzrange(%(start)s, %(end)s, '[)')
+)
+"""
+
+async def time_query(conn, query, windows):
+    durations = []
+    results = []
+    for start, end in windows:
+        t0 = time.perf_counter()
+        cursor = await conn.execute(query, {"start": start, "end": end})
+        rows = await cursor.fetchall()
+        durations.append((time.perf_counter() - t0) * 1000)
+        results.append(sorted(str(row[0]) for row in rows))
+    return durations, results
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+async def run(args):
+    print("=" * 60)
+    print(f"Availability overlap benchmark: {args.bookings:,} bookings, {args.ambulances:,} ambulances")
+    print("=" * 60)
+
+    conn = await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True)
+    try:
+        t0 = time.perf_counter()
+        await conn.execute(SETUP_SQL)
+        seed_params = {"ambulances": args.ambulances, "bookings": args.bookings, "base": BASE_TIME}
+        await conn.execute(SEED_AMBULANCES_SQL, seed_params)
+        await conn.execute(SEED_BOOKINGS_SQL, seed_params)
+        await conn.execute(LEGACY_INDEXES_SQL)
+        await conn.execute(RANGE_INDEXES_SQL)
+        print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+        span_hours = (args.bookings // args.ambulances) * SLOT_HOURS
+        rng = random.Random(args.seed)
+        windows = []
+        for _ in range(args.queries):
+            start = BASE_TIME + timedelta(minutes=rng.randrange(span_hours * 60))
+            windows.append((start, start + timedelta(hours=rng.choice([1, 2, 4, 8]))))
+
+        # Warm the buffer cache once for each plan before measuring
+        await time_query(conn, LEGACY_QUERY, windows[:3])
+        await time_query(conn, RANGE_QUERY, windows[:3])
+
+        legacy_durations, legacy_results = await time_query(conn, LEGACY_QUERY, windows)
+        range_durations, range_results = await time_query(conn, RANGE_QUERY, windows)
+        if legacy_results != range_results:
+            raise RuntimeError("Legacy and range queries returned different ambulances")
+
+        report = {
+            "bookings": args.bookings,
+            "ambulances": args.ambulances,
+            "queries": args.queries,
+            "legacy_not_in": summarize(legacy_durations),
+            "range_gist": summarize(range_durations),
+        }
+        report["speedup_p50"] = round(report["legacy_not_in"]["p50_ms"] / max(report["range_gist"]["p50_ms"], 1e-6), 1)
+
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--ambulances", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the bench_overlap schema afterwards")
+    asyncio.run(run(parser.parse_args()))
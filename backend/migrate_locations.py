@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+One-shot migration: merge duplicate `locations` rows and repoint bookings.
+
+Rows are grouped by the same canonical key create_booking now uses (normalized
+address + coordinates rounded to 5 decimals). One row per key is kept, every
+booking pointing at a duplicate is moved onto it, and the duplicates are deleted.
+Everything runs in a single transaction and is safe to re-run.
+
+    python migrate_locations.py [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import psycopg
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.db import DATABASE_URL
+from app.locations import deduplicate_locations
+
+async def migrate(dry_run: bool):
+    print("=" * 60)
+    print("Deduplicating locations")
+    print("=" * 60)
+
+    async with await psycopg.AsyncConnection.connect(DATABASE_URL) as conn:
+        await conn.execute("ALTER TABLE locations ADD COLUMN IF NOT EXISTS canonical_key TEXT")
+        await conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_canonical_key ON locations(canonical_key)")
+        await conn.commit()
+
+        report = await deduplicate_locations(conn)
+        if dry_run:
+            await conn.rollback()
+            print("Dry run, rolled back")
+        else:
+            await conn.commit()
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without committing")
+    asyncio.run(migrate(parser.parse_args().dry_run))
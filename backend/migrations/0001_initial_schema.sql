@@ -1,11 +1,13 @@
+-- Schema as first released. Every statement is idempotent so that databases created
+-- before migrations were tracked are recorded as at this version without changes.
 
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
-CREATE TYPE booking_status AS ENUM ('pending', 'assigned', 'in_progress', 'completed', 'cancelled');
-CREATE TYPE ambulance_status AS ENUM ('available', 'assigned', 'maintenance', 'out_of_service');
-CREATE TYPE driver_status AS ENUM ('available', 'assigned', 'off_duty', 'on_leave');
+DO $$ BEGIN CREATE TYPE booking_status AS ENUM ('pending', 'assigned', 'in_progress', 'completed', 'cancelled'); EXCEPTION WHEN duplicate_object THEN null; END $$;
+DO $$ BEGIN CREATE TYPE ambulance_status AS ENUM ('available', 'assigned', 'maintenance', 'out_of_service'); EXCEPTION WHEN duplicate_object THEN null; END $$;
+DO $$ BEGIN CREATE TYPE driver_status AS ENUM ('available', 'assigned', 'off_duty', 'on_leave'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 
-CREATE TABLE locations (
+CREATE TABLE IF NOT EXISTS locations (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     address TEXT NOT NULL,
     latitude DECIMAL(10, 8) NOT NULL,
@@ -14,7 +16,7 @@ CREATE TABLE locations (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE ambulances (
+CREATE TABLE IF NOT EXISTS ambulances (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     license_plate VARCHAR(20) UNIQUE NOT NULL,
     model VARCHAR(100) NOT NULL,
@@ -24,7 +26,7 @@ CREATE TABLE ambulances (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE drivers (
+CREATE TABLE IF NOT EXISTS drivers (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name VARCHAR(255) NOT NULL,
     phone VARCHAR(20) UNIQUE NOT NULL,
@@ -34,7 +36,7 @@ CREATE TABLE drivers (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE bookings (
+CREATE TABLE IF NOT EXISTS bookings (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name VARCHAR(255) NOT NULL,
     phone VARCHAR(20) NOT NULL,
@@ -54,7 +56,7 @@ CREATE TABLE bookings (
     CONSTRAINT valid_phone CHECK (phone ~* '^\+?[1-9]\d{1,14}$')
 );
 
-CREATE TABLE driver_assignments (
+CREATE TABLE IF NOT EXISTS driver_assignments (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     driver_id UUID NOT NULL REFERENCES drivers(id) ON DELETE CASCADE,
     ambulance_id UUID NOT NULL REFERENCES ambulances(id) ON DELETE CASCADE,
@@ -66,7 +68,7 @@ CREATE TABLE driver_assignments (
     UNIQUE(ambulance_id, assignment_date)
 );
 
-CREATE TABLE admin_users (
+CREATE TABLE IF NOT EXISTS admin_users (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     username VARCHAR(50) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
@@ -77,7 +79,7 @@ CREATE TABLE admin_users (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE otp_verifications (
+CREATE TABLE IF NOT EXISTS otp_verifications (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     phone VARCHAR(20) NOT NULL,
     otp_code VARCHAR(6) NOT NULL,
@@ -87,9 +89,9 @@ CREATE TABLE otp_verifications (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_otp_phone_expires ON otp_verifications(phone, expires_at);
+CREATE INDEX IF NOT EXISTS idx_otp_phone_expires ON otp_verifications(phone, expires_at);
 
-CREATE TABLE employees (
+CREATE TABLE IF NOT EXISTS employees (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     name VARCHAR(255) NOT NULL,
     phone VARCHAR(20) UNIQUE NOT NULL,
@@ -103,7 +105,7 @@ CREATE TABLE employees (
     CONSTRAINT valid_employee_phone CHECK (phone ~* '^\+?[1-9]\d{1,14}$')
 );
 
-CREATE TABLE attendance (
+CREATE TABLE IF NOT EXISTS attendance (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     employee_id UUID NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
     check_in_time TIMESTAMP WITH TIME ZONE,
@@ -116,10 +118,10 @@ CREATE TABLE attendance (
     UNIQUE(employee_id, date)
 );
 
-CREATE TYPE expense_category AS ENUM ('ambulette', 'employee');
-CREATE TYPE expense_type AS ENUM ('fuel', 'maintenance', 'other', 'salary', 'bonus');
+DO $$ BEGIN CREATE TYPE expense_category AS ENUM ('ambulette', 'employee'); EXCEPTION WHEN duplicate_object THEN null; END $$;
+DO $$ BEGIN CREATE TYPE expense_type AS ENUM ('fuel', 'maintenance', 'other', 'salary', 'bonus'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 
-CREATE TABLE expenses (
+CREATE TABLE IF NOT EXISTS expenses (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     category expense_category NOT NULL,
     type expense_type NOT NULL,
@@ -150,15 +152,13 @@ CREATE TABLE expenses (
     )
 );
 
-CREATE INDEX idx_expenses_category ON expenses(category);
-CREATE INDEX idx_expenses_type ON expenses(type);
-CREATE INDEX idx_expenses_date ON expenses(expense_date);
-CREATE INDEX idx_expenses_employee ON expenses(employee_id);
-CREATE INDEX idx_expenses_ambulance ON expenses(ambulance_id);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category);
+CREATE INDEX IF NOT EXISTS idx_expenses_type ON expenses(type);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(expense_date);
+CREATE INDEX IF NOT EXISTS idx_expenses_employee ON expenses(employee_id);
+CREATE INDEX IF NOT EXISTS idx_expenses_ambulance ON expenses(ambulance_id);
 
-CREATE TRIGGER update_expenses_updated_at BEFORE UPDATE ON expenses FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-
-CREATE TABLE audit_logs (
+CREATE TABLE IF NOT EXISTS audit_logs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     table_name VARCHAR(50) NOT NULL,
     record_id UUID NOT NULL,
@@ -169,35 +169,35 @@ CREATE TABLE audit_logs (
     changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_bookings_phone ON bookings(phone);
-CREATE INDEX idx_bookings_status ON bookings(status);
-CREATE INDEX idx_bookings_from_date ON bookings(from_date);
-CREATE INDEX idx_bookings_to_date ON bookings(to_date);
-CREATE INDEX idx_bookings_assigned_ambulance ON bookings(assigned_ambulance_id);
+CREATE INDEX IF NOT EXISTS idx_bookings_phone ON bookings(phone);
+CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status);
+CREATE INDEX IF NOT EXISTS idx_bookings_from_date ON bookings(from_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_to_date ON bookings(to_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_assigned_ambulance ON bookings(assigned_ambulance_id);
 
-CREATE INDEX idx_ambulances_license_plate ON ambulances(license_plate);
-CREATE INDEX idx_ambulances_status ON ambulances(status);
+CREATE INDEX IF NOT EXISTS idx_ambulances_license_plate ON ambulances(license_plate);
+CREATE INDEX IF NOT EXISTS idx_ambulances_status ON ambulances(status);
 
-CREATE INDEX idx_drivers_phone ON drivers(phone);
-CREATE INDEX idx_drivers_license_number ON drivers(license_number);
-CREATE INDEX idx_drivers_status ON drivers(status);
+CREATE INDEX IF NOT EXISTS idx_drivers_phone ON drivers(phone);
+CREATE INDEX IF NOT EXISTS idx_drivers_license_number ON drivers(license_number);
+CREATE INDEX IF NOT EXISTS idx_drivers_status ON drivers(status);
 
-CREATE INDEX idx_driver_assignments_date ON driver_assignments(assignment_date);
-CREATE INDEX idx_driver_assignments_driver ON driver_assignments(driver_id);
-CREATE INDEX idx_driver_assignments_ambulance ON driver_assignments(ambulance_id);
+CREATE INDEX IF NOT EXISTS idx_driver_assignments_date ON driver_assignments(assignment_date);
+CREATE INDEX IF NOT EXISTS idx_driver_assignments_driver ON driver_assignments(driver_id);
+CREATE INDEX IF NOT EXISTS idx_driver_assignments_ambulance ON driver_assignments(ambulance_id);
 
-CREATE INDEX idx_locations_coordinates ON locations(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_locations_coordinates ON locations(latitude, longitude);
 
-CREATE INDEX idx_employees_phone ON employees(phone);
-CREATE INDEX idx_employees_status ON employees(status);
-CREATE INDEX idx_employees_position ON employees(position);
+CREATE INDEX IF NOT EXISTS idx_employees_phone ON employees(phone);
+CREATE INDEX IF NOT EXISTS idx_employees_status ON employees(status);
+CREATE INDEX IF NOT EXISTS idx_employees_position ON employees(position);
 
-CREATE INDEX idx_attendance_employee ON attendance(employee_id);
-CREATE INDEX idx_attendance_date ON attendance(date);
-CREATE INDEX idx_attendance_check_in ON attendance(check_in_time);
+CREATE INDEX IF NOT EXISTS idx_attendance_employee ON attendance(employee_id);
+CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date);
+CREATE INDEX IF NOT EXISTS idx_attendance_check_in ON attendance(check_in_time);
 
-CREATE INDEX idx_admin_users_username ON admin_users(username);
-CREATE INDEX idx_admin_users_active ON admin_users(is_active);
+CREATE INDEX IF NOT EXISTS idx_admin_users_username ON admin_users(username);
+CREATE INDEX IF NOT EXISTS idx_admin_users_active ON admin_users(is_active);
 
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -207,49 +207,68 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS update_locations_updated_at ON locations;
 CREATE TRIGGER update_locations_updated_at BEFORE UPDATE ON locations FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_ambulances_updated_at ON ambulances;
 CREATE TRIGGER update_ambulances_updated_at BEFORE UPDATE ON ambulances FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_drivers_updated_at ON drivers;
 CREATE TRIGGER update_drivers_updated_at BEFORE UPDATE ON drivers FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_bookings_updated_at ON bookings;
 CREATE TRIGGER update_bookings_updated_at BEFORE UPDATE ON bookings FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_driver_assignments_updated_at ON driver_assignments;
 CREATE TRIGGER update_driver_assignments_updated_at BEFORE UPDATE ON driver_assignments FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_admin_users_updated_at ON admin_users;
 CREATE TRIGGER update_admin_users_updated_at BEFORE UPDATE ON admin_users FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_employees_updated_at ON employees;
 CREATE TRIGGER update_employees_updated_at BEFORE UPDATE ON employees FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_attendance_updated_at ON attendance;
 CREATE TRIGGER update_attendance_updated_at BEFORE UPDATE ON attendance FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_expenses_updated_at ON expenses;
+CREATE TRIGGER update_expenses_updated_at BEFORE UPDATE ON expenses FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 INSERT INTO admin_users (username, password_hash, email) VALUES 
 ('admin', 'e3afed0047b08059d0fada10f400c1e5', 'admin@diginitymov.com'),
-('manager', '1c142b2d01aa34e9a36bde480645a57fd69e14155dacfab5a3f9257b77fdc8d8', 'manager@diginitymov.com');
-
-CREATE VIEW active_bookings AS
-SELECT 
-    b.*,
-    pl.address as pickup_address,
-    pl.latitude as pickup_latitude,
-    pl.longitude as pickup_longitude,
-    dl.address as drop_address,
-    dl.latitude as drop_latitude,
-    dl.longitude as drop_longitude,
-    a.license_plate as ambulance_license_plate,
-    a.model as ambulance_model
-FROM bookings b
-LEFT JOIN locations pl ON b.pickup_location_id = pl.id
-LEFT JOIN locations dl ON b.drop_location_id = dl.id
-LEFT JOIN ambulances a ON b.assigned_ambulance_id = a.id
-WHERE b.status IN ('pending', 'assigned', 'in_progress');
-
-CREATE VIEW daily_assignments AS
-SELECT 
-    da.*,
-    d.name as driver_name,
-    d.phone as driver_phone,
-    d.license_number as driver_license,
-    a.license_plate as ambulance_license_plate,
-    a.model as ambulance_model,
-    a.capacity as ambulance_capacity
-FROM driver_assignments da
-JOIN drivers d ON da.driver_id = d.id
-JOIN ambulances a ON da.ambulance_id = a.id
-WHERE da.assignment_date >= CURRENT_DATE;
+('manager', '1c142b2d01aa34e9a36bde480645a57fd69e14155dacfab5a3f9257b77fdc8d8', 'manager@diginitymov.com')
+ON CONFLICT (username) DO NOTHING;
+
+DO $$ BEGIN
+    IF to_regclass('public.active_bookings') IS NULL THEN
+        CREATE VIEW active_bookings AS
+        SELECT
+            b.*,
+            pl.address as pickup_address,
+            pl.latitude as pickup_latitude,
+            pl.longitude as pickup_longitude,
+            dl.address as drop_address,
+            dl.latitude as drop_latitude,
+            dl.longitude as drop_longitude,
+            a.license_plate as ambulance_license_plate,
+            a.model as ambulance_model
+        FROM bookings b
+        LEFT JOIN locations pl ON b.pickup_location_id = pl.id
+        LEFT JOIN locations dl ON b.drop_location_id = dl.id
+        LEFT JOIN ambulances a ON b.assigned_ambulance_id = a.id
+        WHERE b.status IN ('pending', 'assigned', 'in_progress');
+    END IF;
+END $$;
+
+DO $$ BEGIN
+    IF to_regclass('public.daily_assignments') IS NULL THEN
+        CREATE VIEW daily_assignments AS
+        SELECT
+            da.*,
+            d.name as driver_name,
+            d.phone as driver_phone,
+            d.license_number as driver_license,
+            a.license_plate as ambulance_license_plate,
+            a.model as ambulance_model,
+            a.capacity as ambulance_capacity
+        FROM driver_assignments da
+        JOIN drivers d ON da.driver_id = d.id
+        JOIN ambulances a ON da.ambulance_id = a.id
+        WHERE da.assignment_date >= CURRENT_DATE;
+    END IF;
+END $$;
 
 CREATE OR REPLACE FUNCTION cleanup_expired_otps()
 RETURNS INTEGER AS $$
@@ -0,0 +1,80 @@
+-- Overlap checks on a generated tstzrange: a GiST exclusion constraint stops two active
+-- bookings of one ambulette from overlapping, and a keyset index serves GET /api/bookings.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE bookings ADD COLUMN IF NOT EXISTS period TSTZRANGE GENERATED ALWAYS AS (tstzrange(from_date, to_date, '[)')) STORED;
+CREATE INDEX IF NOT EXISTS idx_bookings_period ON bookings USING gist (period);
+CREATE INDEX IF NOT EXISTS idx_bookings_created_at_id ON bookings(created_at DESC, id DESC);
+
+-- Assignments were never checked for overlaps before this constraint, so older databases can
+-- hold conflicting pairs that would make it fail. Keep the in-progress bookings, then the
+-- earliest created, and send any booking overlapping one already kept back to pending.
+DO $$
+DECLARE
+    booking RECORD;
+    kept UUID[] := '{}';
+    unassigned UUID[] := '{}';
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'no_overlapping_assignments') THEN
+        RETURN;
+    END IF;
+    FOR booking IN
+        SELECT b.id, b.assigned_ambulance_id, b.period
+        FROM bookings b
+        WHERE b.status IN ('assigned', 'in_progress')
+        AND EXISTS (
+            SELECT 1 FROM bookings o
+            WHERE o.assigned_ambulance_id = b.assigned_ambulance_id AND o.id <> b.id
+            AND o.status IN ('assigned', 'in_progress') AND o.period && b.period
+        )
+        ORDER BY b.status = 'in_progress' DESC, b.created_at, b.id
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM bookings o
+            WHERE o.id = ANY(kept) AND o.assigned_ambulance_id = booking.assigned_ambulance_id AND o.period && booking.period
+        ) THEN
+            UPDATE bookings SET status = 'pending', assigned_ambulance_id = NULL WHERE id = booking.id;
+            unassigned := unassigned || booking.id;
+        ELSE
+            kept := kept || booking.id;
+        END IF;
+    END LOOP;
+    IF cardinality(unassigned) > 0 THEN
+        RAISE WARNING 'Unassigned % booking(s) that overlapped another booking of the same ambulette and set them back to pending: %',
+            cardinality(unassigned), array_to_string(unassigned, ', ');
+    END IF;
+END $$;
+
+DO $$ BEGIN
+    ALTER TABLE bookings ADD CONSTRAINT no_overlapping_assignments
+        EXCLUDE USING gist (assigned_ambulance_id WITH =, period WITH &&)
+        WHERE (status IN ('assigned', 'in_progress'));
+EXCEPTION WHEN duplicate_table OR duplicate_object THEN null;
+END $$;
+
+CREATE OR REPLACE FUNCTION get_available_ambulances(
+    start_date TIMESTAMP WITH TIME ZONE,
+    end_date TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE(
+    ambulance_id UUID,
+    license_plate VARCHAR(20),
+    model VARCHAR(100),
+    capacity INTEGER
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT a.id, a.license_plate, a.model, a.capacity
+    FROM ambulances a
+    WHERE a.status = 'available'
+    AND NOT EXISTS (
+        -- Probes the no_overlapping_assignments GiST index once per ambulance
+        SELECT 1
+        FROM bookings b
+        WHERE b.assigned_ambulance_id = a.id
+        AND b.status IN ('assigned', 'in_progress')
+        AND b.period && tstzrange(start_date, end_date, '[)')
+    );
+END;
+$$ LANGUAGE plpgsql;
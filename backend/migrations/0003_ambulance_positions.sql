@@ -0,0 +1,6 @@
+-- Last reported position of each ambulette, used to find the nearest available one.
+
+ALTER TABLE ambulances
+    ADD COLUMN IF NOT EXISTS current_latitude DECIMAL(10, 8),
+    ADD COLUMN IF NOT EXISTS current_longitude DECIMAL(11, 8),
+    ADD COLUMN IF NOT EXISTS position_updated_at TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,5 @@
+-- One locations row per normalized address and rounded coordinates. Existing duplicates
+-- keep a NULL key until backend/migrate_locations.py merges them.
+
+ALTER TABLE locations ADD COLUMN IF NOT EXISTS canonical_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_canonical_key ON locations(canonical_key);
@@ -0,0 +1,6 @@
+-- Status and paths of the JPEG thumbnail and preview rendered for an uploaded bill.
+
+ALTER TABLE expenses
+    ADD COLUMN IF NOT EXISTS bill_processing_status VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS bill_thumbnail_path VARCHAR(500),
+    ADD COLUMN IF NOT EXISTS bill_preview_path VARCHAR(500);
@@ -0,0 +1,6 @@
+-- The seeded admin hash was not SHA-256 of the documented password, so that account
+-- could never log in. Only the untouched seed value is replaced.
+
+UPDATE admin_users
+SET password_hash = '240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9'
+WHERE username = 'admin' AND password_hash = 'e3afed0047b08059d0fada10f400c1e5';
@@ -0,0 +1,3 @@
+-- Lets the attendance summary report be answered with an index-only scan.
+
+CREATE INDEX IF NOT EXISTS idx_attendance_employee_date ON attendance(employee_id, date) INCLUDE (check_in_time, check_out_time);
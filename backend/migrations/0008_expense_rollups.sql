@@ -0,0 +1,79 @@
+-- Monthly expense totals maintained by triggers on expenses, so reports never scan expenses
+-- itself. A missing ambulance or employee is stored as uuid_nil() to keep the key free of NULLs.
+-- category/type are plain text because databases that predate the enums store them as VARCHAR.
+
+CREATE TABLE IF NOT EXISTS expense_rollups (
+    month DATE NOT NULL,
+    category VARCHAR(20) NOT NULL,
+    type VARCHAR(20) NOT NULL,
+    ambulance_id UUID NOT NULL,
+    employee_id UUID NOT NULL,
+    total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    expense_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category, type, ambulance_id, employee_id)
+);
+ALTER TABLE expense_rollups ALTER COLUMN category TYPE VARCHAR(20), ALTER COLUMN type TYPE VARCHAR(20);
+
+CREATE OR REPLACE FUNCTION apply_expense_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE expense_rollups
+        SET total_amount = total_amount - OLD.amount, expense_count = expense_count - 1
+        WHERE month = date_trunc('month', OLD.expense_date)::date
+        AND category = OLD.category::text AND type = OLD.type::text
+        AND ambulance_id = coalesce(OLD.ambulance_id, uuid_nil())
+        AND employee_id = coalesce(OLD.employee_id, uuid_nil());
+
+        DELETE FROM expense_rollups
+        WHERE month = date_trunc('month', OLD.expense_date)::date
+        AND category = OLD.category::text AND type = OLD.type::text
+        AND ambulance_id = coalesce(OLD.ambulance_id, uuid_nil())
+        AND employee_id = coalesce(OLD.employee_id, uuid_nil())
+        AND expense_count <= 0;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO expense_rollups (month, category, type, ambulance_id, employee_id, total_amount, expense_count)
+        VALUES (date_trunc('month', NEW.expense_date)::date, NEW.category::text, NEW.type::text,
+                coalesce(NEW.ambulance_id, uuid_nil()), coalesce(NEW.employee_id, uuid_nil()), NEW.amount, 1)
+        ON CONFLICT (month, category, type, ambulance_id, employee_id) DO UPDATE
+        SET total_amount = expense_rollups.total_amount + EXCLUDED.total_amount,
+            expense_count = expense_rollups.expense_count + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_expense_rollups()
+RETURNS INTEGER AS $$
+DECLARE
+    rollup_count INTEGER;
+BEGIN
+    -- Hold off expense writes so no trigger update lands between the delete and the insert
+    LOCK TABLE expenses IN SHARE MODE;
+    DELETE FROM expense_rollups;
+    INSERT INTO expense_rollups (month, category, type, ambulance_id, employee_id, total_amount, expense_count)
+    SELECT date_trunc('month', expense_date)::date, category::text, type::text,
+           coalesce(ambulance_id, uuid_nil()), coalesce(employee_id, uuid_nil()), sum(amount), count(*)
+    FROM expenses
+    GROUP BY 1, 2, 3, 4, 5;
+
+    GET DIAGNOSTICS rollup_count = ROW_COUNT;
+    RETURN rollup_count;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS expenses_rollup_insert_delete ON expenses;
+CREATE TRIGGER expenses_rollup_insert_delete AFTER INSERT OR DELETE ON expenses FOR EACH ROW EXECUTE FUNCTION apply_expense_rollup();
+DROP TRIGGER IF EXISTS expenses_rollup_update ON expenses;
+CREATE TRIGGER expenses_rollup_update AFTER UPDATE ON expenses FOR EACH ROW
+    WHEN ((OLD.amount, OLD.expense_date, OLD.category, OLD.type, OLD.ambulance_id, OLD.employee_id)
+          IS DISTINCT FROM (NEW.amount, NEW.expense_date, NEW.category, NEW.type, NEW.ambulance_id, NEW.employee_id))
+    EXECUTE FUNCTION apply_expense_rollup();
+
+SELECT rebuild_expense_rollups();
+
+COMMENT ON TABLE expense_rollups IS 'Monthly expense totals per category, type, ambulette and employee, kept current by triggers';
+COMMENT ON FUNCTION rebuild_expense_rollups() IS 'Recomputes expense_rollups from the expenses table';
@@ -0,0 +1,31 @@
+-- Every write to a table whose list the API caches sends a notification naming the table,
+-- so each worker's response cache drops it (app/cache.py listens on this channel).
+-- NOTIFY is delivered at commit, once per table per transaction, and not at all on rollback.
+
+CREATE OR REPLACE FUNCTION notify_response_cache()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('response_cache', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_ambulances_response_cache ON ambulances;
+CREATE TRIGGER notify_ambulances_response_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ambulances
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_response_cache();
+
+DROP TRIGGER IF EXISTS notify_drivers_response_cache ON drivers;
+CREATE TRIGGER notify_drivers_response_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON drivers
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_response_cache();
+
+DROP TRIGGER IF EXISTS notify_driver_assignments_response_cache ON driver_assignments;
+CREATE TRIGGER notify_driver_assignments_response_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON driver_assignments
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_response_cache();
+
+DROP TRIGGER IF EXISTS notify_employees_response_cache ON employees;
+CREATE TRIGGER notify_employees_response_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON employees
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_response_cache();
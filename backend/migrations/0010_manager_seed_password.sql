@@ -0,0 +1,6 @@
+-- Like 0006 for the manager account: the seeded hash was not SHA-256 of the documented
+-- password 'manager123'. Only the untouched seed value is replaced.
+
+UPDATE admin_users
+SET password_hash = '866485796cfa8d7c0cf7111640205b83076433547577511d81f8030ae99ecea5'
+WHERE username = 'manager' AND password_hash = '1c142b2d01aa34e9a36bde480645a57fd69e14155dacfab5a3f9257b77fdc8d8';
@@ -22,10 +22,10 @@ async def test_database_initialization():
         await init_database()
         print("\n✅ Database initialization completed successfully!")
         print("\nThis demonstrates that:")
-        print("1. Database schema is checked and updated on every startup")
-        print("2. Missing tables are automatically created")
-        print("3. New database changes are applied automatically")
-        print("4. The application handles existing schema gracefully")
+        print("1. Applied migrations are checked with a single query on every startup")
+        print("2. Pending migrations in backend/migrations are applied in order")
+        print("3. Each applied migration is recorded in schema_version with its checksum")
+        print("4. An up-to-date schema is left untouched")
         
     except Exception as e:
         print(f"\n❌ Database initialization failed: {e}")
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+import psycopg
+import pytest
+
+# Tests that need Postgres run against TEST_DATABASE_URL and are skipped without it. Its
+# public schema is dropped and recreated, so never point it at a database you care about.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # The app reads its connection settings at import time
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+# Every table except the ones migrations own or seed
+KEEP_TABLES = ("schema_version", "admin_users")
+
+def reset_schema():
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+
+def migrate():
+    from app.migrations import run_migrations
+
+    async def run():
+        conn = await psycopg.AsyncConnection.connect(TEST_DATABASE_URL)
+        try:
+            return await run_migrations(conn)
+        finally:
+            await conn.close()
+
+    return asyncio.run(run())
+
+@pytest.fixture
+def empty_database():
+    """TEST_DATABASE_URL with nothing in it"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    reset_schema()
+    yield TEST_DATABASE_URL
+    # Leave a migrated schema behind for the tests that follow
+    migrate()
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    reset_schema()
+    migrate()
+    return TEST_DATABASE_URL
+
+@pytest.fixture
+def database(migrated_database):
+    """Migrated TEST_DATABASE_URL with every application table emptied"""
+    with psycopg.connect(migrated_database, autocommit=True) as conn:
+        rows = conn.execute(
+            "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename <> ALL(%s)", (list(KEEP_TABLES),)
+        ).fetchall()
+        if rows:
+            conn.execute("TRUNCATE " + ", ".join(f'"{row[0]}"' for row in rows) + " CASCADE")
+    return migrated_database
+
+@pytest.fixture
+def client(database):
+    """The app served in-process over its real lifespan, with admin authentication bypassed"""
+    from fastapi.testclient import TestClient
+
+    from app.availability import availability_index
+    from app.cache import response_cache
+    from app.locations import location_cache
+    from app.main import app, verify_token
+
+    # Process-wide caches outlive the truncated rows
+    location_cache.clear()
+    response_cache.clear()
+    availability_index.invalidate()
+    app.dependency_overrides[verify_token] = lambda: "admin"
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(verify_token, None)
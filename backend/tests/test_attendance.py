@@ -0,0 +1,54 @@
+import uuid
+
+import psycopg
+
+def add_employee(conn, name, position="Driver", status="active"):
+    return str(conn.execute(
+        "INSERT INTO employees (name, phone, position, status) VALUES (%s, %s, %s, %s) RETURNING id",
+        (name, f"+1555{uuid.uuid4().int % 10**7:07d}", position, status)
+    ).fetchone()[0])
+
+def bulk(client, action, employee_ids):
+    response = client.post("/api/admin/attendance/bulk", json={"action": action, "employee_ids": employee_ids})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def statuses(result):
+    return {item["employee_id"]: item["status"] for item in result["results"]}
+
+def test_bulk_payload_with_repeated_employees_records_one_row_per_day(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        first = add_employee(conn, "Ann")
+        second = add_employee(conn, "Bob")
+    unknown = str(uuid.uuid4())
+
+    # The same employee several times, once in another spelling of the same UUID
+    result = bulk(client, "check_in", [first, first.upper(), second, first, unknown, "not-a-uuid"])
+
+    assert result["succeeded"] == 2
+    assert result["failed"] == 2
+    assert statuses(result) == {
+        first: "checked_in", second: "checked_in", unknown: "employee_not_found", "not-a-uuid": "employee_not_found",
+    }
+    with psycopg.connect(database) as conn:
+        rows = conn.execute("SELECT employee_id::text, date, count(*) FROM attendance GROUP BY 1, 2").fetchall()
+    assert sorted((employee_id, count) for employee_id, _, count in rows) == sorted([(first, 1), (second, 1)])
+
+    # A second payload for the same day changes nothing and says why
+    again = bulk(client, "check_in", [first, second, second])
+    assert again["succeeded"] == 0
+    assert statuses(again) == {first: "already_checked_in", second: "already_checked_in"}
+
+    out = bulk(client, "check_out", [first, first])
+    assert statuses(out) == {first: "checked_out"}
+    assert statuses(bulk(client, "check_out", [first, second, second])) == {first: "already_checked_out", second: "checked_out"}
+
+def test_check_out_requires_a_check_in(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        employee_id = add_employee(conn, "Cat")
+
+    assert statuses(bulk(client, "check_out", [employee_id])) == {employee_id: "not_checked_in"}
+    response = client.post("/api/admin/attendance/check-out", json={"employee_id": employee_id})
+    assert response.status_code == 400
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM attendance").fetchone()[0] == 0
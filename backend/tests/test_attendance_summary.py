@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from tests.test_attendance import add_employee
+
+MONDAY = date(2025, 3, 3)
+
+def add_day(conn, employee_id, day, hours=None, check_in_hour=8):
+    """Attendance on `day`; hours=None records a check-in without a check-out"""
+    check_in = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc) + timedelta(hours=check_in_hour)
+    check_out = check_in + timedelta(hours=hours) if hours is not None else None
+    conn.execute(
+        "INSERT INTO attendance (employee_id, date, check_in_time, check_out_time) VALUES (%s, %s, %s, %s)",
+        (employee_id, day, check_in, check_out)
+    )
+
+def summary(client, **params):
+    response = client.get("/api/admin/attendance/summary", params=params)
+    assert response.status_code == 200, response.text
+    return [(row["employee_name"], row["period_start"], row) for row in response.json()]
+
+def test_summary_totals_per_period(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        ann = add_employee(conn, "Ann", position="Driver")
+        bob = add_employee(conn, "Bob", position="Paramedic")
+        add_employee(conn, "Zed", status="inactive")
+        # Ann: 8h, 7.5h and an unfinished day in the first week, 6h in the next
+        add_day(conn, ann, MONDAY, 8)
+        add_day(conn, ann, MONDAY + timedelta(days=1), 7.5)
+        add_day(conn, ann, MONDAY + timedelta(days=2))
+        add_day(conn, ann, MONDAY + timedelta(days=7), 6)
+        # Bob: 9h on Monday, outside the range afterwards
+        add_day(conn, bob, MONDAY, 9)
+        add_day(conn, bob, MONDAY + timedelta(days=30), 9)
+
+    rows = summary(client, from_date=MONDAY.isoformat(), to_date=(MONDAY + timedelta(days=13)).isoformat(), period="week")
+
+    assert [(name, period) for name, period, _ in rows] == [
+        ("Ann", MONDAY.isoformat()), ("Bob", MONDAY.isoformat()), ("Ann", (MONDAY + timedelta(days=7)).isoformat()),
+    ]
+    ann_week1, bob_week1, ann_week2 = (row for _, _, row in rows)
+    assert (ann_week1["days_present"], ann_week1["days_incomplete"]) == (3, 1)
+    assert ann_week1["hours_worked"] == pytest.approx(15.5)
+    assert ann_week1["average_hours_per_day"] == pytest.approx(7.75)
+    assert ann_week1["rank_in_period"] == 1
+    assert bob_week1["hours_worked"] == pytest.approx(9)
+    assert bob_week1["rank_in_period"] == 2
+    assert ann_week2["hours_worked"] == pytest.approx(6)
+    assert ann_week2["cumulative_hours"] == pytest.approx(21.5)
+    assert ann_week2["rank_in_period"] == 1
+
+    daily = summary(client, from_date=MONDAY.isoformat(), to_date=MONDAY.isoformat())
+    assert sorted((name, row["hours_worked"], row["rank_in_period"]) for name, _, row in daily) == [("Ann", 8.0, 2), ("Bob", 9.0, 1)]
+
+    monthly = summary(client, from_date=MONDAY.isoformat(), to_date=(MONDAY + timedelta(days=40)).isoformat(), period="month", position="Paramedic")
+    assert [(name, period, row["hours_worked"]) for name, period, row in monthly] == [
+        ("Bob", "2025-03-01", 9.0), ("Bob", "2025-04-01", 9.0),
+    ]
+    assert monthly[1][2]["cumulative_hours"] == pytest.approx(18)
+
+def test_summary_validates_its_range(client, database):
+    assert client.get("/api/admin/attendance/summary", params={"from_date": "2025-03-02", "to_date": "2025-03-01"}).status_code == 400
+    assert client.get("/api/admin/attendance/summary", params={"from_date": "2025-03-01", "to_date": "2025-03-02", "employee_id": "nope"}).status_code == 404
@@ -0,0 +1,114 @@
+import time
+from pathlib import Path
+
+import psycopg
+import pytest
+
+from app.auth import TokenCache
+from app.passwords import verify_password
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+SEEDED_ACCOUNTS = [("admin", "admin123"), ("manager", "manager123")]
+
+def seeded_hashes(database):
+    with psycopg.connect(database) as conn:
+        return dict(conn.execute("SELECT username, password_hash FROM admin_users").fetchall())
+
+@pytest.mark.parametrize("username, password", SEEDED_ACCOUNTS)
+def test_seeded_accounts_log_in(client, database, username, password):
+    assert verify_password(password, seeded_hashes(database)[username])[0]
+
+    response = client.post("/api/admin/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    assert response.json()["access_token"]
+    assert client.post("/api/admin/login", json={"username": username, "password": password + "x"}).status_code == 401
+
+def test_seed_fix_only_replaces_the_original_seed(database):
+    fix = (MIGRATIONS / "0010_manager_seed_password.sql").read_text()
+    original = "1c142b2d01aa34e9a36bde480645a57fd69e14155dacfab5a3f9257b77fdc8d8"
+    with psycopg.connect(database, autocommit=True) as conn:
+        current = conn.execute("SELECT password_hash FROM admin_users WHERE username = 'manager'").fetchone()[0]
+        try:
+            conn.execute("UPDATE admin_users SET password_hash = %s WHERE username = 'manager'", (original,))
+            conn.execute(fix)
+            assert verify_password("manager123", seeded_hashes(database)["manager"]) == (True, True)
+
+            # A password changed since seeding is left alone
+            conn.execute("UPDATE admin_users SET password_hash = 'scrypt$changed' WHERE username = 'manager'")
+            conn.execute(fix)
+            assert seeded_hashes(database)["manager"] == "scrypt$changed"
+        finally:
+            conn.execute("UPDATE admin_users SET password_hash = %s WHERE username = 'manager'", (current,))
+
+def test_token_cache_hits_and_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.put("a", {"sub": "admin", "exp": exp})
+    cache.put("b", {"sub": "manager", "exp": exp})
+    assert cache.get("a") == {"sub": "admin", "exp": exp}
+
+    # "b" is now the least recently used and goes first
+    cache.put("c", {"sub": "admin", "exp": exp})
+    assert len(cache.entries) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    # Without an expiry nothing is cached; expired entries are dropped on read
+    cache.put("d", {"sub": "admin"})
+    assert cache.get("d") is None
+    cache.put("e", {"sub": "admin", "exp": time.time() - 1})
+    assert cache.get("e") is None
+    assert TokenCache.key("e") not in cache.entries
+
+@pytest.fixture
+def authenticated_client(client, monkeypatch):
+    """`client` with the real admin authentication"""
+    from app.main import app, token_cache, verify_token
+
+    monkeypatch.delitem(app.dependency_overrides, verify_token)
+    token_cache.clear()
+    yield client
+    token_cache.clear()
+
+def log_in(client, username="admin", password="admin123"):
+    response = client.post("/api/admin/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_deactivated_admin_is_refused_with_a_cached_token(authenticated_client, database):
+    from app.main import admin_directory, token_cache
+
+    tokens = log_in(authenticated_client, "manager", "manager123")
+    assert authenticated_client.get("/api/admin/employees", headers=bearer(tokens["access_token"])).status_code == 200
+    assert token_cache.get(tokens["access_token"]) is not None
+
+    with psycopg.connect(database, autocommit=True) as conn:
+        conn.execute("UPDATE admin_users SET is_active = false WHERE username = 'manager'")
+    try:
+        authenticated_client.portal.call(admin_directory.refresh)
+        # The payload is still cached, but the account behind it is checked on every request
+        assert token_cache.get(tokens["access_token"]) is not None
+        assert authenticated_client.get("/api/admin/employees", headers=bearer(tokens["access_token"])).status_code == 401
+        assert authenticated_client.post("/api/admin/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+        assert authenticated_client.post("/api/admin/login", json={"username": "manager", "password": "manager123"}).status_code == 401
+    finally:
+        with psycopg.connect(database, autocommit=True) as conn:
+            conn.execute("UPDATE admin_users SET is_active = true WHERE username = 'manager'")
+        authenticated_client.portal.call(admin_directory.refresh)
+
+def test_refresh_and_access_tokens_are_not_interchangeable(authenticated_client, database):
+    tokens = log_in(authenticated_client)
+
+    # A refresh token is not an access token
+    assert authenticated_client.get("/api/admin/employees", headers=bearer(tokens["refresh_token"])).status_code == 401
+    # ... and an access token cannot be refreshed
+    assert authenticated_client.post("/api/admin/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+    assert authenticated_client.post("/api/admin/refresh", json={"refresh_token": "not-a-token"}).status_code == 401
+
+    refreshed = authenticated_client.post("/api/admin/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refreshed.status_code == 200, refreshed.text
+    assert refreshed.json()["refresh_token"] != tokens["refresh_token"]
+    assert authenticated_client.get("/api/admin/employees", headers=bearer(refreshed.json()["access_token"])).status_code == 200
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import shutil
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from app.availability import AvailabilityIndex, BookingConflict
+from app.migrations import MIGRATIONS_DIR, run_migrations
+
+START = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+def hours(n: float) -> datetime:
+    return START + timedelta(hours=n)
+
+def make_index() -> AvailabilityIndex:
+    index = AvailabilityIndex()
+    index.upsert_ambulance("a1", "AMB-1", "Ford Transit", 2)
+    index.upsert_ambulance("a2", "AMB-2", "Ram ProMaster", 4)
+    return index
+
+def available_ids(index: AvailabilityIndex, start: datetime, end: datetime, min_capacity: int = 0):
+    return sorted(ambulance["id"] for ambulance in index.available(start, end, min_capacity))
+
+def test_occupied_ambulance_is_unavailable_for_overlapping_periods():
+    index = make_index()
+    index.occupy("b1", "a1", hours(0), hours(2))
+
+    assert available_ids(index, hours(1), hours(3)) == ["a2"]
+    assert available_ids(index, hours(-1), hours(0.5)) == ["a2"]
+    assert available_ids(index, hours(0.5), hours(1)) == ["a2"]
+    assert available_ids(index, hours(3), hours(4)) == ["a1", "a2"]
+
+def test_periods_are_half_open():
+    index = make_index()
+    index.occupy("b1", "a1", hours(0), hours(2))
+
+    # [0, 2) and [2, 3) touch without overlapping, in either order
+    assert available_ids(index, hours(2), hours(3)) == ["a1", "a2"]
+    assert available_ids(index, hours(-1), hours(0)) == ["a1", "a2"]
+    index.occupy("b2", "a1", hours(2), hours(3))
+    index.occupy("b3", "a1", hours(-1), hours(0))
+
+    assert available_ids(index, hours(-1), hours(3)) == ["a2"]
+    assert available_ids(index, hours(3), hours(4)) == ["a1", "a2"]
+
+def test_occupy_rejects_an_overlap_and_leaves_the_index_unchanged():
+    index = make_index()
+    index.occupy("b1", "a1", hours(0), hours(2))
+
+    with pytest.raises(BookingConflict) as conflict:
+        index.occupy("b2", "a1", hours(1.99), hours(4))
+
+    assert conflict.value.booking_id == "b1"
+    assert index.booking_slot("b2") is None
+    assert index.is_free("a1", hours(2), hours(4))
+
+def test_occupy_moves_a_booking_and_release_frees_it():
+    index = make_index()
+    index.occupy("b1", "a1", hours(0), hours(2))
+
+    # Re-occupying the same booking ignores its own slot and moves it off a1
+    index.occupy("b1", "a1", hours(1), hours(3))
+    assert index.booking_slot("b1") == ("a1", hours(1), hours(3))
+    assert index.is_free("a1", hours(0), hours(1))
+
+    index.occupy("b1", "a2", hours(1), hours(3))
+    assert index.is_free("a1", hours(0), hours(4))
+    assert not index.is_free("a2", hours(2), hours(2.5))
+
+    assert index.release("b1") == "a2"
+    assert index.release("b1") is None
+    assert available_ids(index, hours(0), hours(4)) == ["a1", "a2"]
+
+def test_available_filters_on_status_and_capacity():
+    index = make_index()
+    index.upsert_ambulance("a3", "AMB-3", "Mercedes Sprinter", 6, status="maintenance")
+
+    assert available_ids(index, hours(0), hours(1)) == ["a1", "a2"]
+    assert available_ids(index, hours(0), hours(1), min_capacity=3) == ["a2"]
+
+    index.remove_ambulance("a2")
+    assert available_ids(index, hours(0), hours(1), min_capacity=3) == []
+
+def insert_booking(conn, ambulance_id, start, end, status="assigned", created_at=None):
+    location_id = conn.execute(
+        "INSERT INTO locations (address, latitude, longitude) VALUES ('1 Main St', 40.7, -74.0) RETURNING id"
+    ).fetchone()[0]
+    return conn.execute(
+        "INSERT INTO bookings (name, phone, pickup_location_id, drop_location_id, from_date, to_date, status, assigned_ambulance_id, created_at) "
+        "VALUES ('Test Patient', '+15550000000', %s, %s, %s, %s, %s, %s, coalesce(%s, now())) RETURNING id",
+        (location_id, location_id, start, end, status, ambulance_id, created_at)
+    ).fetchone()[0]
+
+def test_database_rejects_overlapping_assignments(database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        ambulance_id = conn.execute(
+            "INSERT INTO ambulances (license_plate, model, capacity) VALUES ('AMB-1', 'Ford Transit', 2) RETURNING id"
+        ).fetchone()[0]
+        insert_booking(conn, ambulance_id, hours(0), hours(2))
+
+        with pytest.raises(psycopg.errors.ExclusionViolation):
+            insert_booking(conn, ambulance_id, hours(1), hours(3))
+
+        # Back-to-back periods, and bookings that do not occupy the ambulance, are allowed
+        insert_booking(conn, ambulance_id, hours(2), hours(3))
+        insert_booking(conn, ambulance_id, hours(0), hours(2), status="cancelled")
+        pending = insert_booking(conn, ambulance_id, hours(1), hours(3), status="pending")
+
+        with pytest.raises(psycopg.errors.ExclusionViolation):
+            conn.execute("UPDATE bookings SET status = 'assigned' WHERE id = %s", (pending,))
+
+def migrate(url, directory):
+    async def run():
+        conn = await psycopg.AsyncConnection.connect(url)
+        try:
+            return await run_migrations(conn, directory)
+        finally:
+            await conn.close()
+
+    return asyncio.run(run())
+
+def test_booking_periods_migration_resolves_legacy_overlaps(empty_database, tmp_path, caplog):
+    shutil.copy(f"{MIGRATIONS_DIR}/0001_initial_schema.sql", tmp_path)
+    migrate(empty_database, str(tmp_path))
+
+    with psycopg.connect(empty_database, autocommit=True) as conn:
+        first, second = (
+            conn.execute(
+                "INSERT INTO ambulances (license_plate, model, capacity) VALUES (%s, 'Ford Transit', 2) RETURNING id", (plate,)
+            ).fetchone()[0]
+            for plate in ("AMB-1", "AMB-2")
+        )
+        # Booked before assign-ambulance checked for overlaps
+        kept = insert_booking(conn, first, hours(0), hours(2), created_at=hours(-30))
+        overlapping = insert_booking(conn, first, hours(1), hours(3), created_at=hours(-20))
+        # Only overlapped the booking that is unassigned, so it stays
+        after = insert_booking(conn, first, hours(2.5), hours(4), created_at=hours(-10))
+        cancelled = insert_booking(conn, first, hours(0), hours(4), status="cancelled", created_at=hours(-40))
+        # A trip under way wins over an earlier-created assignment
+        older = insert_booking(conn, second, hours(0), hours(2), created_at=hours(-30))
+        running = insert_booking(conn, second, hours(1), hours(2), status="in_progress", created_at=hours(-5))
+
+    with caplog.at_level(logging.WARNING, logger="app.migrations"):
+        migrate(empty_database, MIGRATIONS_DIR)
+
+    with psycopg.connect(empty_database) as conn:
+        rows = dict((row[0], row[1:]) for row in conn.execute("SELECT id, status::text, assigned_ambulance_id FROM bookings"))
+        assert conn.execute("SELECT 1 FROM pg_constraint WHERE conname = 'no_overlapping_assignments'").fetchone()
+    assert rows[kept] == ("assigned", first)
+    assert rows[after] == ("assigned", first)
+    assert rows[cancelled] == ("cancelled", first)
+    assert rows[running] == ("in_progress", second)
+    assert rows[overlapping] == ("pending", None)
+    assert rows[older] == ("pending", None)
+
+    warnings = [record.getMessage() for record in caplog.records if "overlapped" in record.getMessage()]
+    assert len(warnings) == 1
+    assert "Unassigned 2 booking(s)" in warnings[0]
+    assert str(overlapping) in warnings[0] and str(older) in warnings[0]
@@ -0,0 +1,52 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+from app.bills import BillTooLarge, bill_media_type, detect_bill_extension, store_bill
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + b"receipt" * 100
+
+class Upload:
+    """The parts of an UploadFile that store_bill reads"""
+
+    def __init__(self, content: bytes, filename=None, content_type=None):
+        self.file = io.BytesIO(content)
+        self.filename = filename
+        self.content_type = content_type
+
+def store(root, content, filename=None, content_type=None, max_bytes=1024 * 1024):
+    return asyncio.run(store_bill(Upload(content, filename, content_type), root=str(root), max_bytes=max_bytes))
+
+def test_same_photo_under_any_name_is_stored_once(tmp_path):
+    first = store(tmp_path, JPEG, "receipt.JPG", "image/jpeg")
+    assert first.created
+    assert first.path.endswith(f"{first.sha256}.jpg")
+    assert bill_media_type(first.path) == "image/jpeg"
+
+    for filename, content_type in (("scan.jpeg", "image/jpeg"), ("photo", None), ("upload.bin", "application/octet-stream")):
+        again = store(tmp_path, JPEG, filename, content_type)
+        assert (again.path, again.created) == (first.path, False)
+
+    stored = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert stored == [os.path.basename(first.path)]
+
+@pytest.mark.parametrize("head, content_type, filename, extension", [
+    (b"%PDF-1.7\n", None, "bill.png", "pdf"),
+    (b"\x89PNG\r\n\x1a\n\x00", "image/jpeg", None, "png"),
+    (b"RIFF\x10\x00\x00\x00WEBPVP8 ", None, None, "webp"),
+    (b"\x00\x00\x00\x18ftypheic\x00\x00", None, "IMG_0001", "heic"),
+    (b"II*\x00\x08\x00", None, None, "tif"),
+    # Unrecognized content falls back to the declared type, then the filename
+    (b"plain text", "image/jpeg; charset=binary", "notes.txt", "jpg"),
+    (b"plain text", None, "scan.TIFF", "tif"),
+    (b"plain text", "text/plain", "notes", "bin"),
+])
+def test_extension_comes_from_the_content(head, content_type, filename, extension):
+    assert detect_bill_extension(head, content_type, filename) == extension
+
+def test_oversized_bill_leaves_nothing_behind(tmp_path):
+    with pytest.raises(BillTooLarge):
+        store(tmp_path, JPEG, "receipt.jpg", max_bytes=100)
+    assert [name for _, _, names in os.walk(tmp_path) for name in names] == []
@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+import psycopg
+
+START = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+def listed(client, **params):
+    response = client.get("/api/bookings", params=params)
+    assert response.status_code == 200, response.text
+    return [booking["id"] for booking in response.json()]
+
+def test_booking_list_date_range(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        location_id = conn.execute(
+            "INSERT INTO locations (address, latitude, longitude) VALUES ('1 Main St', 40.7, -74.0) RETURNING id"
+        ).fetchone()[0]
+        booking_id = str(conn.execute(
+            "INSERT INTO bookings (name, phone, pickup_location_id, drop_location_id, from_date, to_date) "
+            "VALUES ('Test Patient', '+15550000000', %s, %s, %s, %s + interval '2 hours') RETURNING id",
+            (location_id, location_id, START, START)
+        ).fetchone()[0])
+
+    assert listed(client, date_from="2025-03-01T10:00:00Z", date_to="2025-03-01T12:00:00Z") == [booking_id]
+    assert listed(client, date_from="2025-03-01T11:00:00Z") == []
+    assert listed(client, date_to="2025-03-01T09:00:00Z") == []
+    # An empty range matches nothing rather than failing
+    assert listed(client, date_from="2025-03-01T10:00:00Z", date_to="2025-03-01T10:00:00Z") == []
+
+    response = client.get("/api/bookings", params={"date_from": "2025-03-02T00:00:00Z", "date_to": "2025-03-01T00:00:00Z"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "date_to must not be before date_from"
+    # A naive bound is read as UTC
+    response = client.get("/api/bookings", params={"date_from": "2025-03-01T10:00:00-02:00", "date_to": "2025-03-01T09:00:00"})
+    assert response.status_code == 400
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import psycopg
+
+from app.cache import ResponseCache, listen_for_invalidations
+
+def test_read_racing_a_write_or_clear_is_not_stored():
+    cache = ResponseCache()
+    version = cache.version("drivers")
+    cache.invalidate("drivers")
+    cache.put("drivers", "", b"[]", version)
+    assert cache.get("drivers", "") is None
+
+    version = cache.version("drivers")
+    cache.clear()
+    cache.put("drivers", "", b"[]", version)
+    assert cache.get("drivers", "") is None
+
+    cache.put("drivers", "", b"[]", cache.version("drivers"))
+    assert cache.get("drivers", "").body == b"[]"
+
+def test_cache_is_bypassed_while_not_listening():
+    cache = ResponseCache()
+    cache.put("drivers", "", b"[]", cache.version("drivers"))
+    cache.listening = False
+
+    assert cache.get("drivers", "") is None
+    cache.put("ambulances", "", b"[]", cache.version("ambulances"))
+    cache.listening = True
+    assert cache.get("ambulances", "") is None
+    assert cache.get("drivers", "") is not None
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_listener_drops_resources_written_by_other_connections(database):
+    async def run():
+        cache = ResponseCache()
+        cache.listening = False
+        listener = asyncio.create_task(listen_for_invalidations(cache, database, reconnect_seconds=0.1))
+        try:
+            await wait_for(lambda: cache.listening)
+            for resource in ("ambulances", "drivers"):
+                cache.put(resource, "", b"[]", cache.version(resource))
+
+            writer = await psycopg.AsyncConnection.connect(database)
+            try:
+                # Nothing is sent for a rolled-back write
+                await writer.execute("INSERT INTO ambulances (license_plate, model, capacity) VALUES ('NOTIFY-1', 'Van', 2)")
+                await writer.rollback()
+                await writer.execute("INSERT INTO ambulances (license_plate, model, capacity) VALUES ('NOTIFY-1', 'Van', 2)")
+                await asyncio.sleep(0.2)
+                assert cache.get("ambulances", "") is not None
+                await writer.commit()
+            finally:
+                await writer.close()
+
+            await wait_for(lambda: cache.get("ambulances", "") is None)
+            assert cache.get("drivers", "") is not None
+
+            # A dropped connection bypasses the cache until the listener is back, then starts empty
+            with psycopg.connect(database, autocommit=True) as conn:
+                conn.execute(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query = 'LISTEN response_cache'"
+                )
+            await wait_for(lambda: not cache.listening)
+            await wait_for(lambda: cache.listening)
+            assert cache.get("drivers", "") is None
+        finally:
+            listener.cancel()
+
+    asyncio.run(run())
+
+def test_list_reflects_writes_made_outside_this_worker(client, database):
+    assert client.get("/api/admin/drivers").json() == []
+
+    with psycopg.connect(database, autocommit=True) as conn:
+        conn.execute("INSERT INTO drivers (name, phone, license_number) VALUES ('Ann', '+15550300001', 'LIC-NOTIFY')")
+
+    deadline = time.monotonic() + 5
+    while not client.get("/api/admin/drivers").json():
+        assert time.monotonic() < deadline, "cached list was never invalidated"
+        time.sleep(0.01)
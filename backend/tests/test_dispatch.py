@@ -0,0 +1,157 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+from app.availability import availability_index
+from app.dispatch import DispatchPlanner, Trip
+from app.geo import haversine_km
+
+DAY = datetime(2025, 3, 1, 6, 0, tzinfo=timezone.utc)
+SPEED_KMH = 30.0
+
+def random_point(rng: random.Random):
+    return (40.6 + rng.random() * 0.2, -74.1 + rng.random() * 0.2)
+
+def random_trips(rng: random.Random, count: int, ambulance_ids):
+    trips = []
+    for n in range(count):
+        start = DAY + timedelta(minutes=rng.randrange(0, 12 * 60, 5))
+        end = start + timedelta(minutes=rng.randrange(20, 90, 5))
+        # Every fifth trip is already assigned and must stay where it is
+        fixed = ambulance_ids[n % len(ambulance_ids)] if n % 5 == 0 else None
+        trips.append(Trip(f"b{n}", start, end, random_point(rng), random_point(rng), fixed))
+    # Fixed trips come from the database, which never holds overlapping assignments
+    for ambulance_id in ambulance_ids:
+        busy_until = None
+        for trip in sorted((trip for trip in trips if trip.ambulance_id == ambulance_id), key=lambda trip: trip.start):
+            if busy_until is not None and trip.start < busy_until:
+                trip.ambulance_id = None
+            else:
+                busy_until = trip.end
+    return trips
+
+def routes(trips, plan):
+    assigned = {item["booking_id"]: item["ambulance_id"] for item in plan["assignments"]}
+    by_ambulance = {}
+    for trip in trips:
+        ambulance_id = trip.ambulance_id or assigned.get(trip.booking_id)
+        if ambulance_id is not None:
+            by_ambulance.setdefault(ambulance_id, []).append(trip)
+    return {ambulance_id: sorted(route, key=lambda trip: trip.start) for ambulance_id, route in by_ambulance.items()}
+
+def test_planner_never_overlaps_trips_on_one_ambulance():
+    rng = random.Random(7)
+    ambulance_ids = [f"a{n}" for n in range(6)]
+    # a5 has no driver that day
+    driver_days = {DAY.date(): set(ambulance_ids[:5])}
+    positions = {ambulance_id: random_point(rng) for ambulance_id in ambulance_ids[:3]}
+    trips = random_trips(rng, 120, ambulance_ids[:5])
+    fixed_before = {trip.booking_id: trip.ambulance_id for trip in trips if trip.fixed}
+
+    plan = DispatchPlanner(trips, ambulance_ids, driver_days, positions, speed_kmh=SPEED_KMH).solve(time_limit=2)
+
+    assert plan["assignments"]
+    planned = {item["booking_id"] for item in plan["assignments"]}
+    pending = {trip.booking_id for trip in trips if not trip.fixed}
+    assert planned | set(plan["unassigned_booking_ids"]) == pending
+    assert not planned & set(plan["unassigned_booking_ids"])
+    assert not planned & set(fixed_before)
+    assert all(item["ambulance_id"] != "a5" for item in plan["assignments"])
+
+    for ambulance_id, route in routes(trips, plan).items():
+        for prev, trip in zip(route, route[1:]):
+            assert prev.end <= trip.start, f"{prev.booking_id} and {trip.booking_id} overlap on {ambulance_id}"
+            if prev.fixed and trip.fixed:
+                continue
+            # A planned trip must also leave time to drive from the previous drop-off
+            drive_seconds = haversine_km(prev.drop[0], prev.drop[1], trip.pickup[0], trip.pickup[1]) * 3600 / SPEED_KMH
+            assert prev.end + drive_seconds <= trip.start + 1e-3, f"No time to drive from {prev.booking_id} to {trip.booking_id} on {ambulance_id}"
+
+def test_planner_leaves_trips_unassigned_when_no_ambulance_is_free():
+    pickup = (40.7, -74.0)
+    fixed = Trip("fixed", DAY, DAY + timedelta(hours=2), pickup, pickup, "a1")
+    clash = Trip("clash", DAY + timedelta(hours=1), DAY + timedelta(hours=3), pickup, pickup)
+    later = Trip("later", DAY + timedelta(hours=2), DAY + timedelta(hours=3), pickup, pickup)
+
+    plan = DispatchPlanner([fixed, clash, later], ["a1"], {DAY.date(): {"a1"}}).solve(time_limit=1)
+
+    assert [item["booking_id"] for item in plan["assignments"]] == ["later"]
+    assert plan["unassigned_booking_ids"] == ["clash"]
+
+def seed_fleet(conn):
+    """Two ambulances, only the second big enough for min_capacity=3, both with a driver on DAY"""
+    ambulance_ids = []
+    for n, capacity in enumerate((1, 4)):
+        ambulance_id = conn.execute(
+            "INSERT INTO ambulances (license_plate, model, capacity) VALUES (%s, 'Ford Transit', %s) RETURNING id",
+            (f"DISPATCH-{n}", capacity)
+        ).fetchone()[0]
+        driver_id = conn.execute(
+            "INSERT INTO drivers (name, phone, license_number) VALUES (%s, %s, %s) RETURNING id",
+            (f"Driver {n}", f"+1555000000{n}", f"DL-{n}")
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO driver_assignments (driver_id, ambulance_id, assignment_date) VALUES (%s, %s, %s)",
+            (driver_id, ambulance_id, DAY.date())
+        )
+        ambulance_ids.append(str(ambulance_id))
+    return ambulance_ids
+
+def seed_pending_bookings(conn, count):
+    location_id = conn.execute(
+        "INSERT INTO locations (address, latitude, longitude) VALUES ('1 Main St', 40.7, -74.0) RETURNING id"
+    ).fetchone()[0]
+    booking_ids = []
+    for n in range(count):
+        start = DAY + timedelta(hours=2 * n)
+        booking_ids.append(str(conn.execute(
+            "INSERT INTO bookings (name, phone, pickup_location_id, drop_location_id, from_date, to_date) "
+            "VALUES ('Test Patient', '+15550000000', %s, %s, %s, %s) RETURNING id",
+            (location_id, location_id, start, start + timedelta(hours=1))
+        ).fetchone()[0]))
+    return booking_ids
+
+def dispatch(client, **fields):
+    body = {"from_date": DAY.isoformat(), "to_date": (DAY + timedelta(days=1)).isoformat(), **fields}
+    response = client.post("/api/admin/dispatch", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_dispatch_uses_only_ambulances_with_enough_capacity(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        small, large = seed_fleet(conn)
+        booking_ids = seed_pending_bookings(conn, 3)
+
+    result = dispatch(client, min_capacity=3)
+
+    assert sorted(item["booking_id"] for item in result["assignments"]) == sorted(booking_ids)
+    assert {item["ambulance_id"] for item in result["assignments"]} == {large}
+    assert all(availability_index.booking_slot(booking_id)[0] == large for booking_id in booking_ids)
+
+def test_dispatch_skips_bookings_changed_after_planning(client, database, monkeypatch):
+    import app.main
+
+    with psycopg.connect(database, autocommit=True) as conn:
+        seed_fleet(conn)
+        cancelled, kept = seed_pending_bookings(conn, 2)
+
+    plan_dispatch = app.main.plan_dispatch
+
+    async def plan_then_cancel(*args, **kwargs):
+        plan = await plan_dispatch(*args, **kwargs)
+        # Another admin cancels one of the planned bookings before the plan is applied
+        with psycopg.connect(database, autocommit=True) as conn:
+            conn.execute("UPDATE bookings SET status = 'cancelled' WHERE id = %s", (cancelled,))
+        return plan
+
+    monkeypatch.setattr(app.main, "plan_dispatch", plan_then_cancel)
+    result = dispatch(client)
+
+    assert [item["booking_id"] for item in result["assignments"]] == [kept]
+    assert result["skipped_booking_ids"] == [cancelled]
+    assert availability_index.booking_slot(cancelled) is None
+    assert availability_index.booking_slot(kept) is not None
+    with psycopg.connect(database) as conn:
+        status, ambulance_id = conn.execute("SELECT status, assigned_ambulance_id FROM bookings WHERE id = %s", (cancelled,)).fetchone()
+    assert (status, ambulance_id) == ("cancelled", None)
@@ -0,0 +1,130 @@
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg
+
+# The rollup table as it should be, computed straight from expenses
+DIRECT_ROLLUPS = """
+    SELECT date_trunc('month', expense_date)::date, category::text, type::text,
+           coalesce(ambulance_id, uuid_nil()), coalesce(employee_id, uuid_nil()), sum(amount), count(*)
+    FROM expenses GROUP BY 1, 2, 3, 4, 5
+"""
+ROLLUPS = "SELECT month, category, type, ambulance_id, employee_id, total_amount, expense_count FROM expense_rollups"
+
+def assert_rollups_match(conn):
+    assert sorted(conn.execute(ROLLUPS).fetchall()) == sorted(conn.execute(DIRECT_ROLLUPS).fetchall())
+
+def insert_expense(conn, category, type, amount, expense_date, ambulance_id=None, employee_id=None):
+    return conn.execute(
+        """INSERT INTO expenses (category, type, amount, expense_date, ambulance_id, employee_id, bill_file_path)
+           VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id""",
+        (category, type, amount, expense_date, ambulance_id, employee_id, "bills/receipt.jpg")
+    ).fetchone()[0]
+
+def test_rollup_triggers_follow_every_expense_write(database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        van, bus = (conn.execute(
+            "INSERT INTO ambulances (license_plate, model, capacity) VALUES (%s, 'Van', 2) RETURNING id", (plate,)
+        ).fetchone()[0] for plate in ("ROLL-1", "ROLL-2"))
+        ann = conn.execute(
+            "INSERT INTO employees (name, phone, position) VALUES ('Ann', '+15550500001', 'Driver') RETURNING id"
+        ).fetchone()[0]
+
+        fuel = insert_expense(conn, "ambulette", "fuel", 40, date(2025, 1, 5), ambulance_id=van)
+        insert_expense(conn, "ambulette", "fuel", 60, date(2025, 1, 20), ambulance_id=van)
+        repair = insert_expense(conn, "ambulette", "maintenance", 300, date(2025, 1, 9), ambulance_id=bus)
+        salary = insert_expense(conn, "employee", "salary", 2000, date(2025, 1, 31), employee_id=ann)
+        insert_expense(conn, "ambulette", "other", 15, date(2025, 2, 1), ambulance_id=bus, employee_id=ann)
+        assert_rollups_match(conn)
+        assert conn.execute(
+            "SELECT total_amount, expense_count FROM expense_rollups WHERE ambulance_id = %s AND type = 'fuel'", (van,)
+        ).fetchone() == (100, 2)
+
+        # Every column of the rollup key can move, and the amount can change in place
+        conn.execute("UPDATE expenses SET amount = 55 WHERE id = %s", (fuel,))
+        assert_rollups_match(conn)
+        conn.execute("UPDATE expenses SET expense_date = '2025-02-14', ambulance_id = %s WHERE id = %s", (bus, fuel))
+        assert_rollups_match(conn)
+        conn.execute("UPDATE expenses SET category = 'employee', type = 'bonus', ambulance_id = NULL, employee_id = %s WHERE id = %s", (ann, repair))
+        assert_rollups_match(conn)
+        # An update that touches no rollup column leaves the rollups alone
+        conn.execute("UPDATE expenses SET description = 'receipt attached' WHERE id = %s", (salary,))
+        assert_rollups_match(conn)
+
+        # Deletes, including the ON DELETE SET NULL from removing an employee
+        conn.execute("DELETE FROM expenses WHERE id = %s", (salary,))
+        assert_rollups_match(conn)
+        conn.execute("DELETE FROM expenses WHERE id = %s", (repair,))
+        assert_rollups_match(conn)
+        conn.execute("DELETE FROM employees WHERE id = %s", (ann,))
+        assert_rollups_match(conn)
+        assert conn.execute("SELECT count(*) FROM expense_rollups WHERE expense_count <= 0").fetchone()[0] == 0
+
+        before = sorted(conn.execute(ROLLUPS).fetchall())
+        assert conn.execute("SELECT rebuild_expense_rollups()").fetchone()[0] == len(before)
+        assert sorted(conn.execute(ROLLUPS).fetchall()) == before
+
+        conn.execute("DELETE FROM expenses")
+        assert conn.execute("SELECT count(*) FROM expense_rollups").fetchone()[0] == 0
+
+def add_completed_trips(conn, ambulance_id, start, count):
+    location_id = conn.execute(
+        "INSERT INTO locations (address, latitude, longitude) VALUES ('1 Main St', 40.7, -74.0) RETURNING id"
+    ).fetchone()[0]
+    for number in range(count):
+        from_date = start + timedelta(days=number)
+        conn.execute(
+            """INSERT INTO bookings (name, phone, pickup_location_id, drop_location_id, from_date, to_date, status, assigned_ambulance_id)
+               VALUES ('Test Patient', '+15550000000', %s, %s, %s, %s, 'completed', %s)""",
+            (location_id, location_id, from_date, from_date + timedelta(hours=1), ambulance_id)
+        )
+
+def test_expense_summary_matches_the_expenses(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        van, bus = (conn.execute(
+            "INSERT INTO ambulances (license_plate, model, capacity) VALUES (%s, 'Van', 2) RETURNING id", (plate,)
+        ).fetchone()[0] for plate in ("SUM-1", "SUM-2"))
+        insert_expense(conn, "ambulette", "fuel", 40, date(2025, 1, 5), ambulance_id=van)
+        changed = insert_expense(conn, "ambulette", "maintenance", 200, date(2025, 1, 9), ambulance_id=van)
+        insert_expense(conn, "ambulette", "fuel", 90, date(2025, 2, 3), ambulance_id=bus)
+        gone = insert_expense(conn, "ambulette", "fuel", 500, date(2025, 2, 4), ambulance_id=bus)
+        insert_expense(conn, "ambulette", "fuel", 999, date(2024, 12, 31), ambulance_id=van)
+        conn.execute("UPDATE expenses SET amount = 110 WHERE id = %s", (changed,))
+        conn.execute("DELETE FROM expenses WHERE id = %s", (gone,))
+
+        add_completed_trips(conn, van, datetime(2025, 1, 10, 9, tzinfo=timezone.utc), 3)
+        add_completed_trips(conn, bus, datetime(2025, 2, 10, 9, tzinfo=timezone.utc), 2)
+
+        expected = {
+            str(row[0]): (float(row[1]), row[2], row[3]) for row in conn.execute(
+                """SELECT a.id, sum(e.amount), count(*),
+                          (SELECT count(*) FROM bookings b WHERE b.assigned_ambulance_id = a.id AND b.status = 'completed'
+                           AND b.from_date >= '2025-01-01' AND b.from_date < '2025-03-01')
+                   FROM expenses e JOIN ambulances a ON a.id = e.ambulance_id
+                   WHERE e.expense_date >= '2025-01-01' AND e.expense_date < '2025-03-01'
+                   GROUP BY a.id"""
+            )
+        }
+
+    response = client.get("/api/admin/expenses/summary", params={"from_date": "2025-01-15", "to_date": "2025-02-15"})
+    assert response.status_code == 200, response.text
+    summary = response.json()
+    assert (summary["from_month"], summary["to_month"]) == ("2025-01-01", "2025-02-01")
+
+    rows = {row["ambulance_id"]: row for row in summary["rows"]}
+    assert set(rows) == set(expected)
+    for ambulance_id, (total, count, trips) in expected.items():
+        row = rows[ambulance_id]
+        assert (row["total_amount"], row["expense_count"], row["completed_trips"]) == (total, count, trips)
+        assert row["cost_per_trip"] == round(total / trips, 2)
+    assert rows[str(van)]["ambulance_plate"] == "SUM-1"
+    assert summary["total_amount"] == sum(total for total, _, _ in expected.values())
+
+    # By month, trips are counted in the month they ran
+    response = client.get("/api/admin/expenses/summary", params={"from_date": "2025-01-01", "to_date": "2025-02-28", "group_by": ["month", "ambulance"]})
+    by_month = {(row["month"], row["ambulance_id"]): row for row in response.json()["rows"]}
+    assert set(by_month) == {("2025-01-01", str(van)), ("2025-02-01", str(bus))}
+    assert by_month[("2025-01-01", str(van))]["cost_per_trip"] == round(150 / 3, 2)
+    assert by_month[("2025-02-01", str(bus))]["cost_per_trip"] == 45.0
+
+    assert client.get("/api/admin/expenses/summary", params={"group_by": "plate"}).status_code == 400
+    assert client.get("/api/admin/expenses/summary", params={"from_date": "2025-03-01", "to_date": "2025-01-01"}).status_code == 400
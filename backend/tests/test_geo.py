@@ -0,0 +1,121 @@
+import math
+import random
+
+import psycopg
+import pytest
+
+from app.availability import AvailabilityIndex, availability_index
+from app.geo import KM_PER_DEGREE, SpatialIndex, haversine_km, haversine_matrix
+
+def brute_force(points, latitude, longitude, n, max_km=None, predicate=None):
+    distances = sorted(
+        (haversine_km(latitude, longitude, lat, lon), key) for key, (lat, lon) in points.items()
+        if predicate is None or predicate(key)
+    )
+    if max_km is not None:
+        distances = [(distance, key) for distance, key in distances if distance <= max_km]
+    return [(key, distance) for distance, key in distances[:n]]
+
+def assert_same(result, expected):
+    assert [key for key, _ in result] == [key for key, _ in expected]
+    assert [distance for _, distance in result] == pytest.approx([distance for _, distance in expected])
+
+def test_haversine_known_distances():
+    assert haversine_km(0, 0, 0, 0) == 0
+    assert haversine_km(40, -74, 41, -74) == pytest.approx(KM_PER_DEGREE)
+    # Half the equator
+    assert haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * 6371.0088)
+    # JFK to LAX
+    assert haversine_km(40.6413, -73.7781, 33.9416, -118.4085) == pytest.approx(3983, rel=0.005)
+
+    matrix = haversine_matrix([40.0, 41.0], [-74.0, -74.0], [40.0, 41.0, 42.0], [-74.0, -74.0, -74.0])
+    assert matrix.shape == (2, 3)
+    assert matrix[1, 2] == pytest.approx(haversine_km(41.0, -74.0, 42.0, -74.0))
+
+@pytest.mark.parametrize("spread_deg, count", [(0.3, 500), (5.0, 200), (0.001, 50)])
+def test_nearest_and_radius_queries_match_brute_force(spread_deg, count):
+    rng = random.Random(count)
+    points = {
+        f"p{i}": (40.7 + rng.uniform(-spread_deg, spread_deg), -74.0 + rng.uniform(-spread_deg, spread_deg))
+        for i in range(count)
+    }
+    index = SpatialIndex.from_points(points)
+    only_even = lambda key: int(key[1:]) % 2 == 0
+
+    for _ in range(25):
+        latitude = 40.7 + rng.uniform(-2 * spread_deg, 2 * spread_deg)
+        longitude = -74.0 + rng.uniform(-2 * spread_deg, 2 * spread_deg)
+        for n in (1, 5, 20):
+            assert_same(index.nearest(latitude, longitude, n), brute_force(points, latitude, longitude, n))
+        assert_same(index.nearest(latitude, longitude, 5, predicate=only_even), brute_force(points, latitude, longitude, 5, predicate=only_even))
+        # Everything within a radius
+        radius_km = spread_deg * KM_PER_DEGREE / 3
+        assert_same(index.nearest(latitude, longitude, count, max_km=radius_km), brute_force(points, latitude, longitude, count, max_km=radius_km))
+
+def test_nearest_with_fixed_cell_size_matches_brute_force():
+    rng = random.Random(3)
+    points = {f"p{i}": (40.0 + rng.random(), -74.0 + rng.random()) for i in range(300)}
+    for cell_km in (0.5, 5.0, 50.0):
+        index = SpatialIndex(cell_km)
+        for key, (latitude, longitude) in points.items():
+            index.upsert(key, latitude, longitude)
+        assert_same(index.nearest(40.5, -73.5, 10), brute_force(points, 40.5, -73.5, 10))
+
+def test_upsert_moves_a_point_between_cells():
+    index = SpatialIndex(cell_km=1.0)
+    index.upsert("a", 40.70, -74.00)
+    index.upsert("b", 40.80, -74.00)
+
+    assert index.nearest(40.70, -74.00, 1)[0][0] == "a"
+
+    # Moving "a" far away leaves "b" as the closest and empties a's old cell
+    index.upsert("a", 41.50, -74.00)
+    assert len(index) == 2
+    assert index.nearest(40.70, -74.00, 1)[0][0] == "b"
+    assert index.nearest(41.50, -74.00, 1) == [("a", pytest.approx(0.0))]
+    assert sum(len(bucket) for bucket in index.cells.values()) == 2
+
+    index.remove("a")
+    index.remove("a")
+    assert len(index) == 1
+    assert [key for key, _ in index.nearest(41.50, -74.00, 5)] == ["b"]
+
+def test_position_updates_feed_nearest_available():
+    index = AvailabilityIndex()
+    index.upsert_ambulance("a1", "AMB-1", "Ford Transit", 2)
+    index.upsert_ambulance("a2", "AMB-2", "Ford Transit", 2)
+    index.update_position("a1", 40.70, -74.00)
+    index.update_position("a2", 40.90, -74.00)
+
+    assert [ambulance["id"] for ambulance, _ in index.nearest_available(40.71, -74.00, n=1)] == ["a1"]
+
+    index.update_position("a1", 41.50, -74.00)
+    assert [ambulance["id"] for ambulance, _ in index.nearest_available(40.71, -74.00, n=2)] == ["a2", "a1"]
+
+    index.remove_ambulance("a2")
+    assert [ambulance["id"] for ambulance, _ in index.nearest_available(40.71, -74.00, n=2)] == ["a1"]
+
+def test_position_endpoint_updates_nearest(client, database):
+    with psycopg.connect(database, autocommit=True) as conn:
+        near, far = (
+            str(conn.execute(
+                "INSERT INTO ambulances (license_plate, model, capacity, current_latitude, current_longitude) "
+                "VALUES (%s, 'Ford Transit', 2, %s, -74.0) RETURNING id", (plate, latitude)
+            ).fetchone()[0])
+            for plate, latitude in (("GEO-1", 40.70), ("GEO-2", 40.90))
+        )
+    # Rows written behind the app's back are picked up on the next load
+    availability_index.invalidate()
+
+    def nearest():
+        response = client.get("/api/admin/ambulances/nearest", params={"latitude": 40.71, "longitude": -74.0, "limit": 2})
+        assert response.status_code == 200, response.text
+        return [item["id"] for item in response.json()]
+
+    assert nearest() == [near, far]
+
+    response = client.put(f"/api/admin/ambulances/{near}/position", json={"latitude": 41.5, "longitude": -74.0})
+    assert response.status_code == 200, response.text
+    assert nearest() == [far, near]
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT current_latitude FROM ambulances WHERE id = %s", (near,)).fetchone()[0] == pytest.approx(41.5)
@@ -0,0 +1,104 @@
+import json
+
+import psycopg
+
+from app.availability import availability_index
+
+def upload(client, entity, filename, content, **params):
+    response = client.post(f"/api/admin/import/{entity}", params=params, files={"file": (filename, content.encode())})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def errors(result):
+    return [(error["line"], error["message"]) for error in result["errors"]]
+
+def ndjson(*records):
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+def test_malformed_csv_rows_are_reported_by_line(client, database):
+    content = (
+        "license_plate,model,capacity\n"
+        "IMP-1,Ford Transit,2\n"
+        "IMP-2,Ford Transit,lots\n"
+        "IMP-3\n"
+        "IMP-4,\"Ford\nTransit\",0\n"
+        "IMP-5,Ford Transit,4,unexpected\n"
+        "IMP-1,Ford Transit,2\n"
+    )
+    result = upload(client, "ambulances", "fleet.csv", content)
+
+    assert (result["total_rows"], result["imported"], result["updated"], result["failed"]) == (6, 2, 0, 4)
+    assert [line for line, _ in errors(result)] == [3, 4, 6, 8]
+    assert "capacity" in errors(result)[0][1]
+    assert "model" in errors(result)[1][1]
+    assert errors(result)[2] == (6, "capacity must be between 1 and 1000")
+    assert errors(result)[3] == (8, "Duplicate license_plate in file")
+    with psycopg.connect(database) as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT license_plate FROM ambulances")) == ["IMP-1", "IMP-5"]
+
+def test_unreadable_files_are_rejected_whole(client, database):
+    response = client.post("/api/admin/import/employees", files={"file": ("staff.ndjson", b'{"name": "Ann"}\n[1, 2]\n')})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Line 2 is not a JSON object"
+    response = client.post("/api/admin/import/employees", files={"file": ("staff.csv", b"\xff\xfe\x00bad")})
+    assert response.status_code == 400
+
+def test_ndjson_ignores_unknown_columns(client, database):
+    content = ndjson(
+        {"name": "Ann", "phone": "+15550100001", "position": "Driver", "nickname": "A", "badge": {"id": 7}},
+        {"name": "Bob", "phone": "+15550100002", "position": "Driver", "email": "not-an-email", "shift": "night"},
+        {"nickname": "no name or phone"},
+    )
+    result = upload(client, "employees", "staff.ndjson", content)
+
+    assert (result["imported"], result["failed"]) == (1, 2)
+    assert [line for line, _ in errors(result)] == [2, 3]
+    assert "email" in errors(result)[0][1]
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT name, phone, position FROM employees").fetchall() == [("Ann", "+15550100001", "Driver")]
+
+def test_reimport_updates_instead_of_duplicating(client, database):
+    content = "license_plate,model,capacity\nRE-1,Ford Transit,2\nRE-2,Mercedes Sprinter,4\n"
+    first = upload(client, "ambulances", "fleet.csv", content)
+    assert (first["imported"], first["updated"], first["failed"]) == (2, 0, 0)
+    assert len(client.get("/api/admin/ambulances").json()) == 2
+
+    # A dry run reports what would happen and leaves the table alone
+    changed = content.replace("Mercedes Sprinter,4", "Mercedes Sprinter,6") + "RE-3,Ford Transit,2\n"
+    dry = upload(client, "ambulances", "fleet.csv", changed, dry_run="true")
+    assert (dry["imported"], dry["updated"], dry["failed"]) == (1, 2, 0)
+
+    again = upload(client, "ambulances", "fleet.csv", changed)
+    assert (again["imported"], again["updated"], again["failed"]) == (1, 2, 0)
+    with psycopg.connect(database) as conn:
+        assert sorted(conn.execute("SELECT license_plate, capacity FROM ambulances").fetchall()) == [("RE-1", 2), ("RE-2", 6), ("RE-3", 2)]
+        ambulance_id = str(conn.execute("SELECT id FROM ambulances WHERE license_plate = 'RE-1'").fetchone()[0])
+
+    # Neither the cached list nor the availability index keeps the old capacity
+    assert sorted((item["license_plate"], item["capacity"]) for item in client.get("/api/admin/ambulances").json()) == [("RE-1", 2), ("RE-2", 6), ("RE-3", 2)]
+    assert availability_index.is_stale
+
+    # Expenses have no key of their own, so an identical row is the same expense
+    expenses = ndjson(
+        {"category": "ambulette", "type": "other", "amount": 12.5, "description": "Car wash", "ambulance_id": ambulance_id, "expense_date": "2025-03-03"},
+        {"category": "ambulette", "type": "other", "amount": 40, "ambulance_id": ambulance_id, "expense_date": "2025-03-04"},
+    )
+    assert upload(client, "expenses", "expenses.ndjson", expenses)["imported"] == 2
+    result = upload(client, "expenses", "expenses.ndjson", expenses)
+    assert (result["imported"], result["updated"]) == (0, 2)
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM expenses").fetchone()[0] == 2
+
+def test_reimport_cannot_take_another_rows_unique_value(client, database):
+    drivers = "name,phone,license_number\nAnn,+15550200001,LIC-1\nBob,+15550200002,LIC-2\n"
+    assert upload(client, "drivers", "drivers.csv", drivers)["imported"] == 2
+
+    # Ann renamed is an update; Bob taking Ann's licence is a conflict
+    result = upload(client, "drivers", "drivers.csv", "name,phone,license_number\nAnn Lee,+15550200001,LIC-1\nBob,+15550200002,LIC-1\n")
+    assert (result["imported"], result["updated"]) == (0, 1)
+    assert errors(result) == [(3, "Duplicate license_number in file")]
+
+    result = upload(client, "drivers", "drivers.csv", "name,phone,license_number\nBob,+15550200002,LIC-1\n")
+    assert errors(result) == [(2, "license_number already exists")]
+    with psycopg.connect(database) as conn:
+        assert sorted(conn.execute("SELECT name, license_number FROM drivers").fetchall()) == [("Ann Lee", "LIC-1"), ("Bob", "LIC-2")]
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from app.locations import location_cache, location_key
+
+PICKUP = {"address": "1 Main St, Springfield", "latitude": 40.7128, "longitude": -74.006}
+DROP = {"address": "200 Hospital Way", "latitude": 40.7306, "longitude": -73.9866}
+
+def booking(**fields):
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    return {
+        "name": "Test Patient",
+        "phone": "+15550001111",
+        "pickup_location": PICKUP,
+        "drop_location": DROP,
+        "from_date": start.isoformat(),
+        "to_date": (start + timedelta(hours=1)).isoformat(),
+        **fields,
+    }
+
+def create_booking(client, body):
+    from app.main import create_phone_token
+
+    return client.post("/api/bookings", json=body, headers={"X-Phone-Token": create_phone_token(body["phone"])})
+
+def keys():
+    return [location_key(**PICKUP), location_key(**DROP)]
+
+def test_locations_are_cached_once_the_booking_commits(client, database):
+    response = create_booking(client, booking())
+    assert response.status_code == 200, response.text
+
+    with psycopg.connect(database) as conn:
+        location_ids = dict(conn.execute("SELECT canonical_key, id::text FROM locations").fetchall())
+    assert [location_cache.get(key) for key in keys()] == [location_ids[key] for key in keys()]
+
+    # The next booking at the same addresses reuses both rows
+    assert create_booking(client, booking()).status_code == 200
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM locations").fetchone()[0] == 2
+
+def test_rolled_back_booking_leaves_no_location_in_the_cache(client, database):
+    # Passes request validation but fails the bookings valid_email check after the locations were inserted
+    with pytest.raises(psycopg.errors.CheckViolation):
+        create_booking(client, booking(email="not-an-email"))
+
+    assert [location_cache.get(key) for key in keys()] == [None, None]
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM locations").fetchone()[0] == 0
+
+    # A cached id from the rolled-back transaction would make this a foreign-key violation
+    response = create_booking(client, booking())
+    assert response.status_code == 200, response.text
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM bookings").fetchone()[0] == 1
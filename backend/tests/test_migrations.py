@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+import psycopg
+
+from app.migrations import Migration, load_migrations, pending_migrations, run_migrations
+
+async def migrate_twice(url):
+    conn = await psycopg.AsyncConnection.connect(url)
+    try:
+        first = await run_migrations(conn)
+        second = await run_migrations(conn)
+        cursor = await conn.execute("SELECT max(version) FROM schema_version WHERE checksum IS NOT NULL")
+        version = (await cursor.fetchone())[0]
+        cursor = await conn.execute(
+            "SELECT count(*) FROM pg_trigger WHERE tgname LIKE 'update\\_%%\\_updated\\_at' AND NOT tgisinternal"
+        )
+        triggers = (await cursor.fetchone())[0]
+        return first, second, version, triggers
+    finally:
+        await conn.close()
+
+def test_migrations_apply_to_an_empty_database(empty_database):
+    migrations = load_migrations()
+
+    applied, reapplied, version, triggers = asyncio.run(migrate_twice(empty_database))
+
+    assert applied == len(migrations)
+    assert reapplied == 0
+    assert version == migrations[-1].version
+    # One updated_at trigger per table that has the column, expenses included
+    assert triggers == 9
+
+def test_edited_migration_is_logged_and_not_reapplied(caplog):
+    migrations = [Migration("0001", "initial", "", "a" * 64), Migration("0002", "more", "", "b" * 64)]
+
+    with caplog.at_level(logging.WARNING, logger="app.migrations"):
+        pending = pending_migrations(migrations, {"0001": "c" * 64})
+
+    assert [migration.version for migration in pending] == ["0002"]
+    assert [record.getMessage() for record in caplog.records] == [
+        "Migration 0001_initial changed after it was applied; edit schema with a new migration instead"
+    ]
@@ -0,0 +1,215 @@
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from app.otp import MemoryOTPBackend, OTPBackend, OTPError, OTPRateLimited, PostgresOTPBackend, RateLimiter
+
+PHONE = "+15550002222"
+
+def expires_in(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+def test_backend_must_implement_every_operation():
+    class Partial(OTPBackend):
+        async def issue(self, phone, code, expires_at, conn=None):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_rate_limiter_window_slides():
+    limiter = RateLimiter(limit=2, window_seconds=10)
+    limiter.hit("a", 0.0)
+    limiter.hit("a", 4.0)
+
+    assert limiter.retry_after("a", 5.0) == pytest.approx(5.0)
+    assert limiter.retry_after("b", 5.0) == 0.0
+    # The first hit leaves the window at t=10, freeing one slot
+    assert limiter.retry_after("a", 10.0) == 0.0
+    limiter.hit("a", 10.0)
+    assert limiter.retry_after("a", 11.0) == pytest.approx(3.0)
+    limiter.reset("a")
+    assert limiter.retry_after("a", 11.0) == 0.0
+
+def test_rate_limiter_drops_least_recently_used_keys():
+    limiter = RateLimiter(limit=1, window_seconds=60, max_keys=2)
+    limiter.hit("a", 0.0)
+    limiter.hit("b", 0.0)
+    limiter.hit("a", 1.0)
+    limiter.hit("c", 1.0)
+
+    assert list(limiter.hits) == ["a", "c"]
+    assert limiter.retry_after("b", 2.0) == 0.0
+
+def test_memory_backend_limits_sends_and_failed_verifications():
+    async def run():
+        backend = MemoryOTPBackend()
+        backend.send_limiter = RateLimiter(limit=2, window_seconds=60)
+        backend.verify_limiter = RateLimiter(limit=2, window_seconds=60)
+
+        await backend.issue(PHONE, "111111", expires_in(300))
+        await backend.issue(PHONE, "222222", expires_in(300))
+        with pytest.raises(OTPRateLimited) as limited:
+            await backend.issue(PHONE, "333333", expires_in(300))
+        assert 1 <= limited.value.retry_after <= 60
+
+        for _ in range(2):
+            with pytest.raises(OTPError):
+                await backend.verify(PHONE, "000000")
+        # Locked out even with the right code until the window passes
+        with pytest.raises(OTPRateLimited):
+            await backend.verify(PHONE, "222222")
+
+    asyncio.run(run())
+
+def test_memory_backend_expires_entries(monkeypatch):
+    async def run():
+        backend = MemoryOTPBackend()
+        await backend.issue(PHONE, "123456", expires_in(-1))
+        await backend.issue("+15550003333", "654321", expires_in(300))
+
+        assert PHONE not in backend.entries
+        with pytest.raises(OTPError, match="No OTP found"):
+            await backend.verify(PHONE, "123456")
+        assert await backend.verified_until(PHONE) is None
+
+        # An entry that expires after being verified is gone too
+        await backend.verify("+15550003333", "654321")
+        later = time.time() + 301
+        monkeypatch.setattr("app.otp.time.time", lambda: later)
+        assert await backend.sweep() == 1
+        assert await backend.verified_until("+15550003333") is None
+
+    asyncio.run(run())
+
+def test_memory_backend_drops_soonest_expiring_entries_over_capacity():
+    async def run():
+        backend = MemoryOTPBackend(max_entries=2)
+        await backend.issue("+15550000001", "111111", expires_in(300))
+        await backend.issue("+15550000002", "222222", expires_in(100))
+        await backend.issue("+15550000003", "333333", expires_in(200))
+
+        assert sorted(backend.entries) == ["+15550000001", "+15550000003"]
+
+    asyncio.run(run())
+
+def test_memory_backend_sweep_compacts_stale_heap_items():
+    async def run():
+        backend = MemoryOTPBackend()
+        phones = [f"+1555{n:07d}" for n in range(1100)]
+        for phone in phones:
+            await backend.issue(phone, "123456", expires_in(300))
+        for phone in phones[1:]:
+            await backend.consume(phone)
+
+        assert len(backend.expiry_heap) == 1100
+        assert await backend.sweep() == 0
+        assert [item[2] for item in backend.expiry_heap] == [phones[0]]
+
+    asyncio.run(run())
+
+async def check_single_use(backend, conn=None):
+    await backend.issue(PHONE, "123456", expires_in(300), conn)
+    assert await backend.verified_until(PHONE, conn) is None
+    with pytest.raises(OTPError):
+        await backend.verify(PHONE, "654321", conn)
+
+    await backend.verify(PHONE, "123456", conn)
+    assert await backend.verified_until(PHONE, conn) > datetime.now(timezone.utc)
+
+    await backend.consume(PHONE, conn)
+    assert await backend.verified_until(PHONE, conn) is None
+    with pytest.raises(OTPError):
+        await backend.verify(PHONE, "123456", conn)
+
+    # A new code replaces the old one, which no longer verifies
+    await backend.issue(PHONE, "111111", expires_in(300), conn)
+    with pytest.raises(OTPError):
+        await backend.verify(PHONE, "123456", conn)
+    await backend.verify(PHONE, "111111", conn)
+
+def test_memory_backend_verification_is_single_use():
+    asyncio.run(check_single_use(MemoryOTPBackend()))
+
+def test_postgres_backend_verification_is_single_use(database):
+    async def run():
+        conn = await psycopg.AsyncConnection.connect(database)
+        try:
+            await check_single_use(PostgresOTPBackend(), conn)
+            await conn.execute("UPDATE otp_verifications SET expires_at = now() - interval '1 second'")
+            await conn.commit()
+            with pytest.raises(OTPError, match="expired"):
+                await PostgresOTPBackend().verify(PHONE, "111111", conn)
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
+
+def test_otp_verification_allows_one_booking(client, database):
+    from app.main import otp_backend
+
+    # The module-level backend keeps per-process rate limits across tests
+    otp_backend.send_limiter.reset(PHONE)
+    response = client.post("/api/send-otp", json={"phone": PHONE})
+    assert response.status_code == 200, response.text
+    code = re.search(r"For testing: (\d{6})", response.json()["message"]).group(1)
+    assert client.post("/api/verify-otp", json={"phone": PHONE, "otp": code}).status_code == 200
+
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    location = {"address": "1 Main St", "latitude": 40.7, "longitude": -74.0}
+    booking = {
+        "name": "Test Patient", "phone": PHONE, "pickup_location": location, "drop_location": location,
+        "from_date": start.isoformat(), "to_date": (start + timedelta(hours=1)).isoformat(),
+    }
+    assert client.post("/api/bookings", json=booking).status_code == 200
+
+    second = client.post("/api/bookings", json=booking)
+    assert second.status_code == 400
+    assert "verified" in second.json()["detail"]
+
+def test_phone_token_is_bound_to_its_phone():
+    from app.main import create_phone_token, verify_phone_token
+
+    token = create_phone_token(PHONE)
+    assert verify_phone_token(token, PHONE)
+    assert not verify_phone_token(token, "+15550003333")
+    assert not verify_phone_token(token + "x", PHONE)
+
+def test_phone_and_admin_tokens_stay_in_their_lanes(client, database, monkeypatch):
+    from app.main import app, create_access_token, create_phone_token, token_cache, verify_token
+
+    monkeypatch.delitem(app.dependency_overrides, verify_token)
+    token_cache.clear()
+    other = "+15550003333"
+    phone_token = create_phone_token(PHONE)
+    admin_token = create_access_token({"sub": "admin"})
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    location = {"address": "1 Main St", "latitude": 40.7, "longitude": -74.0}
+    booking = {
+        "name": "Test Patient", "phone": other, "pickup_location": location, "drop_location": location,
+        "from_date": start.isoformat(), "to_date": (start + timedelta(hours=1)).isoformat(),
+    }
+
+    # A token for one phone does not verify another
+    response = client.post("/api/bookings", json=booking, headers={"X-Phone-Token": phone_token})
+    assert response.status_code == 401
+    response = client.post("/api/bookings/by-phone", json={"phone": other}, headers={"X-Phone-Token": phone_token})
+    assert response.status_code == 401
+
+    # A phone token is not an admin token
+    response = client.get("/api/admin/employees", headers={"Authorization": f"Bearer {phone_token}"})
+    assert response.status_code == 401
+
+    # ... and an admin token does not stand in for a verified phone
+    headers = {"Authorization": f"Bearer {admin_token}", "X-Phone-Token": admin_token}
+    assert client.get("/api/admin/employees", headers=headers).status_code == 200
+    assert client.post("/api/bookings", json=booking, headers=headers).status_code == 401
+    assert client.post("/api/bookings/by-phone", json={"phone": other}, headers=headers).status_code == 401
+
+    with psycopg.connect(database) as conn:
+        assert conn.execute("SELECT count(*) FROM bookings").fetchone()[0] == 0
+    token_cache.clear()
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import time
+
+import psycopg
+
+from app import passwords
+from app.passwords import PasswordHasher, hash_password, verify_password
+
+def legacy_hash(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def test_scrypt_round_trip():
+    stored = hash_password("s3cret")
+    assert stored.startswith("scrypt$16384$8$1$")
+    assert hash_password("s3cret") != stored, "every hash gets its own salt"
+
+    assert verify_password("s3cret", stored) == (True, False)
+    assert verify_password("s3cret!", stored) == (False, False)
+    assert verify_password("", stored) == (False, False)
+
+def test_malformed_hashes_never_match():
+    for stored in ("", "scrypt$1$2", "bcrypt$16384$8$1$c2FsdA$aGFzaA", "scrypt$x$8$1$c2FsdA$aGFzaA", legacy_hash("s3cret").upper()):
+        assert verify_password("s3cret", stored) == (False, False)
+
+def test_legacy_sha256_verifies_and_asks_for_a_rehash():
+    stored = legacy_hash("admin123")
+    assert verify_password("admin123", stored) == (True, True)
+    assert verify_password("admin124", stored) == (False, False)
+
+def test_outdated_scrypt_parameters_ask_for_a_rehash(monkeypatch):
+    monkeypatch.setattr(passwords, "SCRYPT_N", 2 ** 10)
+    stored = hash_password("s3cret")
+    monkeypatch.undo()
+    assert verify_password("s3cret", stored) == (True, True)
+
+def test_unknown_users_are_verified_against_the_dummy_hash(monkeypatch):
+    checked = []
+
+    def recording_verify(password, stored_hash):
+        checked.append(stored_hash)
+        return verify_password(password, stored_hash)
+
+    monkeypatch.setattr(passwords, "verify_password", recording_verify)
+    hasher = PasswordHasher(workers=0)
+
+    # The dummy hash is a real scrypt hash, so a missing user costs as much as a wrong password
+    assert asyncio.run(hasher.verify("anything", None)) == (False, False)
+    assert checked == [passwords.DUMMY_HASH]
+    assert passwords.DUMMY_HASH.startswith("scrypt$")
+
+def test_hasher_runs_in_its_pool():
+    hasher = PasswordHasher(workers=2)
+    try:
+        stored = asyncio.run(hasher.hash("s3cret"))
+        assert asyncio.run(hasher.verify("s3cret", stored)) == (True, False)
+        assert hasher.executor is not None
+    finally:
+        hasher.shutdown()
+    assert hasher.executor is None
+
+def stored_hash(database, username):
+    with psycopg.connect(database) as conn:
+        return conn.execute("SELECT password_hash FROM admin_users WHERE username = %s", (username,)).fetchone()[0]
+
+def test_login_replaces_a_legacy_hash_with_scrypt(client, database, monkeypatch):
+    from app.main import admin_directory
+
+    with psycopg.connect(database, autocommit=True) as conn:
+        conn.execute(
+            "INSERT INTO admin_users (username, password_hash, email) VALUES ('legacy', %s, 'legacy@example.com')",
+            (legacy_hash("old-password"),)
+        )
+    try:
+        monkeypatch.setattr(admin_directory, "loaded_at", None)
+
+        assert client.post("/api/admin/login", json={"username": "legacy", "password": "wrong"}).status_code == 401
+        response = client.post("/api/admin/login", json={"username": "legacy", "password": "old-password"})
+        assert response.status_code == 200, response.text
+
+        # The new hash is written by a background task after the response
+        deadline = time.monotonic() + 5
+        while stored_hash(database, "legacy") == legacy_hash("old-password") and time.monotonic() < deadline:
+            time.sleep(0.05)
+        stored = stored_hash(database, "legacy")
+        assert stored.startswith("scrypt$")
+        assert verify_password("old-password", stored) == (True, False)
+        assert admin_directory.get("legacy").password_hash == stored
+
+        # Logging in again verifies against scrypt and leaves the hash alone
+        assert client.post("/api/admin/login", json={"username": "legacy", "password": "old-password"}).status_code == 200
+        assert stored_hash(database, "legacy") == stored
+    finally:
+        with psycopg.connect(database, autocommit=True) as conn:
+            conn.execute("DELETE FROM admin_users WHERE username = 'legacy'")
+        admin_directory.users.pop("legacy", None)
@@ -0,0 +1,37 @@
+import asyncio
+
+import psycopg
+
+from app.db import TimedCursor
+from app.slow_queries import normalize_sql, param_shape, slow_query_log
+
+def test_normalize_sql_groups_executions_with_different_literals():
+    assert normalize_sql("SELECT * FROM bookings\n  WHERE phone = '+1555' AND id > 42") == "SELECT * FROM bookings WHERE phone = ? AND id > ?"
+    assert param_shape(("+1555", [1, 2], None)) == "(str, list[2], NoneType)"
+    assert param_shape({"phone": "+1555"}) == "{phone: str}"
+
+def test_execute_and_executemany_are_both_observed(database, monkeypatch):
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 5.0)
+    slow_query_log.reset()
+
+    async def run():
+        conn = await psycopg.AsyncConnection.connect(database, cursor_factory=TimedCursor)
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT pg_sleep(%s)", (0.01,))
+                await cur.executemany("SELECT pg_sleep(%s)", [(0.005,), (0.005,)])
+                await cur.executemany("SELECT pg_sleep(%s) /* from a generator */", ((0.005,) for _ in range(2)))
+                # Fast statements stay below the threshold
+                await cur.executemany("SELECT %s", [(1,), (2,)])
+        finally:
+            await conn.close()
+
+    asyncio.run(run())
+    entries = {entry["sql"]: entry for entry in slow_query_log.top()}
+    slow_query_log.reset()
+
+    assert set(entries) == {"SELECT pg_sleep(%s)", "SELECT pg_sleep(%s) /* from a generator */"}
+    assert entries["SELECT pg_sleep(%s)"]["count"] == 2
+    assert entries["SELECT pg_sleep(%s)"]["params"] == "(float)"
+    assert entries["SELECT pg_sleep(%s) /* from a generator */"]["params"] is None
+    assert entries["SELECT pg_sleep(%s) /* from a generator */"]["max_ms"] >= 5.0
@@ -0,0 +1,229 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg
+import pytest
+
+from app.db import DatabaseUnavailable, close_db_pool, open_db_pool
+from app.storage import DuplicateRecord, MemoryStorage, PostgresStorage, Storage, is_database_unreachable
+
+NOW = datetime(2025, 3, 3, 8, tzinfo=timezone.utc)
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+def test_storage_must_implement_every_operation():
+    class Partial(Storage):
+        async def create_employee(self, employee_id, name, phone, email, position):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+    MemoryStorage()
+
+def test_memory_employee_indexes_follow_updates():
+    async def run():
+        store = MemoryStorage()
+        ann, bob = new_id(), new_id()
+        await store.create_employee(ann, "Ann", "+15550400001", None, "Driver")
+        await store.create_employee(bob, "Bob", "+15550400002", None, "Driver")
+        with pytest.raises(DuplicateRecord):
+            await store.create_employee(new_id(), "Ann again", "+15550400001", None, "Driver")
+
+        assert [row[0] for row in await store.list_employees()] == [bob, ann]
+        assert await store.update_employee(new_id(), {"name": "Nobody"}) is None
+
+        # A phone change frees the old number; a taken one is refused without touching anything
+        with pytest.raises(DuplicateRecord):
+            await store.update_employee(ann, {"phone": "+15550400002", "name": "Ann Lee"})
+        assert await store.get_employee(ann) == (ann, "Ann", "+15550400001", None, "Driver", "active")
+        assert await store.update_employee(ann, {"phone": "+15550400003", "status": "inactive"}) == (ann, "Ann", "+15550400003", None, "Driver", "inactive")
+        await store.create_employee(new_id(), "Cat", "+15550400001", None, "Driver")
+        assert store.employee_by_phone["+15550400003"] == ann
+
+        assert [row[0] for row in await store.list_employees("inactive")] == [ann]
+        assert len(await store.list_employees("active")) == 2
+        await store.update_employee(ann, {"status": "active"})
+        assert await store.list_employees("inactive") == []
+        assert "inactive" not in store.employees_by_status
+
+    asyncio.run(run())
+
+def test_memory_status_lists_stay_newest_first():
+    async def run():
+        store = MemoryStorage()
+        ids = [new_id() for _ in range(4)]
+        for number, employee_id in enumerate(ids):
+            await store.create_employee(employee_id, f"Driver {number}", f"+1555040010{number}", None, "Driver")
+
+        # Deactivated out of creation order, and an older one moving back in behind newer ones
+        for employee_id in (ids[2], ids[0], ids[3], ids[1]):
+            await store.update_employee(employee_id, {"status": "inactive"})
+        await store.update_employee(ids[2], {"status": "active"})
+        await store.update_employee(ids[0], {"status": "active"})
+
+        assert [row[0] for row in await store.list_employees("inactive")] == [ids[3], ids[1]]
+        assert [row[0] for row in await store.list_employees("active")] == [ids[2], ids[0]]
+        assert list(store.employees_by_status["active"]) == [ids[0], ids[2]]
+
+    asyncio.run(run())
+
+def test_memory_attendance_indexes_and_order():
+    async def run():
+        store = MemoryStorage()
+        ann, bob = new_id(), new_id()
+        await store.create_employee(ann, "Ann", "+15550400001", None, "Driver")
+        await store.create_employee(bob, "Bob", "+15550400002", None, "Driver")
+
+        rows = await store.record_attendance("check_in", [ann, ann, bob, "unknown"], NOW)
+        assert [(row[0], row[1] is not None, row[5]) for row in rows] == [(ann, True, True), (bob, True, True), ("unknown", False, False)]
+        # Checked in already: the previous check-in comes back, nothing changes
+        again = await store.record_attendance("check_in", [ann], NOW + timedelta(hours=1))
+        assert again == [(ann, None, None, None, None, True, NOW, None)]
+        await store.record_attendance("check_in", [bob], NOW + timedelta(days=1))
+        await store.record_attendance("check_out", [ann], NOW + timedelta(hours=8))
+
+        rows = await store.list_attendance()
+        assert [(row[1], row[4]) for row in rows[:1]] == [(bob, NOW.date() + timedelta(days=1))]
+        # Same day and check-in time: either order matches ORDER BY date DESC, check_in_time DESC
+        assert sorted((row[1], row[4]) for row in rows[1:]) == sorted([(ann, NOW.date()), (bob, NOW.date())])
+        assert [(row[2], row[3]) for row in await store.list_attendance(ann)] == [(NOW, NOW + timedelta(hours=8))]
+        assert len(store.attendance_by_date[NOW.date()]) == 2
+
+    asyncio.run(run())
+
+def test_memory_delete_employee_cascades():
+    async def run():
+        store = MemoryStorage()
+        ann, bob = new_id(), new_id()
+        await store.create_employee(ann, "Ann", "+15550400001", None, "Driver")
+        await store.create_employee(bob, "Bob", "+15550400002", None, "Driver")
+        await store.record_attendance("check_in", [ann, bob], NOW)
+        await store.record_attendance("check_in", [ann], NOW + timedelta(days=1))
+        expense, other = new_id(), new_id()
+        await store.create_expense(expense, "employee", "salary", 100.0, None, ann, None, NOW.date(), NOW)
+        await store.create_expense(other, "employee", "bonus", 10.0, None, bob, None, NOW.date(), NOW)
+
+        assert await store.delete_employee(ann)
+        assert not await store.delete_employee(ann)
+
+        assert await store.get_employee(ann) is None
+        assert "+15550400001" not in store.employee_by_phone
+        assert [row[1] for row in await store.list_attendance()] == [bob]
+        assert ann not in store.attendance_by_employee
+        assert not any(employee_id == ann for employee_id, _ in store.attendance_by_day)
+        assert NOW.date() + timedelta(days=1) not in store.attendance_by_date
+        # Expenses survive, unlinked, as with ON DELETE SET NULL
+        rows = {row[0]: row for row in await store.list_expenses()}
+        assert (rows[expense][6], rows[expense][10]) == (None, None)
+        assert (rows[other][6], rows[other][10]) == (bob, "Bob")
+        assert ann not in store.expenses_by_employee
+
+        # Moving an expense between employees moves it between index entries
+        await store.update_expense(other, {"employee_id": None})
+        assert store.expenses_by_employee == {}
+
+    asyncio.run(run())
+
+def test_only_lost_connections_count_as_unreachable():
+    assert is_database_unreachable(DatabaseUnavailable())
+    assert is_database_unreachable(psycopg.OperationalError("the connection is closed"))
+    assert is_database_unreachable(psycopg.errors.AdminShutdown())
+    assert is_database_unreachable(psycopg.errors.ConnectionFailure())
+    assert not is_database_unreachable(psycopg.errors.QueryCanceled())
+    assert not is_database_unreachable(psycopg.errors.LockNotAvailable())
+    assert not is_database_unreachable(psycopg.errors.UniqueViolation())
+
+def test_postgres_storage_falls_back_without_a_pool():
+    async def run():
+        store = PostgresStorage()
+        before = store.fallbacks
+        employee_id = new_id()
+        await store.create_employee(employee_id, "Ann", "+15550400001", None, "Driver")
+        assert [row[0] for row in await store.list_employees()] == [employee_id]
+        assert store.fallbacks == before + 2
+        assert employee_id in store.fallback.employees
+
+    asyncio.run(run())
+
+async def blocked_call(database, store, interrupt):
+    """Run list_employees while another session holds a lock on employees, then interrupt its backend"""
+    locker = await psycopg.AsyncConnection.connect(database)
+    try:
+        await locker.execute("LOCK TABLE employees IN ACCESS EXCLUSIVE MODE")
+        call = asyncio.create_task(store.list_employees())
+        for _ in range(500):
+            if call.done():
+                raise AssertionError(f"storage call finished without blocking: {call.result()!r}")
+            # The waiting backend may not have reported its query text yet, so match on the lock wait alone
+            cursor = await locker.execute(
+                "SELECT pid FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"
+            )
+            row = await cursor.fetchone()
+            if row:
+                break
+            await asyncio.sleep(0.01)
+        else:
+            raise AssertionError("storage call never blocked")
+        await locker.execute(f"SELECT {interrupt}(%s)", (row[0],))
+        await locker.rollback()
+        return await call
+    finally:
+        await locker.close()
+
+def test_postgres_storage_falls_back_only_when_the_connection_is_lost(database):
+    async def run():
+        await open_db_pool()
+        try:
+            store = PostgresStorage()
+            before = store.fallbacks
+
+            # A cancelled statement comes from a live server and reaches the caller
+            with pytest.raises(psycopg.errors.QueryCanceled):
+                await blocked_call(database, store, "pg_cancel_backend")
+            assert store.fallbacks == before
+
+            # A terminated backend is a lost connection: answered from memory
+            assert await blocked_call(database, store, "pg_terminate_backend") == []
+            assert store.fallbacks == before + 1
+        finally:
+            await close_db_pool()
+
+    asyncio.run(run())
+
+def test_employee_update_and_attendance_go_through_storage(client, database):
+    first = client.post("/api/admin/employees", json={"name": "Ann", "phone": "+15550400001", "position": "Driver"}).json()
+    client.post("/api/admin/employees", json={"name": "Bob", "phone": "+15550400002", "position": "Driver"})
+
+    response = client.put(f"/api/admin/employees/{first['id']}", json={"name": "Ann Lee", "status": "inactive"})
+    assert response.status_code == 200, response.text
+    assert (response.json()["name"], response.json()["phone"], response.json()["status"]) == ("Ann Lee", "+15550400001", "inactive")
+    assert [employee["name"] for employee in client.get("/api/admin/employees", params={"status": "inactive"}).json()] == ["Ann Lee"]
+
+    assert client.put(f"/api/admin/employees/{first['id']}", json={"phone": "+15550400002"}).status_code == 400
+    assert client.put(f"/api/admin/employees/{first['id']}", json={"email": "not-an-email"}).status_code == 400
+    assert client.put(f"/api/admin/employees/{first['id']}", json={}).json()["name"] == "Ann Lee"
+    assert client.put(f"/api/admin/employees/{new_id()}", json={"name": "Nobody"}).status_code == 404
+    assert client.put("/api/admin/employees/not-a-uuid", json={"name": "Nobody"}).status_code == 404
+
+    client.post("/api/admin/attendance/check-in", json={"employee_id": first["id"]})
+    records = client.get(f"/api/admin/attendance/{first['id']}").json()
+    assert [record["employee_id"] for record in records] == [first["id"]]
+    assert client.get(f"/api/admin/attendance/{new_id()}").status_code == 404
+    assert client.get("/api/admin/attendance/not-a-uuid").status_code == 404
+
+@pytest.mark.parametrize("fields, message", [
+    ({"email": "not-an-email"}, "valid_employee_email"),
+    ({"phone": "not-a-phone"}, "valid_employee_phone"),
+    ({"position": "x" * 101}, "too long"),
+])
+def test_rejected_employee_values_are_a_bad_request(client, database, fields, message):
+    employee = {"name": "Ann", "phone": "+15550400001", "position": "Driver", **fields}
+
+    response = client.post("/api/admin/employees", json=employee)
+
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"].startswith("Invalid employee:")
+    assert message in response.json()["detail"]
+    assert client.get("/api/admin/employees").json() == []
@@ -84,6 +84,9 @@ interface Expense {
   amount: number
   description?: string
   bill_file_path?: string
+  bill_processing_status?: 'pending' | 'ready' | 'failed' | 'skipped'
+  bill_thumbnail_url?: string
+  bill_preview_url?: string
   employee_id?: string
   ambulance_id?: string
   employee_name?: string
@@ -173,23 +176,18 @@ export default function AdminDashboard() {
 
   const fetchData = async () => {
     try {
-      const [ambulancesRes, driversRes, bookingsRes, assignmentsRes, employeesRes, attendanceRes, expensesRes] = await Promise.all([
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/ambulances`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/drivers`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/bookings`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/driver-assignments`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/employees`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/attendance`, { headers: getAuthHeaders() }),
-        fetch(`${import.meta.env.VITE_API_URL}/api/admin/expenses`, { headers: getAuthHeaders() })
-      ])
-
-      if (ambulancesRes.ok) setAmbulances(await ambulancesRes.json())
-      if (driversRes.ok) setDrivers(await driversRes.json())
-      if (bookingsRes.ok) setBookings(await bookingsRes.json())
-      if (assignmentsRes.ok) setAssignments(await assignmentsRes.json())
-      if (employeesRes.ok) setEmployees(await employeesRes.json())
-      if (attendanceRes.ok) setAttendance(await attendanceRes.json())
-      if (expensesRes.ok) setExpenses(await expensesRes.json())
+      const response = await fetch(`${import.meta.env.VITE_API_URL}/api/admin/dashboard`, { headers: getAuthHeaders() })
+
+      if (response.ok) {
+        const snapshot = await response.json()
+        setAmbulances(snapshot.ambulances)
+        setDrivers(snapshot.drivers)
+        setBookings(snapshot.bookings)
+        setAssignments(snapshot.driver_assignments)
+        setEmployees(snapshot.employees)
+        setAttendance(snapshot.attendance)
+        setExpenses(snapshot.expenses)
+      }
     } catch (error) {
       console.error('Error fetching data:', error)
     } finally {
@@ -1091,7 +1089,16 @@ export default function AdminDashboard() {
                       </TableCell>
                       <TableCell>{new Date(expense.expense_date).toLocaleDateString()}</TableCell>
                       <TableCell>
-                        {expense.bill_file_path ? (
+                        {expense.bill_thumbnail_url ? (
+                          <a href={`${import.meta.env.VITE_API_URL}${expense.bill_preview_url ?? expense.bill_thumbnail_url}`} target="_blank" rel="noreferrer">
+                            <img
+                              src={`${import.meta.env.VITE_API_URL}${expense.bill_thumbnail_url}`}
+                              alt="Bill"
+                              loading="lazy"
+                              className="h-10 w-10 rounded object-cover"
+                            />
+                          </a>
+                        ) : expense.bill_file_path ? (
                           <span className="text-green-600">✓ Uploaded</span>
                         ) : (
                           ['fuel', 'maintenance'].includes(expense.type) ? (
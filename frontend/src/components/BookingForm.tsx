@@ -41,6 +41,7 @@ export default function BookingForm() {
   const [showPickupMap, setShowPickupMap] = useState(false)
   const [showDropMap, setShowDropMap] = useState(false)
   const [isPhoneVerified, setIsPhoneVerified] = useState(false)
+  const [phoneToken, setPhoneToken] = useState('')
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement>) => {
     const { name, value } = e.target
@@ -48,6 +49,7 @@ export default function BookingForm() {
     
     if (name === 'phone' && isPhoneVerified) {
       setIsPhoneVerified(false)
+      setPhoneToken('')
     }
   }
 
@@ -89,6 +91,7 @@ export default function BookingForm() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Phone-Token': phoneToken,
         },
         body: JSON.stringify(formData),
       })
@@ -107,6 +110,7 @@ export default function BookingForm() {
           to_date: ''
         })
         setIsPhoneVerified(false)
+        setPhoneToken('')
       } else {
         toast.error('Failed to create booking')
       }
@@ -165,7 +169,10 @@ export default function BookingForm() {
                 {formData.phone && (
                   <OTPVerification
                     phone={formData.phone}
-                    onVerified={() => setIsPhoneVerified(true)}
+                    onVerified={(token) => {
+                      setPhoneToken(token)
+                      setIsPhoneVerified(true)
+                    }}
                   />
                 )}
               </div>
@@ -33,6 +33,7 @@ export default function Bookings() {
   const [otp, setOtp] = useState('')
   const [isOtpSent, setIsOtpSent] = useState(false)
   const [isPhoneVerified, setIsPhoneVerified] = useState(false)
+  const [phoneToken, setPhoneToken] = useState('')
   const [bookings, setBookings] = useState<Booking[]>([])
   const [isLoading, setIsLoading] = useState(false)
   const [timeLeft, setTimeLeft] = useState(0)
@@ -122,9 +123,11 @@ export default function Bookings() {
       })
 
       if (response.ok) {
+        const data = await response.json()
+        setPhoneToken(data.phone_token)
         setIsPhoneVerified(true)
         toast.success('Phone number verified successfully!')
-        await fetchBookings()
+        await fetchBookings(data.phone_token)
       } else {
         const error = await response.json()
         toast.error(error.detail || 'Invalid OTP')
@@ -144,7 +147,7 @@ export default function Bookings() {
     sendOTP()
   }
 
-  const fetchBookings = async () => {
+  const fetchBookings = async (token: string = phoneToken) => {
     if (!phone) return
 
     setIsLoading(true)
@@ -153,6 +156,7 @@ export default function Bookings() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Phone-Token': token,
         },
         body: JSON.stringify({ phone }),
       })
@@ -179,6 +183,7 @@ export default function Bookings() {
     setOtp('')
     setIsOtpSent(false)
     setIsPhoneVerified(false)
+    setPhoneToken('')
     setBookings([])
     setTimeLeft(0)
     setSendCooldown(0)
@@ -7,7 +7,7 @@ import { Lock, User, Eye, EyeOff, AlertCircle } from 'lucide-react'
 import { toast } from 'sonner'
 
 interface LoginProps {
-  onLogin: (token: string) => void
+  onLogin: (token: string, refreshToken?: string, expiresIn?: number) => void
 }
 
 export default function Login({ onLogin }: LoginProps) {
@@ -44,7 +44,7 @@ export default function Login({ onLogin }: LoginProps) {
         const data = await response.json()
         localStorage.setItem('admin_token', data.access_token)
         toast.success('Login successful!')
-        onLogin(data.access_token)
+        onLogin(data.access_token, data.refresh_token, data.expires_in)
       } else {
         const errorData = await response.json()
         const errorMessage = errorData.detail || 'Invalid username or password. Please check your credentials and try again.'
@@ -7,7 +7,7 @@ import { toast } from 'sonner'
 
 interface OTPVerificationProps {
   phone: string
-  onVerified: () => void
+  onVerified: (phoneToken: string) => void
   className?: string
 }
 
@@ -95,9 +95,10 @@ export default function OTPVerification({ phone, onVerified, className = '' }: O
       })
 
       if (response.ok) {
+        const data = await response.json()
         setIsVerified(true)
         toast.success('Phone number verified successfully!')
-        onVerified()
+        onVerified(data.phone_token)
       } else {
         const error = await response.json()
         toast.error(error.detail || 'Invalid OTP')
@@ -3,34 +3,87 @@ import { createContext, useContext, useState, useEffect, ReactNode } from 'react
 interface AuthContextType {
   isAuthenticated: boolean
   token: string | null
-  login: (token: string) => void
+  login: (token: string, refreshToken?: string, expiresIn?: number) => void
   logout: () => void
 }
 
+// Refresh this many seconds before the access token expires
+const REFRESH_MARGIN_SECONDS = 120
+// Wait this long before retrying a refresh that failed on the network or the server
+const REFRESH_RETRY_SECONDS = 30
+
 const AuthContext = createContext<AuthContextType | undefined>(undefined)
 
 export function AuthProvider({ children }: { children: ReactNode }) {
   const [token, setToken] = useState<string | null>(null)
   const [isAuthenticated, setIsAuthenticated] = useState(false)
+  const [refreshToken, setRefreshToken] = useState<string | null>(null)
+  const [refreshIn, setRefreshIn] = useState<number | null>(null)
+  // Bumped on every retry so the refresh effect re-runs even when refreshIn is unchanged
+  const [refreshAttempt, setRefreshAttempt] = useState(0)
 
   useEffect(() => {
     const savedToken = localStorage.getItem('admin_token')
+    const savedRefreshToken = localStorage.getItem('admin_refresh_token')
     if (savedToken) {
       setToken(savedToken)
       setIsAuthenticated(true)
     }
+    if (savedRefreshToken) {
+      // The saved access token may already have expired, so refresh right away
+      setRefreshToken(savedRefreshToken)
+      setRefreshIn(0)
+    }
   }, [])
 
-  const login = (newToken: string) => {
+  useEffect(() => {
+    if (!refreshToken || refreshIn === null) return
+    const retry = () => {
+      setRefreshIn(REFRESH_RETRY_SECONDS)
+      setRefreshAttempt((attempt) => attempt + 1)
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(`${import.meta.env.VITE_API_URL}/api/admin/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        })
+        if (response.ok) {
+          const data = await response.json()
+          login(data.access_token, data.refresh_token, data.expires_in)
+        } else if (response.status === 401) {
+          logout()
+        } else if (response.status >= 500) {
+          // Server trouble says nothing about the refresh token: try again shortly
+          retry()
+        }
+      } catch (error) {
+        // Network hiccup: try again shortly
+        retry()
+      }
+    }, refreshIn * 1000)
+    return () => clearTimeout(timer)
+  }, [refreshToken, refreshIn, refreshAttempt])
+
+  const login = (newToken: string, newRefreshToken?: string, expiresIn?: number) => {
     setToken(newToken)
     setIsAuthenticated(true)
     localStorage.setItem('admin_token', newToken)
+    if (newRefreshToken) {
+      setRefreshToken(newRefreshToken)
+      setRefreshIn(Math.max((expiresIn ?? 1800) - REFRESH_MARGIN_SECONDS, 30))
+      localStorage.setItem('admin_refresh_token', newRefreshToken)
+    }
   }
 
   const logout = () => {
     setToken(null)
     setIsAuthenticated(false)
+    setRefreshToken(null)
+    setRefreshIn(null)
     localStorage.removeItem('admin_token')
+    localStorage.removeItem('admin_refresh_token')
   }
 
   return (